@@ -0,0 +1,202 @@
+# app_resources.py
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# ---------------------------------------------
+# REGISTRY ของ resource ระดับ process
+# ---------------------------------------------
+# semantics เดียวกับ st.cache_resource: สร้างครั้งเดียวต่อ process, ทุก session ใช้ตัวเดียวกัน,
+# health check ทำหน้าที่แบบ validate= (ไม่ผ่าน → ทิ้งแล้วสร้างใหม่ตอนถูกขอครั้งถัดไป)
+# ต่างกันที่: ใช้ได้นอก Streamlit runtime (background thread / benchmark) และปิด resource ให้ตอน reset/shutdown
+
+@dataclass
+class _Entry:
+    name: str
+    factory: Callable[[], Any]
+    health: Optional[Callable[[Any], bool]] = None        # True = ใช้ได้ (raise = ไม่ผ่าน)
+    close: Optional[Callable[[Any], None]] = None
+    stats: Optional[Callable[[Any], Dict[str, Any]]] = None
+    obj: Any = None
+    created_at: Optional[float] = None
+    build_ms: float = 0.0
+    builds: int = 0
+    gets: int = 0
+    last_check: Optional[Tuple[float, bool, str]] = None   # (เวลา, ผ่าน?, ข้อความ)
+    error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_LOCK = threading.Lock()
+_ENTRIES: Dict[str, _Entry] = {}
+_ORDER: List[str] = []          # ลำดับที่สร้างจริง (shutdown ปิดย้อนกลับ)
+_SHUT_DOWN = False
+
+
+def register(
+    name: str,
+    factory: Callable[[], Any],
+    *,
+    health: Optional[Callable[[Any], bool]] = None,
+    close: Optional[Callable[[Any], None]] = None,
+    stats: Optional[Callable[[Any], Dict[str, Any]]] = None,
+) -> None:
+    """ลงทะเบียนวิธีสร้าง resource (ยังไม่สร้าง) — ลงชื่อเดิมซ้ำ = no-op (import ซ้ำ/rerun ได้)"""
+    with _LOCK:
+        if name not in _ENTRIES:
+            _ENTRIES[name] = _Entry(name, factory, health, close, stats)
+
+
+def _entry(name: str) -> _Entry:
+    try:
+        return _ENTRIES[name]
+    except KeyError:
+        raise KeyError(f"resource {name!r} is not registered") from None
+
+
+def get(name: str) -> Any:
+    """คืน resource (สร้างตอนถูกขอครั้งแรก; thread พร้อมกันหลายตัวได้ตัวเดียวกันเสมอ)"""
+    e = _entry(name)
+    obj = e.obj
+    if obj is None:
+        with e.lock:
+            if e.obj is None:
+                t0 = time.perf_counter()
+                try:
+                    e.obj = e.factory()
+                except Exception as ex:
+                    e.error = str(ex)
+                    raise
+                e.build_ms = (time.perf_counter() - t0) * 1000.0
+                e.created_at = time.time()
+                e.builds += 1
+                e.error = None
+                with _LOCK:
+                    if name not in _ORDER:
+                        _ORDER.append(name)
+            obj = e.obj
+    e.gets += 1   # นับคร่าว ๆ (ไม่ล็อก — ใช้ดูใน diagnostics เท่านั้น)
+    return obj
+
+
+def peek(name: str) -> Any:
+    """resource ที่สร้างแล้ว หรือ None (ไม่สร้างให้)"""
+    e = _ENTRIES.get(name)
+    return None if e is None else e.obj
+
+
+def provide(name: str, obj: Any) -> None:
+    """ใส่ instance ที่สร้างเอง (benchmark/สคริปต์ชี้ไปฐานอื่น) — ตัวเดิมถูกปิดก่อน"""
+    reset(name)
+    e = _entry(name)
+    with e.lock:
+        e.obj = obj
+        e.created_at = time.time()
+        e.builds += 1
+        e.error = None
+    with _LOCK:
+        if name not in _ORDER:
+            _ORDER.append(name)
+
+
+def _close(e: _Entry) -> None:
+    obj, e.obj = e.obj, None
+    if obj is None or e.close is None:
+        return
+    try:
+        e.close(obj)
+    except Exception as ex:
+        print(f"resource {e.name} close error:", ex)
+
+
+def reset(name: str) -> None:
+    """ปิดและทิ้ง resource (ครั้งถัดไปที่ get() จะสร้างใหม่)"""
+    e = _entry(name)
+    with e.lock:
+        _close(e)
+    with _LOCK:
+        if name in _ORDER:
+            _ORDER.remove(name)
+
+
+# ---------------------------------------------
+# HEALTH
+# ---------------------------------------------
+def check(name: str, rebuild: bool = False) -> Tuple[bool, str]:
+    """
+    ตรวจ resource ที่สร้างแล้ว (ยังไม่สร้าง = ผ่าน, ไม่มี health = ผ่าน)
+    - rebuild=True: ไม่ผ่าน → reset() ให้ครั้งถัดไปสร้างใหม่ (เหมือน validate= ของ st.cache_resource)
+    """
+    e = _entry(name)
+    obj = e.obj
+    if obj is None:
+        return True, "not created"
+    ok, msg = True, "ok"
+    if e.health is not None:
+        try:
+            ok = bool(e.health(obj))
+            msg = "ok" if ok else "unhealthy"
+        except Exception as ex:
+            ok, msg = False, str(ex)
+    e.last_check = (time.time(), ok, msg)
+    if not ok:
+        print(f"resource {name} health error:", msg)
+        if rebuild:
+            reset(name)
+    return ok, msg
+
+
+def check_all(rebuild: bool = False) -> Dict[str, Tuple[bool, str]]:
+    return {name: check(name, rebuild=rebuild) for name in list(_ENTRIES)}
+
+
+# ---------------------------------------------
+# SHUTDOWN / DIAGNOSTICS
+# ---------------------------------------------
+def shutdown() -> None:
+    """ปิด resource ทั้งหมด ย้อนลำดับที่สร้าง (เช่น worker pool ก่อน engine) — ตอนปิด process"""
+    global _SHUT_DOWN
+    with _LOCK:
+        if _SHUT_DOWN:
+            return
+        _SHUT_DOWN = True
+        order = list(reversed(_ORDER))
+        _ORDER.clear()
+    for name in order:
+        e = _ENTRIES[name]
+        with e.lock:
+            _close(e)
+
+
+def diagnostics() -> List[Dict[str, Any]]:
+    """resource ทั้งหมด (สร้างแล้ว/ยัง) + สถิติของแต่ละตัว เป็น list ของ dict (JSON ได้)"""
+    now = time.time()
+    out: List[Dict[str, Any]] = []
+    for name, e in list(_ENTRIES.items()):
+        obj = e.obj
+        row: Dict[str, Any] = {
+            "name": name,
+            "live": obj is not None,
+            "type": type(obj).__name__ if obj is not None else None,
+            "age_s": round(now - e.created_at, 1) if obj is not None and e.created_at else None,
+            "build_ms": round(e.build_ms, 1),
+            "builds": e.builds,
+            "gets": e.gets,
+            "health": None if e.last_check is None else ("ok" if e.last_check[1] else e.last_check[2]),
+            "error": e.error,
+            "stats": {},
+        }
+        if obj is not None and e.stats is not None:
+            try:
+                row["stats"] = e.stats(obj)
+            except Exception as ex:
+                row["stats"] = {"error": str(ex)}
+        out.append(row)
+    return out
+
+
+atexit.register(shutdown)
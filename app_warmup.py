@@ -0,0 +1,67 @@
+# app_warmup.py
+from __future__ import annotations
+
+import importlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+# โมดูลหนักที่เพจส่วนใหญ่ต้องใช้ (โหลดล่วงหน้าหลังหน้าแรกวาดเสร็จ)
+WARMUP_MODULES = ("numpy", "pandas", "altair", "yfinance")
+
+# ปิดได้ด้วย env: TAROT_WARMUP=0
+WARMUP_ENABLED = os.environ.get("TAROT_WARMUP", "1").strip().lower() not in ("0", "false", "no", "off")
+
+_LOCK = threading.Lock()
+_THREAD: Optional[threading.Thread] = None
+_TIMINGS: Dict[str, float] = {}   # module/งาน → วินาทีที่ใช้ (หรือ -1 ถ้าล้มเหลว)
+
+
+# ---------------------------------------------
+# WARM-UP
+# ---------------------------------------------
+def _warm(modules: Iterable[str], tasks: Iterable[Callable[[], object]]) -> None:
+    for name in modules:
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            _TIMINGS[name] = time.perf_counter() - t0
+        except Exception:
+            _TIMINGS[name] = -1.0  # ไม่มีแพ็กเกจ/โหลดไม่ได้ → ปล่อยให้เพจจัดการเองตอนใช้จริง
+    for task in tasks:
+        name = getattr(task, "__name__", repr(task))
+        t0 = time.perf_counter()
+        try:
+            task()
+            _TIMINGS[name] = time.perf_counter() - t0
+        except Exception:
+            _TIMINGS[name] = -1.0
+
+
+def start_background_warmup(
+    modules: Iterable[str] = WARMUP_MODULES,
+    tasks: Iterable[Callable[[], object]] = (),
+) -> bool:
+    """
+    import โมดูลหนัก + รันงานเตรียมระบบ (tasks) ใน daemon thread ครั้งเดียวต่อ process
+    - เรียกท้ายสคริปต์ทุก rerun ได้ (ครั้งถัดไปเป็น no-op)
+    - คืน True ถ้ารอบนี้เป็นคนเริ่ม thread
+    """
+    global _THREAD
+    if not WARMUP_ENABLED or _THREAD is not None:
+        return False
+    with _LOCK:
+        if _THREAD is not None:
+            return False
+        _THREAD = threading.Thread(target=_warm, args=(tuple(modules), tuple(tasks)), name="tt-warmup", daemon=True)
+        _THREAD.start()
+    return True
+
+
+def warmup_status() -> Dict[str, float]:
+    """เวลาของแต่ละโมดูล/งานที่ warm-up แล้ว (วินาที; -1 = ล้มเหลว)"""
+    return dict(_TIMINGS)
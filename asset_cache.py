@@ -0,0 +1,124 @@
+# asset_cache.py
+from __future__ import annotations
+
+import base64
+import io
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+MAX_CACHE_BYTES = 16 * 1024 * 1024   # รวมขนาด data URI ทั้งหมดในแคช (ไล่ตัวเก่าสุดออกเมื่อเกิน)
+DEFAULT_SCALE = 2                     # เก็บภาพกว้าง 2× ของขนาดที่แสดง ให้คมบนจอ HiDPI
+
+_MIME_BY_EXT = {
+    ".jpg": "image/jpeg", ".jpeg": "image/jpeg",
+    ".png": "image/png", ".gif": "image/gif", ".webp": "image/webp",
+}
+_FMT_BY_MIME = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}
+_MIME_BY_FMT = {v: k for k, v in _FMT_BY_MIME.items()}
+
+# key = (abs path, mtime_ns, width, fmt) → data URI
+_CACHE: "OrderedDict[Tuple[str, int, int, str], str]" = OrderedDict()
+_CACHE_BYTES = 0
+_LOCK = threading.Lock()
+
+
+# ---------------------------------------------
+# HELPERS
+# ---------------------------------------------
+def _guess_mime(path: str) -> str:
+    mime, _ = mimetypes.guess_type(path)
+    if mime is None:
+        mime = _MIME_BY_EXT.get(os.path.splitext(path)[1].lower(), "image/jpeg")
+    return mime
+
+
+def _encode(path: str, width: int, fmt: str) -> str:
+    """อ่านไฟล์ → ย่อ (ถ้าระบุ width และมี Pillow) → เข้ารหัสใหม่ → data URI"""
+    mime = _guess_mime(path)
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    try:
+        from PIL import Image
+    except Exception:
+        Image = None  # ไม่มี Pillow → ส่งไฟล์เดิม (ยังได้ประโยชน์จากแคช)
+
+    if Image is not None and (width > 0 or fmt):
+        try:
+            with Image.open(io.BytesIO(raw)) as im:
+                out_fmt = fmt or _FMT_BY_MIME.get(mime, "PNG")
+                target_w = width * DEFAULT_SCALE
+                if width > 0 and im.width > target_w:
+                    h = max(1, round(im.height * target_w / im.width))
+                    im = im.resize((target_w, h), Image.LANCZOS)
+                if out_fmt == "JPEG" and im.mode not in ("RGB", "L"):
+                    im = im.convert("RGB")
+                buf = io.BytesIO()
+                if out_fmt == "JPEG":
+                    im.save(buf, format="JPEG", quality=85, optimize=True, progressive=True)
+                elif out_fmt == "WEBP":
+                    im.save(buf, format="WEBP", quality=85, method=4)
+                else:
+                    im.save(buf, format="PNG", optimize=True)
+                # ใช้ของที่เข้ารหัสใหม่เฉพาะเมื่อเล็กกว่าไฟล์เดิม
+                if buf.tell() < len(raw):
+                    raw = buf.getvalue()
+                    mime = _MIME_BY_FMT.get(out_fmt, mime)
+        except Exception:
+            pass  # ไฟล์แปลก/ย่อไม่ได้ → ใช้ไฟล์เดิม
+
+    b64 = base64.b64encode(raw).decode("utf-8")
+    return f"data:{mime};base64,{b64}"
+
+
+# ---------------------------------------------
+# PUBLIC API
+# ---------------------------------------------
+def image_data_uri(path: str, width: int = 0, fmt: str = "") -> Optional[str]:
+    """
+    คืน data URI ของรูป (แคชระดับ process) หรือ None ถ้าไม่พบไฟล์
+    - width: ความกว้างที่จะแสดง (px) → เก็บภาพย่อไว้ที่ width × DEFAULT_SCALE; 0 = ไม่ย่อ
+    - fmt: "PNG" | "WEBP" | "JPEG" | "" (= ตามนามสกุลเดิม)
+    - key รวม mtime → แก้ไฟล์แล้วได้ของใหม่อัตโนมัติ
+    """
+    global _CACHE_BYTES
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), info.st_mtime_ns, int(width or 0), (fmt or "").upper())
+
+    with _LOCK:
+        uri = _CACHE.get(key)
+        if uri is not None:
+            _CACHE.move_to_end(key)
+            return uri
+
+    uri = _encode(path, key[2], key[3])
+
+    with _LOCK:
+        if key not in _CACHE:
+            _CACHE[key] = uri
+            _CACHE_BYTES += len(uri)
+            while _CACHE_BYTES > MAX_CACHE_BYTES and len(_CACHE) > 1:
+                _, old = _CACHE.popitem(last=False)
+                _CACHE_BYTES -= len(old)
+    return uri
+
+
+def cache_stats() -> dict:
+    with _LOCK:
+        return {"entries": len(_CACHE), "bytes": _CACHE_BYTES, "max_bytes": MAX_CACHE_BYTES}
+
+
+def clear_cache() -> None:
+    global _CACHE_BYTES
+    with _LOCK:
+        _CACHE.clear()
+        _CACHE_BYTES = 0
@@ -0,0 +1,153 @@
+# auth_cache.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+USER_TTL_S = 120.0            # แถวในแคชเก่ากว่านี้ → ดึงใหม่ทันทีเมื่อมีคนขอ (กันกรณี refresher ตาย)
+USER_CACHE_MAX = 5_000        # LRU: เก็บได้สูงสุดกี่ผู้ใช้
+REFRESH_INTERVAL_S = 30.0     # refresher ดึงผู้ใช้ที่ active ทั้งหมดใหม่ทุก ๆ เท่านี้ (= เวลาสูงสุดที่สิทธิ์ค้าง)
+ACTIVE_WINDOW_S = 15 * 60.0   # ผู้ใช้ที่มี rerun ภายในช่วงนี้ถือว่า active
+
+# fetch_many(ids) → {id: row} (id ที่ไม่อยู่ใน dict = ถูกลบไปแล้ว)
+FetchMany = Callable[[List[int]], Dict[int, Dict]]
+
+
+class UserCache:
+    """
+    แคชแถวผู้ใช้ตาม id (TTL + LRU) + refresher เบื้องหลังที่ดึงผู้ใช้ active ทั้งหมดในคิวรีเดียว
+    - rerun ปกติอ่านจากหน่วยความจำอย่างเดียว
+    - ผู้ใช้ที่ถูกลบ/หมดอายุ/ลด role จะเห็นผลภายใน REFRESH_INTERVAL_S
+    """
+
+    def __init__(
+        self,
+        fetch_many: FetchMany,
+        ttl_s: float = USER_TTL_S,
+        max_entries: int = USER_CACHE_MAX,
+        refresh_interval_s: float = REFRESH_INTERVAL_S,
+        active_window_s: float = ACTIVE_WINDOW_S,
+    ):
+        self._fetch_many = fetch_many
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.refresh_interval_s = refresh_interval_s
+        self.active_window_s = active_window_s
+
+        # id → (row | None, fetched_at, last_seen)
+        self._rows: "OrderedDict[int, Tuple[Optional[Dict], float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "evictions": 0}
+
+    # ---------- internal ----------
+    def _store(self, user_id: int, row: Optional[Dict], now: float, last_seen: Optional[float] = None) -> None:
+        prev = self._rows.pop(user_id, None)
+        seen = last_seen if last_seen is not None else (prev[2] if prev else now)
+        self._rows[user_id] = (row, now, seen)
+        while len(self._rows) > self.max_entries:
+            self._rows.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _ensure_refresher(self) -> None:
+        if self._thread is not None or self.refresh_interval_s <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refresh_loop, name="tt-user-cache", daemon=True)
+                self._thread.start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            time.sleep(self.refresh_interval_s)
+            try:
+                self.refresh_active()
+            except Exception as e:
+                self._stats["refresh_errors"] += 1
+                print("user cache refresh error:", e)
+
+    # ---------- public ----------
+    def get(self, user_id: int) -> Optional[Dict]:
+        """
+        คืนแถวผู้ใช้ (None = ไม่มีผู้ใช้นี้แล้ว) และบันทึกว่า id นี้ยัง active
+        ยิง DB เฉพาะเมื่อไม่มีในแคชหรือเก่ากว่า TTL
+        """
+        self._ensure_refresher()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._rows.get(user_id)
+            if hit is not None and now - hit[1] < self.ttl_s:
+                self._rows[user_id] = (hit[0], hit[1], now)
+                self._rows.move_to_end(user_id)
+                self._stats["hits"] += 1
+                return hit[0]
+            self._stats["misses"] += 1
+
+        rows = self._fetch_many([user_id])
+        with self._lock:
+            self._store(user_id, rows.get(user_id), time.monotonic(), last_seen=now)
+        return rows.get(user_id)
+
+    def peek(self, user_id: int) -> Tuple[bool, Optional[Dict]]:
+        """
+        (มีในแคชไหม, แถว) โดยไม่ยิง DB (แถวเก่ากว่า TTL ก็คืน) และบันทึกว่า id นี้ยัง active
+        → refresher ดึงแถวล่าสุดให้ในรอบถัดไป
+        """
+        now = time.monotonic()
+        with self._lock:
+            hit = self._rows.get(user_id)
+            if hit is None:
+                return False, None
+            self._rows[user_id] = (hit[0], hit[1], now)
+            self._rows.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return True, hit[0]
+
+    def refresh_active(self) -> int:
+        """ดึงผู้ใช้ที่ active ทั้งหมดใหม่ในคิวรีเดียว คืนจำนวน id ที่ refresh"""
+        now = time.monotonic()
+        with self._lock:
+            ids = [uid for uid, (_, _, seen) in self._rows.items() if now - seen <= self.active_window_s]
+        if not ids:
+            return 0
+        rows = self._fetch_many(ids)
+        fetched_at = time.monotonic()
+        with self._lock:
+            for uid in ids:
+                if uid in self._rows:
+                    self._store(uid, rows.get(uid), fetched_at)
+            self._stats["refreshes"] += 1
+        return len(ids)
+
+    def prime(self, user_id: int, row: Dict) -> bool:
+        """
+        ใส่แถวที่เชื่อถือได้ (เช่น จาก session token ที่ตรวจลายเซ็นแล้ว) ถ้ายังไม่มีในแคช
+        → rerun ถัดไปไม่ต้องยิง DB; refresher จะตรวจกับ DB ให้เองในรอบถัดไป
+        """
+        self._ensure_refresher()
+        now = time.monotonic()
+        with self._lock:
+            if user_id in self._rows:
+                return False
+            self._store(user_id, row, now, last_seen=now)
+        return True
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """ล้างแคช (ทั้งหมด หรือเฉพาะ id) — เรียกหลังแก้ข้อมูลผู้ใช้"""
+        with self._lock:
+            if user_id is None:
+                self._rows.clear()
+            else:
+                self._rows.pop(user_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._rows)
+        s["refresher_alive"] = bool(self._thread and self._thread.is_alive())
+        return s
@@ -0,0 +1,119 @@
+# auth_dialect.py
+from __future__ import annotations
+
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ---------------------------------------------
+# CONFIG (SQLite)
+# ---------------------------------------------
+SQLITE_BUSY_TIMEOUT_MS = 5_000   # รอ writer อีกตัวได้นานเท่านี้ก่อน "database is locked"
+
+
+class SqlDialect:
+    """
+    ชิ้นส่วน SQL ที่ต่างกันระหว่างฐานข้อมูล (ส่วนอื่นของ auth ใช้ SQL มาตรฐานร่วมกัน)
+    - ค่าเวลาเก็บเป็น TIMESTAMP แบบไม่มี timezone (UTC บน Neon/SQLite)
+    """
+    name = "postgresql"
+
+    def now(self) -> str:
+        return "NOW()"
+
+    def ts(self, expr: str) -> str:
+        """แปลง parameter ('YYYY-MM-DD' / ISO) เป็น timestamp"""
+        return f"CAST({expr} AS TIMESTAMP)"
+
+    def add_months(self, expr: str, months: str) -> str:
+        return f"({expr} + {months} * INTERVAL '1 month')"
+
+    def add_days(self, expr: str, days: str) -> str:
+        return f"({expr} + {days} * INTERVAL '1 day')"
+
+    def greatest(self, a: str, b: str) -> str:
+        return f"GREATEST({a}, {b})"
+
+    def trunc_hour(self, expr: str) -> str:
+        return f"date_trunc('hour', {expr})"
+
+    def serial_pk(self) -> str:
+        return "SERIAL PRIMARY KEY"
+
+    def lock_migrations_sql(self) -> str:
+        """คำสั่ง lock ระหว่างรัน migrations ('' = อาศัย lock ของ transaction แทน)"""
+        return "SELECT pg_advisory_xact_lock(:k)"
+
+    def configure_engine(self, engine: Engine) -> None:
+        """ตั้งค่าเพิ่มเติมหลังสร้าง engine (Postgres ไม่ต้องทำอะไร)"""
+
+
+class SQLiteDialect(SqlDialect):
+    """
+    SQLite ไฟล์ local (load test/dev แบบ offline)
+    - WAL: อ่านได้พร้อมกันระหว่างมีคนเขียน, writer ต่อคิวกันด้วย busy_timeout
+    - SQLAlchemy ส่ง BEGIN เอง (ปิด BEGIN อัตโนมัติของ pysqlite ที่ไม่ครอบ DDL)
+    - execution option sqlite_begin="IMMEDIATE" → จอง write lock ตั้งแต่ต้น transaction (ใช้แทน advisory lock)
+    """
+    name = "sqlite"
+
+    def now(self) -> str:
+        return "datetime('now')"
+
+    def ts(self, expr: str) -> str:
+        return f"datetime({expr})"
+
+    def add_months(self, expr: str, months: str) -> str:
+        return f"datetime({expr}, '+' || {months} || ' months')"
+
+    def add_days(self, expr: str, days: str) -> str:
+        return f"datetime({expr}, '+' || {days} || ' days')"
+
+    def greatest(self, a: str, b: str) -> str:
+        return f"MAX({a}, {b})"   # MAX แบบหลายอาร์กิวเมนต์ = scalar ใน SQLite
+
+    def trunc_hour(self, expr: str) -> str:
+        return f"strftime('%Y-%m-%d %H:00:00', {expr})"
+
+    def serial_pk(self) -> str:
+        return "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    def lock_migrations_sql(self) -> str:
+        return ""
+
+    def configure_engine(self, engine: Engine) -> None:
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_conn, record):
+            dbapi_conn.isolation_level = None   # ให้ SQLAlchemy คุม BEGIN เอง (ตาม event ด้านล่าง)
+            cur = dbapi_conn.cursor()
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+            cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cur.close()
+
+        @event.listens_for(engine, "begin")
+        def _on_begin(conn):
+            opts = conn.get_execution_options()
+            if opts.get("isolation_level") == "AUTOCOMMIT":
+                return
+            conn.exec_driver_sql(f"BEGIN {opts.get('sqlite_begin', '')}".strip())
+
+
+_DIALECTS: Dict[str, SqlDialect] = {
+    "postgresql": SqlDialect(),
+    "sqlite": SQLiteDialect(),
+}
+
+
+def for_engine(engine: Engine) -> SqlDialect:
+    """เลือกชุด SQL ตาม engine (ไม่รู้จัก → ใช้แบบ Postgres)"""
+    return _DIALECTS.get(engine.dialect.name, _DIALECTS["postgresql"])
+
+
+def engine_kwargs(url: str) -> Dict:
+    """argument เพิ่มเติมของ create_engine ตามชนิดฐานข้อมูล"""
+    if url.startswith("sqlite"):
+        # connection ถูกใช้ข้าม thread ได้ (พูล + worker ของแอป); timeout = busy timeout ของ driver
+        return {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000.0}}
+    return {}
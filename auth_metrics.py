@@ -0,0 +1,244 @@
+# auth_metrics.py
+from __future__ import annotations
+
+import bisect
+import contextlib
+import contextvars
+import re
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+# ขอบบนของแต่ละ bucket (ms) — ช่วงกว้างพอให้เห็นทั้ง query ใน LAN (<1ms) และ Neon ตอนตื่นจาก suspend (>1s)
+BUCKETS_MS = (0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000)
+MAX_STATEMENT_KEYS = 200     # กัน label งอก (SQL ที่ประกอบแบบ dynamic)
+STATEMENT_LABEL_LEN = 90
+
+
+class Histogram:
+    """histogram แบบ bucket คงที่ (รวมข้าม thread ได้ถูก ใช้หน่วยความจำคงที่)"""
+
+    __slots__ = ("counts", "n", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.n = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.n += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def quantile(self, q: float) -> float:
+        """ประมาณค่า quantile = ขอบบนของ bucket ที่ครอบอันดับนั้น (ไม่เกิน max จริง)"""
+        if self.n == 0:
+            return 0.0
+        rank = q * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                upper = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+                return min(upper, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.n,
+            "avg_ms": round(self.total_ms / self.n, 3) if self.n else 0.0,
+            "p50_ms": round(self.quantile(0.50), 3),
+            "p95_ms": round(self.quantile(0.95), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "total_ms": round(self.total_ms, 3),
+        }
+
+
+# ---------------------------------------------
+# REGISTRY (ระดับ process)
+# ---------------------------------------------
+_LOCK = threading.Lock()
+_HISTS: Dict[str, Dict[str, Histogram]] = {"operation": {}, "statement": {}, "pool": {}}
+_COUNTERS: Dict[str, int] = {
+    "statements": 0, "statement_errors": 0, "disconnects": 0, "invalidated": 0,
+    "retries": 0, "connects": 0, "checkouts": 0, "checkout_timeouts": 0,
+}
+_GAUGES: Dict[str, int] = {"peak_checked_out": 0, "peak_overflow": 0}
+_ENGINES: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+_STARTED = time.time()
+
+_OPERATION: contextvars.ContextVar[str] = contextvars.ContextVar("tt_db_operation", default="-")
+_WS = re.compile(r"\s+")
+
+
+def _observe(group: str, key: str, ms: float) -> None:
+    with _LOCK:
+        hists = _HISTS[group]
+        h = hists.get(key)
+        if h is None:
+            if len(hists) >= MAX_STATEMENT_KEYS:
+                key = "(other)"
+                h = hists.get(key)
+            if h is None:
+                h = hists[key] = Histogram()
+        h.add(ms)
+
+
+def incr(name: str, delta: int = 1) -> None:
+    with _LOCK:
+        _COUNTERS[name] = _COUNTERS.get(name, 0) + delta
+
+
+def _label(statement: str) -> str:
+    """ชื่อ statement = ฟังก์ชันของ auth ที่เรียก + SQL ย่อ (ค่า parameter ไม่อยู่ใน SQL อยู่แล้ว)"""
+    sql = _WS.sub(" ", statement).strip()
+    if len(sql) > STATEMENT_LABEL_LEN:
+        sql = sql[:STATEMENT_LABEL_LEN - 1] + "…"
+    return f"{_OPERATION.get()} | {sql}"
+
+
+@contextlib.contextmanager
+def operation(name: str) -> Iterator[None]:
+    """
+    จับเวลาทั้งฟังก์ชัน (รอพูล + network + query) และติดชื่อให้ statement ข้างใน
+    → เทียบกับ histogram ของ statement/พูล ได้ว่าเวลาหายไปตรงไหน
+    """
+    token = _OPERATION.set(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe("operation", name, (time.perf_counter() - t0) * 1000.0)
+        _OPERATION.reset(token)
+
+
+# ---------------------------------------------
+# POOL (จับเวลารอ checkout / สร้าง connection ใหม่)
+# ---------------------------------------------
+class TimedQueuePool(QueuePool):
+    """QueuePool ที่จับเวลารอ connection (recreate()/dispose() ได้ class เดิม → เก็บต่อเนื่อง)"""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            rec = super()._do_get()
+        except Exception:
+            incr("checkout_timeouts")
+            raise
+        _observe("pool", "checkout_wait", (time.perf_counter() - t0) * 1000.0)
+        with _LOCK:
+            _COUNTERS["checkouts"] += 1
+            out, ovf = self.checkedout(), self.overflow()
+            if out > _GAUGES["peak_checked_out"]:
+                _GAUGES["peak_checked_out"] = out
+            if ovf > _GAUGES["peak_overflow"]:
+                _GAUGES["peak_overflow"] = ovf
+        return rec
+
+    def _create_connection(self):
+        t0 = time.perf_counter()
+        rec = super()._create_connection()
+        _observe("pool", "connect", (time.perf_counter() - t0) * 1000.0)   # TCP + TLS + auth ของ Neon
+        return rec
+
+
+# ---------------------------------------------
+# ENGINE HOOKS
+# ---------------------------------------------
+def instrument_engine(engine: Engine) -> None:
+    """ผูก event ของ SQLAlchemy: เวลาแต่ละ statement, error/disconnect, connection ที่ถูก invalidate"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("tt_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("tt_t0")
+        if not stack:
+            return
+        ms = (time.perf_counter() - stack.pop()) * 1000.0
+        incr("statements")
+        _observe("statement", _label(statement), ms)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(ctx):
+        if ctx.connection is not None:
+            stack = ctx.connection.info.get("tt_t0")
+            if stack:
+                stack.pop()
+        incr("statement_errors")
+        if ctx.is_disconnect:
+            incr("disconnects")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exc):
+        incr("invalidated")
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        incr("connects")   # นับทั้ง connection ใหม่และการต่อใหม่หลังถูก invalidate
+
+    with _LOCK:
+        _ENGINES.add(engine)
+
+
+# ---------------------------------------------
+# SNAPSHOT / RESET
+# ---------------------------------------------
+def pool_gauges(engine: Engine) -> Dict[str, object]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__}
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+    }
+
+
+def snapshot(extra: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """ค่าทั้งหมดเป็น dict (JSON ได้) — extra: สถิติจากส่วนอื่น (bcrypt pool, user cache)"""
+    with _LOCK:
+        data: Dict[str, object] = {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_STARTED)),
+            "uptime_s": round(time.time() - _STARTED, 1),
+            "counters": dict(_COUNTERS),
+            "peaks": dict(_GAUGES),
+            "operations": {k: h.summary() for k, h in sorted(_HISTS["operation"].items())},
+            "statements": {k: h.summary() for k, h in sorted(_HISTS["statement"].items())},
+            "pool_timings": {k: h.summary() for k, h in sorted(_HISTS["pool"].items())},
+        }
+        engines = list(_ENGINES)
+    data["pools"] = [dict(pool_gauges(e), url=e.url.render_as_string(hide_password=True)) for e in engines]
+    if extra:
+        data.update(extra)
+    return data
+
+
+def reset() -> None:
+    """ล้างค่าที่เก็บไว้ (peak/counter/histogram) — engine ที่ผูกไว้ยังอยู่"""
+    global _STARTED
+    with _LOCK:
+        for hists in _HISTS.values():
+            hists.clear()
+        for k in _COUNTERS:
+            _COUNTERS[k] = 0
+        for k in _GAUGES:
+            _GAUGES[k] = 0
+        _STARTED = time.time()
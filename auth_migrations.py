@@ -0,0 +1,118 @@
+# auth_migrations.py
+from __future__ import annotations
+from typing import Dict, List, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from auth_dialect import SqlDialect, for_engine
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+# key ของ advisory lock (ค่าคงที่ใด ๆ ที่ไม่ชนกับระบบอื่นในฐานข้อมูลเดียวกัน)
+MIGRATION_LOCK_KEY = 7_162_001
+
+# (version, ชื่อ, รายการคำสั่ง SQL) — เพิ่มของใหม่ต่อท้ายเสมอ ห้ามแก้ของเดิมที่ deploy ไปแล้ว
+# ทุกคำสั่งต้อง idempotent เพราะฐานเดิม (ก่อนมี schema_version) มีตาราง users อยู่แล้ว
+# คำสั่งที่ต่างกันตามฐานข้อมูล → ใส่เป็น dict {"postgresql": ..., "sqlite": ...}
+# และ {serial_pk} จะถูกแทนด้วย primary key แบบ auto increment ของฐานนั้น
+MIGRATIONS: List[Tuple[int, str, List[Union[str, Dict[str, str]]]]] = [
+    (1, "create users", [
+        """
+        CREATE TABLE IF NOT EXISTS users(
+            id {serial_pk},
+            username VARCHAR(64) UNIQUE NOT NULL,
+            password_hash VARCHAR(200) NOT NULL,
+            role VARCHAR(20) NOT NULL DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "users.expiry_at", [
+        {
+            "postgresql": "ALTER TABLE users ADD COLUMN IF NOT EXISTS expiry_at TIMESTAMP NULL",
+            # SQLite ไม่มี IF NOT EXISTS ของคอลัมน์ — ฐาน SQLite เริ่มจาก version 1 เสมอจึงไม่ซ้ำ
+            "sqlite": "ALTER TABLE users ADD COLUMN expiry_at TIMESTAMP NULL",
+        },
+    ]),
+    (3, "users list indexes", [
+        # ค้นชื่อผู้ใช้แบบ prefix (lower(username) LIKE 'abc%') ในหน้า Users
+        {
+            "postgresql": "CREATE INDEX IF NOT EXISTS users_username_lower_idx ON users (lower(username) text_pattern_ops)",
+            "sqlite": "CREATE INDEX IF NOT EXISTS users_username_lower_idx ON users (lower(username))",
+        },
+        # ฟิลเตอร์ "ใกล้หมดอายุภายใน N วัน"
+        "CREATE INDEX IF NOT EXISTS users_expiry_at_idx ON users (expiry_at) WHERE expiry_at IS NOT NULL",
+        # ฟิลเตอร์ role + keyset pagination ตาม id
+        "CREATE INDEX IF NOT EXISTS users_role_id_idx ON users (role, id)",
+    ]),
+    (4, "events log", [
+        # เขียนแบบ batch โดย event_log.py (write-behind) — ไม่มี FK กับ users เพื่อให้ insert ถูกที่สุด
+        """
+        CREATE TABLE IF NOT EXISTS events(
+            id {serial_pk},
+            ts TIMESTAMP NOT NULL,
+            kind VARCHAR(32) NOT NULL,
+            username VARCHAR(64) NULL,
+            page VARCHAR(64) NULL,
+            detail VARCHAR(200) NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS events_ts_idx ON events (ts)",
+        "CREATE INDEX IF NOT EXISTS events_kind_ts_idx ON events (kind, ts)",
+    ]),
+    (5, "users.session_epoch", [
+        # รุ่นของ session token ต่อผู้ใช้ — เพิ่มค่าเมื่อ logout → token ที่ออกก่อนหน้าใช้ไม่ได้ทันที
+        {
+            "postgresql": "ALTER TABLE users ADD COLUMN IF NOT EXISTS session_epoch INTEGER NOT NULL DEFAULT 0",
+            "sqlite": "ALTER TABLE users ADD COLUMN session_epoch INTEGER NOT NULL DEFAULT 0",
+        },
+    ]),
+]
+
+
+# ---------------------------------------------
+# RUNNER
+# ---------------------------------------------
+def _statement_for(stmt: Union[str, Dict[str, str]], dialect: SqlDialect) -> str:
+    if isinstance(stmt, dict):
+        stmt = stmt[dialect.name]
+    return stmt.replace("{serial_pk}", dialect.serial_pk())
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """
+    อัปเกรด schema ให้ถึงเวอร์ชันล่าสุด คืนรายการ version ที่เพิ่งรัน
+    - ทั้งหมดอยู่ใน transaction เดียว + lock (Postgres: pg_advisory_xact_lock, SQLite: BEGIN IMMEDIATE)
+      → หลาย worker เริ่มพร้อมกันก็รันแค่ตัวเดียว
+    - ตัวที่รอ lock จะเห็น version ล่าสุดแล้วข้ามไปเอง
+    """
+    dialect = for_engine(engine)
+    applied: List[int] = []
+    with engine.connect().execution_options(sqlite_begin="IMMEDIATE") as conn, conn.begin():
+        if dialect.lock_migrations_sql():
+            conn.execute(text(dialect.lock_migrations_sql()), {"k": MIGRATION_LOCK_KEY})
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_version(
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(120) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """))
+        current = int(conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar_one())
+        for version, name, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for stmt in statements:
+                conn.execute(text(_statement_for(stmt, dialect)))
+            conn.execute(
+                text("INSERT INTO schema_version (version, name) VALUES (:v, :n)"),
+                {"v": version, "n": name}
+            )
+            applied.append(version)
+    return applied
+
+
+def latest_version() -> int:
+    return max(v for v, _, _ in MIGRATIONS) if MIGRATIONS else 0
@@ -0,0 +1,83 @@
+# auth_tokens.py
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Dict, Optional
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+TOKEN_VERSION = 2                # 2: มี session_epoch (g) — token รุ่นเก่าใช้ไม่ได้ ต้องล็อกอินใหม่ครั้งเดียว
+TOKEN_TTL_S = 7 * 86400          # token ใช้ได้นานสุดเท่านี้นับจากออก (ต่ออายุอัตโนมัติเมื่อเกินครึ่ง)
+TOKEN_RENEW_AFTER_S = TOKEN_TTL_S // 2
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(secret: bytes, body: str) -> str:
+    return _b64(hmac.new(secret, body.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue(secret: bytes, user_id: int, username: str, role: str,
+          expiry_ts: Optional[float], issued_at: Optional[float] = None, session_epoch: int = 0) -> str:
+    """
+    สร้าง token "<payload>.<hmac>" (base64url ทั้งคู่)
+    payload: id, username, role, วันหมดอายุของบัญชี (epoch UTC / None), เวลาออก token
+    และ session_epoch ของผู้ใช้ตอนออก (DB เพิ่มค่าเมื่อ logout → token นี้ถูกเพิกถอน)
+    """
+    payload = {
+        "v": TOKEN_VERSION,
+        "i": int(user_id),
+        "u": username,
+        "r": role,
+        "e": None if expiry_ts is None else int(expiry_ts),
+        "t": int(issued_at if issued_at is not None else time.time()),
+        "g": int(session_epoch),
+    }
+    body = _b64(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    return f"{body}.{_sign(secret, body)}"
+
+
+def verify(secret: bytes, token: str, now: Optional[float] = None, ttl_s: int = TOKEN_TTL_S) -> Optional[Dict]:
+    """
+    ตรวจ token ในเครื่อง (ไม่แตะ DB) คืน payload หรือ None ถ้า:
+    ลายเซ็นผิด / รูปแบบเสีย / เก่ากว่า ttl_s / บัญชี (non-admin) หมดอายุแล้ว
+    """
+    # ค่ามาจาก query param ของ URL → อะไรก็ได้ (non-ASCII ทำให้ encode/compare_digest ล้ม) ตัดทิ้งก่อน
+    if not isinstance(token, str) or not token or not token.isascii() or token.count(".") != 1:
+        return None
+    body, sig = token.split(".")
+    if not hmac.compare_digest(sig.encode("ascii"), _sign(secret, body).encode("ascii")):
+        return None
+    try:
+        payload = json.loads(_unb64(body))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if payload.get("v") != TOKEN_VERSION:
+        return None
+    now = time.time() if now is None else now
+    issued = payload.get("t", 0)
+    if issued > now + 60 or now - issued > ttl_s:
+        return None
+    exp = payload.get("e")
+    if payload.get("r") != "admin" and exp is not None and now > exp:
+        return None
+    return payload
+
+
+def needs_renewal(payload: Dict, now: Optional[float] = None) -> bool:
+    """token เก่าเกินครึ่งอายุ → ออกใหม่ (sliding session ของคนที่ใช้งานต่อเนื่อง)"""
+    now = time.time() if now is None else now
+    return now - payload.get("t", 0) > TOKEN_RENEW_AFTER_S
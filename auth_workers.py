@@ -0,0 +1,161 @@
+# auth_workers.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import app_resources
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+# bcrypt ปล่อย GIL ระหว่างคำนวณ → thread pool รันขนานได้จริง
+# จำกัดจำนวน worker ไม่ให้ login storm กิน CPU จน session อื่น rerun ไม่ไหว
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+MAX_QUEUE = 64              # งานที่รอคิวได้สูงสุด (นอกเหนือจากที่กำลังรัน)
+SUBMIT_TIMEOUT_S = 10.0     # รอช่องว่างในคิวได้นานสุดเท่านี้ ก่อนตอบว่า "ยุ่ง"
+
+T = TypeVar("T")
+
+
+class WorkerPoolBusy(RuntimeError):
+    """คิวเต็มนานเกิน SUBMIT_TIMEOUT_S (ให้ UI แจ้งว่าระบบยุ่ง ลองใหม่)"""
+
+
+# ---------------------------------------------
+# STATE (ระดับ process)
+# ---------------------------------------------
+_LOCK = threading.Lock()
+_SLOTS = threading.BoundedSemaphore(MAX_WORKERS + MAX_QUEUE)
+
+_STATS: Dict[str, float] = {
+    "submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+    "in_flight": 0, "running": 0, "max_queue_depth": 0,
+    "wait_s_total": 0.0, "run_s_total": 0.0,
+}
+
+
+app_resources.register(
+    "bcrypt_pool",
+    lambda: ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="tt-bcrypt"),
+    health=lambda ex: not ex._shutdown,
+    close=lambda ex: ex.shutdown(wait=False, cancel_futures=True),
+    stats=lambda ex: pool_stats(),
+)
+
+
+def _executor() -> ThreadPoolExecutor:
+    return app_resources.get("bcrypt_pool")
+
+
+def _bump(key: str, delta: float = 1) -> None:
+    with _LOCK:
+        _STATS[key] += delta
+
+
+def _submit(fn: Callable[..., T], *args) -> "Future[T]":
+    """จองช่องในคิวแล้วส่งงานเข้าพูล (ช่องคืนเมื่องานจบ)"""
+    if not _SLOTS.acquire(timeout=SUBMIT_TIMEOUT_S):
+        _bump("rejected")
+        raise WorkerPoolBusy("bcrypt worker pool is saturated")
+
+    submitted_at = time.perf_counter()
+    with _LOCK:
+        _STATS["submitted"] += 1
+        _STATS["in_flight"] += 1
+        depth = _STATS["in_flight"] - _STATS["running"]
+        if depth > _STATS["max_queue_depth"]:
+            _STATS["max_queue_depth"] = depth
+
+    def _task():
+        started = time.perf_counter()
+        with _LOCK:
+            _STATS["running"] += 1
+            _STATS["wait_s_total"] += started - submitted_at
+        try:
+            return fn(*args)
+        finally:
+            with _LOCK:
+                _STATS["running"] -= 1
+                _STATS["run_s_total"] += time.perf_counter() - started
+
+    def _done(fut: Future) -> None:
+        with _LOCK:
+            _STATS["failed" if fut.cancelled() or fut.exception() is not None else "completed"] += 1
+            _STATS["in_flight"] -= 1
+        _SLOTS.release()
+
+    try:
+        fut = _executor().submit(_task)
+    except Exception:
+        _done_without_run()
+        raise
+    fut.add_done_callback(_done)
+    return fut
+
+
+def _done_without_run() -> None:
+    with _LOCK:
+        _STATS["failed"] += 1
+        _STATS["in_flight"] -= 1
+    _SLOTS.release()
+
+
+# ---------------------------------------------
+# PUBLIC API
+# ---------------------------------------------
+def run_in_pool(fn: Callable[..., T], *args) -> T:
+    """
+    รัน fn(*args) บน worker pool แล้วรอผล (thread ที่เรียกจะรอ แต่ CPU ถูกจำกัดที่ MAX_WORKERS)
+    - คิวเต็ม → รอได้ถึง SUBMIT_TIMEOUT_S แล้วโยน WorkerPoolBusy
+    - exception จาก fn ส่งต่อให้ผู้เรียกตามปกติ
+    """
+    return _submit(fn, *args).result()
+
+
+def map_in_pool(fn: Callable[[object], T], items: Iterable[object]) -> List[Tuple[Optional[T], Optional[Exception]]]:
+    """
+    รัน fn(item) ทุกตัวขนานกันบนพูล (งาน bulk เช่น hash รหัสผ่านจาก CSV)
+    - คืน [(ผลลัพธ์, None) | (None, exception)] เรียงตาม items → ผู้เรียกรายงานผลรายแถวได้
+    - ค้างในคิวพร้อมกันไม่เกิน MAX_WORKERS งาน → ล็อกอินของคนอื่นยังแทรกคิวได้ตลอด
+    """
+    window = threading.BoundedSemaphore(MAX_WORKERS)
+    futures: List[Optional[Future]] = []
+    errors: Dict[int, Exception] = {}
+    for i, item in enumerate(items):
+        window.acquire()
+        try:
+            fut = _submit(fn, item)
+        except WorkerPoolBusy as e:
+            window.release()
+            futures.append(None)
+            errors[i] = e
+            continue
+        fut.add_done_callback(lambda _f: window.release())
+        futures.append(fut)
+    out: List[Tuple[Optional[T], Optional[Exception]]] = []
+    for i, fut in enumerate(futures):
+        if fut is None:
+            out.append((None, errors[i]))
+            continue
+        try:
+            out.append((fut.result(), None))
+        except Exception as e:
+            out.append((None, e))
+    return out
+
+
+def pool_stats() -> Dict[str, float]:
+    """สถิติของพูล: queue_depth ปัจจุบัน, ค่าเฉลี่ยเวลารอคิว/เวลารัน (ms)"""
+    with _LOCK:
+        s = dict(_STATS)
+    done = max(1, s["completed"] + s["failed"])
+    s["queue_depth"] = s["in_flight"] - s["running"]
+    s["avg_wait_ms"] = s["wait_s_total"] / done * 1000.0
+    s["avg_run_ms"] = s["run_s_total"] / done * 1000.0
+    s["max_workers"] = MAX_WORKERS
+    s["max_queue"] = MAX_QUEUE
+    return s
@@ -0,0 +1,323 @@
+# benchmarks/bench_app.py
+"""
+Cold-start / first-render / rerun benchmark ของ streamlit_app.py (headless ผ่าน AppTest)
+
+วิธีใช้ (รันจาก root ของโปรเจกต์):
+    python benchmarks/bench_app.py --out bench_app.json
+    python benchmarks/bench_app.py --out new.json --compare bench_app.json --threshold 0.25
+
+- DB: ใช้ฐานข้อมูล local เท่านั้น (ห้ามชี้ไป production)
+    TAROT_BENCH_DB="postgresql+psycopg2://postgres@localhost/tarot_bench"
+  สคริปต์จะ stub st.secrets["neon"]["connection_string"] ด้วยค่านี้
+- ผลลัพธ์เป็น JSON: import times (-X importtime), first render ต่อเพจ (process ใหม่ทุกเพจ),
+  rerun latency ของ widget ที่ใช้บ่อย → เก็บเป็น baseline แล้ว --compare ระหว่าง commit ได้
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = "streamlit_app.py"
+DEFAULT_DB = "postgresql+psycopg2://postgres@localhost/tarot_bench"
+
+# เพจที่วัด + ต้องล็อกอินเป็น role อะไร (None = ผู้เยี่ยมชม)
+ROUTES: Dict[str, Optional[str]] = {
+    "home": None,
+    "knowledge": None,
+    "mm": None,
+    "port": "user",
+    "merlin": "admin",
+    "users": "admin",
+}
+
+# โมดูลที่วัด import time แยกทีละตัว (process ใหม่ทุกตัว)
+IMPORT_TARGETS = [
+    "streamlit", "auth", "home", "knowledge_index", "riskMoney_index",
+    "port_index", "merlin_index", "func",
+]
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _db_url() -> str:
+    return os.environ.get("TAROT_BENCH_DB", DEFAULT_DB)
+
+
+def _summary(samples_s: List[float]) -> Dict[str, float]:
+    ms = [x * 1000.0 for x in samples_s]
+    return {
+        "n": len(ms),
+        "median_ms": round(statistics.median(ms), 3),
+        "min_ms": round(min(ms), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+_BENCH_USERS: Dict[str, Dict] = {}
+
+
+def _bench_user(role: str) -> Dict:
+    """ผู้ใช้จริงใน DB ของ benchmark (session ถูกตรวจกับแคชผู้ใช้ → id ต้องมีอยู่จริง)"""
+    if role not in _BENCH_USERS:
+        import app_resources
+        import auth
+
+        if app_resources.peek("db_engine") is None:
+            auth.use_engine(auth.make_engine(_db_url()))
+        auth.ensure_users_table()
+        name = f"bench_{role}"
+        if auth.get_user(name) is None:
+            auth.create_user(name, "bench-password", role=role, expiry_at="2999-12-31")
+        u = auth.get_user(name)
+        _BENCH_USERS[role] = {"id": u["id"], "username": name, "role": role, "expiry_at": u["expiry_at"]}
+    return _BENCH_USERS[role]
+
+
+def _new_app(role: Optional[str]):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, APP_FILE), default_timeout=120)
+    at.secrets["neon"] = {"connection_string": _db_url()}
+    if role:
+        # ข้าม bcrypt ของการล็อกอิน — วัดเฉพาะการเรนเดอร์เพจ
+        at.session_state["auth"] = {"logged_in": True, "user": dict(_bench_user(role)), "at": None}
+    return at
+
+
+def _run_checked(at) -> None:
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].value}")
+
+
+def _find(widgets, label: str):
+    for w in widgets:
+        if getattr(w, "label", None) == label:
+            return w
+    raise LookupError(f"widget not found: {label!r}")
+
+
+# ============================================================
+# 1) Import times (-X importtime)
+# ============================================================
+def _parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """คืน {module: (self_us, cumulative_us)} จาก output ของ -X importtime"""
+    out: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        out[parts[2].strip()] = (self_us, cum_us)
+    return out
+
+
+def measure_imports(top: int = 10) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    for mod in IMPORT_TARGETS:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {mod}"],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        table = _parse_importtime(proc.stderr)
+        if proc.returncode != 0 or mod not in table:
+            results[mod] = {"error": (proc.stderr.strip().splitlines() or ["?"])[-1]}
+            continue
+        heaviest = sorted(table.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+        results[mod] = {
+            "cumulative_ms": round(table[mod][1] / 1000.0, 3),
+            "modules_loaded": len(table),
+            "heaviest_self_ms": {name: round(s / 1000.0, 3) for name, (s, _) in heaviest},
+        }
+    return results
+
+
+# ============================================================
+# 2) First render ต่อเพจ (process ใหม่ → cold จริง)
+# ============================================================
+def _first_render_worker(route: str) -> None:
+    """รันใน subprocess: เรนเดอร์เพจเดียวแล้วพิมพ์ JSON"""
+    t0 = time.perf_counter()
+    at = _new_app(ROUTES[route])
+    at.session_state["page"] = route
+    t1 = time.perf_counter()
+    _run_checked(at)
+    t2 = time.perf_counter()
+    _run_checked(at)
+    t3 = time.perf_counter()
+    print(json.dumps({
+        "setup_ms": round((t1 - t0) * 1000.0, 3),
+        "first_render_ms": round((t2 - t1) * 1000.0, 3),
+        "second_render_ms": round((t3 - t2) * 1000.0, 3),
+        "modules_loaded": len(sys.modules),
+    }))
+
+
+def measure_first_render(repeat: int) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    for route in ROUTES:
+        firsts, seconds, loaded = [], [], 0
+        error = None
+        for _ in range(repeat):
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--first-render-worker", route],
+                cwd=ROOT, capture_output=True, text=True, env=dict(os.environ, TAROT_WARMUP="0"),
+            )
+            if proc.returncode != 0:
+                error = (proc.stderr.strip().splitlines() or ["?"])[-1]
+                break
+            data = json.loads(proc.stdout.strip().splitlines()[-1])
+            firsts.append(data["first_render_ms"] / 1000.0)
+            seconds.append(data["second_render_ms"] / 1000.0)
+            loaded = data["modules_loaded"]
+        if error:
+            results[route] = {"error": error}
+        else:
+            results[route] = {
+                "first": _summary(firsts),
+                "second": _summary(seconds),
+                "modules_loaded": loaded,
+            }
+    return results
+
+
+# ============================================================
+# 3) Rerun latency ของ widget ที่ใช้บ่อย
+# ============================================================
+def _set_number(label: str, value: float) -> Callable:
+    def _act(at):
+        _find(at.number_input, label).set_value(value)
+    return _act
+
+
+def _click(label: str) -> Callable:
+    def _act(at):
+        _find(at.button, label).click()
+    return _act
+
+
+# (ชื่อ, เพจ, role, action ที่สลับค่าได้สองค่า)
+SCENARIOS: List[Tuple[str, str, Optional[str], Tuple[Callable, Callable]]] = [
+    ("home.rerun", "home", None, (lambda at: None, lambda at: None)),
+    ("mm.sizing.price", "mm", None, (_set_number("ราคา (USD)", 4000.0), _set_number("ราคา (USD)", 4010.0))),
+    ("mm.sizing.sl_tab", "mm", "user", (_click("📏 ระยะ SL → Lot"), _click("🧮 การออก Lot"))),
+    ("merlin.gtt.balance", "merlin", "admin", (_set_number("ทุน ($)", 10_000.0), _set_number("ทุน ($)", 12_000.0))),
+    ("port.rerun", "port", "user", (lambda at: None, lambda at: None)),
+]
+
+
+def measure_reruns(repeat: int) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    for name, route, role, (act_a, act_b) in SCENARIOS:
+        try:
+            at = _new_app(role)
+            at.session_state["page"] = route
+            _run_checked(at)
+            samples = []
+            for i in range(repeat):
+                (act_a if i % 2 == 0 else act_b)(at)
+                t0 = time.perf_counter()
+                _run_checked(at)
+                samples.append(time.perf_counter() - t0)
+            results[name] = _summary(samples)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    return results
+
+
+# ============================================================
+# Compare / main
+# ============================================================
+def _walk_metrics(d: Dict, prefix: str = "") -> Dict[str, float]:
+    """แบนค่าที่ลงท้าย _ms (ใช้ median/cumulative เป็นตัวแทน) เพื่อเทียบ baseline"""
+    flat: Dict[str, float] = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            flat.update(_walk_metrics(v, key))
+        elif k in ("median_ms", "cumulative_ms") and isinstance(v, (int, float)):
+            flat[key] = float(v)
+    return flat
+
+
+def compare(new: Dict, old: Dict, threshold: float) -> List[str]:
+    """คืนรายการที่ช้าลงเกิน threshold (เช่น 0.25 = ช้าลง 25%)"""
+    a, b = _walk_metrics(old.get("results", {})), _walk_metrics(new.get("results", {}))
+    regressions = []
+    for key in sorted(set(a) & set(b)):
+        base, cur = a[key], b[key]
+        change = (cur - base) / base if base > 0 else 0.0
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{key:<55} {base:>10.1f} → {cur:>10.1f} ms  {change:+7.1%} {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default="bench_app.json", help="ไฟล์ JSON ที่จะเขียนผล")
+    ap.add_argument("--repeat", type=int, default=5, help="จำนวนรอบต่อการวัด")
+    ap.add_argument("--skip", nargs="*", default=[], choices=["imports", "first_render", "reruns"])
+    ap.add_argument("--compare", help="baseline JSON เดิมสำหรับเทียบ")
+    ap.add_argument("--threshold", type=float, default=0.25, help="สัดส่วนที่ถือว่า regression")
+    ap.add_argument("--first-render-worker", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    out_path = os.path.abspath(args.out)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)  # แอปอ้าง assets/... แบบ relative
+
+    if args.first_render_worker:
+        _first_render_worker(args.first_render_worker)
+        return 0
+
+    results: Dict[str, Dict] = {}
+    if "imports" not in args.skip:
+        results["imports"] = measure_imports()
+    if "first_render" not in args.skip:
+        results["first_render"] = measure_first_render(args.repeat)
+    if "reruns" not in args.skip:
+        results["reruns"] = measure_reruns(max(2, args.repeat * 2))
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                            capture_output=True, text=True).stdout.strip()
+    report = {
+        "meta": {
+            "commit": commit or None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"wrote {out_path}")
+
+    if compare_path:
+        with open(compare_path, encoding="utf-8") as f:
+            old = json.load(f)
+        if compare(report, old, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# benchmarks/bench_auth_load.py
+"""
+Load test ของ auth API: ล็อกอิน / สร้างผู้ใช้ / ดูรายการผู้ใช้ พร้อมกันหลาย thread
+รายงาน latency p50/p95/p99 + throughput แยกตามชนิดงาน
+
+วิธีใช้ (ค่าเริ่มต้นเป็นไฟล์ SQLite ชั่วคราว — ไม่แตะฐาน production):
+    python benchmarks/bench_auth_load.py --concurrency 8 --ops 400
+    python benchmarks/bench_auth_load.py --db "postgresql+psycopg2://postgres@localhost/tarot_bench" \\
+        --seed-users 20000 --mix login=80,create=5,list=15 --json load.json
+
+- --bcrypt-cost: บังคับ cost (ค่าต่ำ → เห็นคอขวดของ DB/pool ชัดขึ้น, ไม่ใส่ = calibrate ตามเครื่อง)
+- ผู้ใช้ seed ใช้ hash เดียวกันทั้งหมด (hash ครั้งเดียว) และถูกสร้างครั้งเดียวต่อฐาน
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEED_PREFIX = "load_"
+SEED_PASS = "load-password"
+OPS = ("login", "create", "list")
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _percentile(sorted_ms: List[float], q: float) -> float:
+    """nearest-rank percentile (q = 0..100) ของ list ที่เรียงแล้ว"""
+    if not sorted_ms:
+        return 0.0
+    k = max(0, min(len(sorted_ms) - 1, int(round(q / 100.0 * len(sorted_ms) + 0.5)) - 1))
+    return sorted_ms[k]
+
+
+def _summary(samples_ms: List[float], errors: int, elapsed_s: float) -> Dict[str, float]:
+    xs = sorted(samples_ms)
+    return {
+        "n": len(xs),
+        "errors": errors,
+        "p50_ms": round(_percentile(xs, 50), 3),
+        "p95_ms": round(_percentile(xs, 95), 3),
+        "p99_ms": round(_percentile(xs, 99), 3),
+        "max_ms": round(xs[-1], 3) if xs else 0.0,
+        "throughput_per_s": round(len(xs) / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+    }
+
+
+def _parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPS:
+            raise SystemExit(f"unknown op in --mix: {name!r} (ใช้ได้: {', '.join(OPS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def seed_users(n: int) -> int:
+    """สร้าง load_0..load_{n-1} (ข้ามถ้ามีครบแล้ว) ด้วย hash เดียวกัน → seed เร็ว"""
+    from sqlalchemy import text
+    import auth
+
+    with auth.get_engine().connect() as c:
+        have = c.execute(
+            text("SELECT COUNT(*) FROM users WHERE username LIKE :p"), {"p": f"{SEED_PREFIX}%"}
+        ).scalar_one()
+    if have >= n:
+        return 0
+    pw_hash = auth._hash_password_sync(SEED_PASS)
+    sql = auth._sql()
+    rows = [{"u": f"{SEED_PREFIX}{i}", "p": pw_hash} for i in range(n)]
+    with auth.get_engine().begin() as conn:
+        conn.execute(
+            text(f"""
+                INSERT INTO users (username, password_hash, role, expiry_at)
+                VALUES (:u, :p, 'user', {sql.add_months(sql.now(), "1")})
+                ON CONFLICT (username) DO NOTHING
+            """),
+            rows
+        )
+    auth._invalidate_user_count()
+    return n - have
+
+
+# ============================================================
+# Load
+# ============================================================
+class LoadRun:
+    def __init__(self, seed_users: int, run_id: str):
+        self.seed_users = seed_users
+        self.run_id = run_id
+        self.samples: Dict[str, List[float]] = {op: [] for op in OPS}
+        self.errors: Dict[str, int] = {op: 0 for op in OPS}
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _op_login(self, rnd: random.Random) -> bool:
+        import auth
+
+        user, err = auth.verify_login(f"{SEED_PREFIX}{rnd.randrange(self.seed_users)}", SEED_PASS)
+        return user is not None and err is None
+
+    def _op_create(self, rnd: random.Random) -> bool:
+        import auth
+
+        with self._lock:
+            self._created += 1
+            n = self._created
+        return auth.create_user(f"{SEED_PREFIX}new_{self.run_id}_{n}", SEED_PASS)
+
+    def _op_list(self, rnd: random.Random) -> bool:
+        import auth
+
+        kind = rnd.randrange(3)
+        if kind == 0:
+            rows, _ = auth.list_users_page(after_id=rnd.randrange(self.seed_users))
+        elif kind == 1:
+            rows, _ = auth.list_users_page(prefix=f"{SEED_PREFIX}{rnd.randrange(100)}")
+        else:
+            rows, _ = auth.list_users_page(expiring_days=30)
+        return rows is not None
+
+    def one(self, op: str, seed: int) -> None:
+        rnd = random.Random(seed)
+        fn = getattr(self, f"_op_{op}")
+        t0 = time.perf_counter()
+        try:
+            ok = fn(rnd)
+        except Exception as e:
+            print(f"{op} error:", e)
+            ok = False
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            if ok:
+                self.samples[op].append(ms)
+            else:
+                self.errors[op] += 1
+
+
+def run_load(concurrency: int, ops: int, mix: Dict[str, float], seed_users: int, seed: int) -> Dict:
+    import auth
+    from auth_workers import pool_stats
+
+    rnd = random.Random(seed)
+    names = list(mix)
+    plan = rnd.choices(names, weights=[mix[n] for n in names], k=ops)
+    run = LoadRun(seed_users, run_id=f"{int(time.time())}_{os.getpid()}")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as ex:
+        for i, op in enumerate(plan):
+            ex.submit(run.one, op, seed + i)
+    elapsed = time.perf_counter() - t0
+
+    pool = auth.get_engine().pool
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total": _summary([x for op in OPS for x in run.samples[op]], sum(run.errors.values()), elapsed),
+        "ops": {op: _summary(run.samples[op], run.errors[op], elapsed) for op in OPS if op in mix},
+        "bcrypt_pool": {k: round(v, 3) for k, v in pool_stats().items()},
+        "db_pool": pool.status() if hasattr(pool, "status") else "",
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="SQLAlchemy URL (ค่าเริ่มต้น: SQLite ในโฟลเดอร์ชั่วคราว)")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--ops", type=int, default=200, help="จำนวนงานทั้งหมด")
+    ap.add_argument("--mix", default="login=70,create=10,list=20", help="สัดส่วนงาน")
+    ap.add_argument("--seed-users", type=int, default=2_000)
+    ap.add_argument("--bcrypt-cost", type=int, help="บังคับ bcrypt cost")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="เขียนผลเป็น JSON")
+    args = ap.parse_args(argv)
+
+    import auth
+
+    url = args.db or "sqlite:///" + os.path.join(tempfile.gettempdir(), "tarot_auth_load.sqlite")
+    auth.use_engine(auth.make_engine(url))
+    auth.ensure_users_table()
+    if args.bcrypt_cost:
+        auth._BCRYPT_COST = args.bcrypt_cost
+    added = seed_users(args.seed_users)
+
+    report = {
+        "meta": {
+            "db": auth._sql().name,
+            "concurrency": args.concurrency,
+            "ops": args.ops,
+            "mix": _parse_mix(args.mix),
+            "seed_users": args.seed_users,
+            "seeded_now": added,
+            "bcrypt_cost": auth.bcrypt_cost(),
+        },
+        "results": run_load(args.concurrency, args.ops, _parse_mix(args.mix), args.seed_users, args.seed),
+    }
+
+    res = report["results"]
+    print(f"db={report['meta']['db']} concurrency={args.concurrency} bcrypt_cost={report['meta']['bcrypt_cost']} "
+          f"elapsed={res['elapsed_s']}s")
+    print(f"{'op':<8}{'n':>7}{'err':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'ops/s':>10}")
+    for name, s in list(res["ops"].items()) + [("total", res["total"])]:
+        print(f"{name:<8}{s['n']:>7}{s['errors']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+              f"{s['p99_ms']:>10.1f}{s['throughput_per_s']:>10.1f}")
+    bp = res["bcrypt_pool"]
+    print(f"bcrypt pool: workers={bp['max_workers']:g} avg_wait={bp['avg_wait_ms']:.1f}ms "
+          f"avg_run={bp['avg_run_ms']:.1f}ms max_queue_depth={bp['max_queue_depth']:g}")
+    print(f"db pool: {res['db_pool']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if res["total"]["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# benchmarks/bench_bcrypt.py
+"""
+Micro-benchmark ของ bcrypt: เวลา hash / verify ต่อ cost บนเครื่องนี้ + cost ที่ calibrate ได้
+
+วิธีใช้:
+    python benchmarks/bench_bcrypt.py                    # cost 8..14
+    python benchmarks/bench_bcrypt.py --costs 10 11 12 13 --repeat 5 --target-ms 300
+    python benchmarks/bench_bcrypt.py --json bcrypt.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = b"bench-password-123"
+
+
+def bench_cost(cost: int, repeat: int) -> Dict[str, float]:
+    import bcrypt
+
+    hash_ms: List[float] = []
+    verify_ms: List[float] = []
+    hashed = b""
+    for _ in range(repeat):
+        salt = bcrypt.gensalt(rounds=cost)
+        t0 = time.perf_counter()
+        hashed = bcrypt.hashpw(PASSWORD, salt)
+        hash_ms.append((time.perf_counter() - t0) * 1000.0)
+        t0 = time.perf_counter()
+        ok = bcrypt.checkpw(PASSWORD, hashed)
+        verify_ms.append((time.perf_counter() - t0) * 1000.0)
+        assert ok
+    return {
+        "hash_median_ms": round(statistics.median(hash_ms), 2),
+        "hash_max_ms": round(max(hash_ms), 2),
+        "verify_median_ms": round(statistics.median(verify_ms), 2),
+        "verify_max_ms": round(max(verify_ms), 2),
+        "logins_per_core_per_s": round(1000.0 / statistics.median(verify_ms), 2),
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--costs", type=int, nargs="*", default=list(range(8, 15)))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--target-ms", type=float, default=None, help="ค่า target สำหรับ calibrate (ค่าเริ่มต้น = ของแอป)")
+    ap.add_argument("--json", help="เขียนผลเป็น JSON")
+    args = ap.parse_args(argv)
+
+    import auth
+
+    target = args.target_ms if args.target_ms is not None else auth.BCRYPT_TARGET_MS
+    rows = {}
+    print(f"{'cost':>4} {'hash ms':>10} {'verify ms':>10} {'login/s/core':>13}")
+    for cost in args.costs:
+        r = bench_cost(cost, args.repeat)
+        rows[cost] = r
+        print(f"{cost:>4} {r['hash_median_ms']:>10.1f} {r['verify_median_ms']:>10.1f} {r['logins_per_core_per_s']:>13.2f}")
+
+    chosen = auth.calibrate_bcrypt_cost(target)
+    print(f"calibrated cost for target {target:g} ms = {chosen} "
+          f"(policy: {max(auth.BCRYPT_MIN_COST, chosen - 1)}..{chosen})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"target_ms": target, "calibrated_cost": chosen, "costs": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# benchmarks/bench_gmk_parser.py
+"""
+Throughput ของ GMK signal parser (messages/s) — เทียบ parser เดิม (regex ทีละตัว) กับ tokenizer รอบเดียว
+
+วิธีใช้:
+    python benchmarks/bench_gmk_parser.py                        # 20,000 ข้อความสุ่ม
+    python benchmarks/bench_gmk_parser.py --messages 100000 --repeat 5
+    python benchmarks/bench_gmk_parser.py --file history.txt     # ประวัติจริง: คั่นข้อความด้วยบรรทัดว่าง
+    python benchmarks/bench_gmk_parser.py --json gmk.json
+
+- legacy : parse_gmk_signal แบบเดิม (คัดลอกไว้ในไฟล์นี้) เรียกทีละข้อความ
+- single : func.parse_gmk_signal ทีละข้อความ (ข้าม cache ด้วยข้อความไม่ซ้ำ)
+- batch  : func.parse_gmk_signals(messages) → ผลแบบคอลัมน์
+รายงานจำนวนข้อความที่ผลต่างจาก legacy ด้วย — รูปแบบมาตรฐาน (XAUUSD.mg M5 SELL @… / SL=… / TP1=…) ต้องตรงกัน
+ที่ต่างคือกรณีที่ legacy พาร์สไม่ได้: ทิศทางมาก่อน symbol (buy gold …) และ SL: 2538 (คั่นด้วย :)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# ---------------------------------------------
+# parser เดิม (ไว้เทียบความเร็ว/ผลลัพธ์)
+# ---------------------------------------------
+def legacy_parse(text: str) -> Dict[str, Optional[object]]:
+    from func import _DIR_ALIASES, _normalize_symbol
+
+    u = text.strip().upper()
+    m_sym = re.search(r"\b([A-Z]{3,10})(?:\.MG)?\b", u)
+    symbol = _normalize_symbol(m_sym.group(1)) if m_sym else None
+    m_tf = re.search(r"\b(M\d+|H\d+|D\d+|W\d+)\b", u)
+    timeframe = m_tf.group(1) if m_tf else None
+    direction = None
+    for k, v in _DIR_ALIASES.items():
+        if re.search(rf"\b{k}\b", u):
+            direction = v
+            break
+    m_entry = re.search(r"@\s*([0-9]+(?:\.[0-9]+)?)", u)
+    if m_entry:
+        entry = float(m_entry.group(1))
+    else:
+        m0 = re.search(r"\b([0-9]+(?:\.[0-9]+)?)\b", u)
+        entry = float(m0.group(1)) if m0 else None
+    msl = re.search(r"\bSL\s*=?\s*([0-9]+(?:\.[0-9]+)?)", u)
+    sl = float(msl.group(1)) if msl else None
+    tps = [float(x) for x in re.findall(r"\bTP\d+\s*=?\s*([0-9]+(?:\.[0-9]+)?)", u)]
+    if not tps:
+        tps = [float(x) for x in re.findall(r"\bTP\s*=?\s*([0-9]+(?:\.[0-9]+)?)", u)]
+    return {"symbol": symbol, "direction": direction, "entry": entry, "sl": sl, "tps": tps, "timeframe": timeframe}
+
+
+# ---------------------------------------------
+# ข้อมูลทดสอบ
+# ---------------------------------------------
+def make_messages(n: int, seed: int = 7) -> List[str]:
+    """สุ่มสัญญาณหลายรูปแบบ (ตามที่เจอในช่อง) — ราคาไม่ซ้ำกันเพื่อไม่ให้ cache ช่วย"""
+    rnd = random.Random(seed)
+    out: List[str] = []
+    for i in range(n):
+        sym, base = rnd.choice([("XAUUSD.mg", 3700.0), ("XAUUSD", 3700.0), ("GOLD", 2400.0), ("BTCUSD", 65000.0)])
+        side = rnd.choice(["BUY", "SELL"])
+        tf = rnd.choice(["M1", "M5", "M15", "H1", "H4"])
+        entry = round(base + rnd.uniform(-200, 200) + i * 1e-4, 2)
+        sgn = 1 if side == "BUY" else -1
+        sl = round(entry - sgn * rnd.uniform(5, 20), 2)
+        tps = [round(entry + sgn * k * rnd.uniform(2, 5), 2) for k in range(1, rnd.randint(1, 6) + 1)]
+        style = rnd.random()
+        if style < 0.55:
+            lines = [f"{sym} {tf} {side} @{entry}", f"SL={sl}"] + [f"TP{k}={v}" for k, v in enumerate(tps, 1)]
+        elif style < 0.65:
+            # SL ติดกับค่า + จุดท้ายประโยค
+            lines = [f"{sym} {side} {entry}", f"SL{sl}"] + [f"TP{k}={v}." for k, v in enumerate(tps, 1)]
+        elif style < 0.85:
+            lines = [f"{side.lower()} {sym.lower()} now {entry}", f"sl {sl}"] + [f"tp {v}" for v in tps]
+        else:
+            lines = [f"🔥 {sym} {side} NOW @ {entry} 🔥", f"SL: {sl}"] + [f"TP{k} {v}" for k, v in enumerate(tps, 1)]
+        out.append("\n".join(lines))
+    return out
+
+
+# กรณีที่ต้องได้ค่าตามนี้เสมอ (legacy เองก็ผิดบางกรณี เช่น TP2360 → [0.0] จึงเทียบกับค่าที่คาดไว้แทน)
+EXPECTED_CASES: List[tuple] = [
+    ("XAUUSD BUY 2350 SL2340 TP2360", {"symbol": "XAUUSD", "direction": "LONG", "entry": 2350.0, "sl": 2340.0,
+                                       "tps": [2360.0], "timeframe": None}),
+    ("TP1=2360.5.", {"symbol": None, "direction": None, "entry": 2360.5, "sl": None, "tps": [2360.5], "timeframe": None}),
+    ("GOLD SELL 2350. SL 2360. TP 2340.", {"symbol": "XAUUSD", "direction": "SHORT", "entry": 2350.0, "sl": 2360.0,
+                                           "tps": [2340.0], "timeframe": None}),
+    ("XAUUSD.mg M5 SELL @3774.03\nSL=3785.34\nTP1=3771.77\nTP2=3769.5.",
+     {"symbol": "XAUUSD", "direction": "SHORT", "entry": 3774.03, "sl": 3785.34, "tps": [3771.77, 3769.5],
+      "timeframe": "M5"}),
+    # entry เป็นช่วงราคา → ใช้ตัวเลขแรกของช่วง (ไม่ไหลไปเอา SL มาเป็น entry)
+    ("XAUUSD BUY @2350-2345\nSL=2340\nTP1=2360", {"symbol": "XAUUSD", "direction": "LONG", "entry": 2350.0,
+                                                   "sl": 2340.0, "tps": [2360.0], "timeframe": None}),
+    ("GOLD SELL 2350/2355 SL 2360 TP 2340", {"symbol": "XAUUSD", "direction": "SHORT", "entry": 2350.0, "sl": 2360.0,
+                                             "tps": [2340.0], "timeframe": None}),
+]
+
+
+def load_messages(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [m.strip() for m in f.read().split("\n\n") if m.strip()]
+
+
+# ---------------------------------------------
+# วัด
+# ---------------------------------------------
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs)
+
+
+def _same(a: Dict, b: Dict) -> bool:
+    for k in ("symbol", "direction", "timeframe", "sl", "entry"):
+        x, y = a.get(k), b.get(k)
+        if isinstance(x, float) and isinstance(y, float) and math.isnan(x) and math.isnan(y):
+            continue
+        if x != y:
+            return False
+    return list(a.get("tps") or []) == list(b.get("tps") or [])
+
+
+def main(argv: Optional[list] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=20_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--file", help="ไฟล์ประวัติสัญญาณ (คั่นข้อความด้วยบรรทัดว่าง)")
+    ap.add_argument("--json", help="เขียนผลเป็น JSON")
+    args = ap.parse_args(argv)
+
+    import func
+
+    msgs = load_messages(args.file) if args.file else make_messages(args.messages)
+    n = len(msgs)
+    if n == 0:
+        print("ไม่มีข้อความ")
+        return 1
+
+    t_legacy = _time(lambda: [legacy_parse(m) for m in msgs], args.repeat)
+    t_single = _time(lambda: [func._gmk_scan(m.strip().upper()) for m in msgs], args.repeat)
+    t_batch = _time(lambda: func.parse_gmk_signals(msgs), args.repeat)
+
+    cols = func.parse_gmk_signals(msgs)
+    diff = 0
+    for i, m in enumerate(msgs):
+        row = {k: cols[k][i] for k in ("symbol", "direction", "timeframe", "tps")}
+        row["entry"] = None if math.isnan(cols["entry"][i]) else float(cols["entry"][i])
+        row["sl"] = None if math.isnan(cols["sl"][i]) else float(cols["sl"][i])
+        if not _same(row, legacy_parse(m)):
+            diff += 1
+
+    failed = [m for m, want in EXPECTED_CASES if not _same(func.parse_gmk_signal(m), want)]
+    for m in failed:
+        print("ผลไม่ตรงที่คาด:", repr(m), func.parse_gmk_signal(m))
+
+    report = {
+        "messages": n,
+        "legacy_msgs_per_s": round(n / t_legacy),
+        "single_msgs_per_s": round(n / t_single),
+        "batch_msgs_per_s": round(n / t_batch),
+        "speedup_batch_vs_legacy": round(t_legacy / t_batch, 2),
+        "differs_from_legacy": diff,
+        "expected_case_failures": len(failed),
+    }
+    for k, v in report.items():
+        print(f"{k:>26}: {v:,}" if isinstance(v, int) else f"{k:>26}: {v}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
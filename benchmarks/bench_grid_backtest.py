@@ -0,0 +1,102 @@
+# benchmarks/bench_grid_backtest.py
+"""
+ความเร็วของ grid_backtest.backtest_grid บนข้อมูล M1 ยาว ๆ (ค่าเริ่มต้น ≈ 10 ปี)
+
+วิธีใช้:
+    python benchmarks/bench_grid_backtest.py                          # M1 สุ่ม 10 ปี (ราว 3.7 ล้านแท่ง)
+    python benchmarks/bench_grid_backtest.py --years 2 --spacing 200 --orders 40
+    python benchmarks/bench_grid_backtest.py --file XAUUSD_M1.csv     # ไฟล์จริง (date/time + high/low/close)
+    python benchmarks/bench_grid_backtest.py --json grid.json
+
+ข้อมูลสุ่ม: random walk แบบทองคำ (เริ่ม 1,200 ปิดตลาดเสาร์-อาทิตย์) — ใช้วัดความเร็ว ไม่ใช่ผลการเทรด
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# ---------------------------------------------
+# ข้อมูลทดสอบ
+# ---------------------------------------------
+def make_m1(years: float, seed: int = 11, start_price: float = 1200.0) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(np.datetime64("2015-01-05T00:00"), np.datetime64("2015-01-05T00:00") + int(years * 365 * 1440),
+                        dtype="datetime64[m]")
+    weekday = (minutes.astype("datetime64[D]").view("int64") + 3) % 7     # 0 = จันทร์
+    minutes = minutes[weekday < 5]
+    n = minutes.size
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0, 0.00035, n)))
+    wick = np.abs(rng.normal(0.0, 0.00025, (2, n))) * close
+    return {"date": minutes.astype("datetime64[ns]"), "high": close + wick[0], "low": close - wick[1], "close": close}
+
+
+def load_file(path: str) -> Dict[str, np.ndarray]:
+    import pandas as pd
+    from func import ensure_ohlc_derived_columns
+    df = ensure_ohlc_derived_columns(pd.read_csv(path))
+    return {c: df[c].to_numpy() for c in ("date", "high", "low", "close")}
+
+
+# ---------------------------------------------
+# วัด
+# ---------------------------------------------
+def main(argv: Optional[list] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--years", type=float, default=10.0)
+    ap.add_argument("--file", help="CSV OHLC (M1)")
+    ap.add_argument("--side", default="LONG", choices=["LONG", "SHORT"])
+    ap.add_argument("--spacing", type=float, default=500, help="points")
+    ap.add_argument("--tp", type=float, default=None, help="points (ค่าเริ่มต้น = spacing)")
+    ap.add_argument("--orders", type=int, default=None, help="จำนวนไม้ (ค่าเริ่มต้น = ทุกระดับที่ราคาไปถึง)")
+    ap.add_argument("--balance", type=float, default=10_000.0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", help="เขียนผลเป็น JSON")
+    args = ap.parse_args(argv)
+
+    from grid_backtest import backtest_grid
+
+    t0 = time.perf_counter()
+    data = load_file(args.file) if args.file else make_m1(args.years)
+    t_load = time.perf_counter() - t0
+    n = data["close"].size
+
+    runs, res = [], None
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        res = backtest_grid(data["high"], data["low"], data["close"], args.spacing, args.side,
+                            n_orders=args.orders, tp_points=args.tp, balance=args.balance, stop_out_pct=None)
+        runs.append(time.perf_counter() - t0)
+    t_run = statistics.median(runs)
+
+    s = res["summary"]
+    report = {
+        "bars": n,
+        "levels": s["levels"],
+        "trades": s["trades"],
+        "load_s": round(t_load, 2),
+        "backtest_s": round(t_run, 3),
+        "bars_per_s": round(n / t_run),
+        "max_open_orders": s["max_open_orders"],
+        "realized_pnl": round(s["realized_pnl"], 2),
+    }
+    for k, v in report.items():
+        print(f"{k:>16}: {v:,}" if isinstance(v, int) else f"{k:>16}: {v}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# benchmarks/bench_login_roundtrips.py
+"""
+นับ round trip ต่อการล็อกอิน 1 ครั้ง (เทียบ path ใหม่กับ path เดิม)
+
+วิธีใช้ (ฐานข้อมูล local เท่านั้น):
+    TAROT_BENCH_DB="postgresql+psycopg2://postgres@localhost/tarot_bench" \\
+        python benchmarks/bench_login_roundtrips.py --logins 50
+
+- new    : auth.verify_login → get_login_row (1 statement, AUTOCOMMIT) บน engine ของแอป (ไม่มี pre-ping)
+- legacy : get_user + is_expired (SELECT NOW() > :e) บน engine ที่เปิด pool_pre_ping=True แบบเดิม
+นับจาก event ของ SQLAlchemy: statement, BEGIN/COMMIT/ROLLBACK (เฉพาะที่ไม่ใช่ AUTOCOMMIT), pre-ping
+และ connect ใหม่ (handshake TLS/auth แยกรายงาน เพราะพูลอุ่นแล้วไม่ควรเกิด)
+exit code 1 ถ้า path ใหม่ใช้เกิน --max-rt round trip ต่อการล็อกอิน
+ต้องมี Postgres — check แบบไม่ต้องมี server (1 query/ล็อกอิน, ไม่มี pre-ping บน SQLite) อยู่ที่
+tests/test_login_roundtrips.py (python -m pytest -q tests)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_DB = "postgresql+psycopg2://postgres@localhost/tarot_bench"
+BENCH_USER = "bench_login_user"
+BENCH_PASS = "bench-password"
+
+
+class RoundTripCounter:
+    """ผูก event กับ engine แล้วนับสิ่งที่วิ่งไป server จริง"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.counts: Counter = Counter()
+        event.listen(engine, "before_cursor_execute", self._on_stmt)
+        event.listen(engine, "begin", self._txn("begin"))
+        event.listen(engine, "commit", self._txn("commit"))
+        event.listen(engine, "rollback", self._txn("rollback"))
+        event.listen(engine.pool, "connect", self._on_connect)
+        event.listen(engine.pool, "checkout", self._on_checkout)
+
+        dialect = engine.dialect
+        orig_ping = dialect.do_ping
+
+        def _counting_ping(dbapi_connection):
+            self.counts["ping"] += 1
+            return orig_ping(dbapi_connection)
+
+        dialect.do_ping = _counting_ping  # pool pre-ping ไม่ผ่าน cursor event → นับตรงนี้
+
+    def _on_stmt(self, conn, cursor, statement, parameters, context, executemany):
+        self.counts["statement"] += 1
+
+    def _txn(self, name: str) -> Callable:
+        def _handler(conn):
+            if conn.get_execution_options().get("isolation_level") == "AUTOCOMMIT":
+                return  # driver ไม่ส่งอะไรไป server
+            self.counts[name] += 1
+        return _handler
+
+    def _on_connect(self, dbapi_connection, record):
+        self.counts["connect"] += 1
+
+    def _on_checkout(self, dbapi_connection, record, proxy):
+        self.counts["checkout"] += 1
+
+    def reset(self) -> None:
+        self.counts.clear()
+
+    def round_trips(self) -> int:
+        c = self.counts
+        return c["statement"] + c["ping"] + c["begin"] + c["commit"] + c["rollback"]
+
+
+def _run(label: str, engine, login: Callable[[], bool], n: int) -> Dict:
+    import auth
+
+    auth.use_engine(engine)
+    counter = RoundTripCounter(engine)
+    login()              # อุ่นพูล (ไม่นับ)
+    counter.reset()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        if not login():
+            raise RuntimeError(f"{label}: login failed")
+    elapsed = time.perf_counter() - t0
+    per = {k: v / n for k, v in sorted(counter.counts.items())}
+    return {
+        "round_trips_per_login": counter.round_trips() / n,
+        "events_per_login": per,
+        "mean_login_ms": elapsed / n * 1000.0,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--logins", type=int, default=20)
+    ap.add_argument("--max-rt", type=float, default=1.0, help="round trip สูงสุดที่ยอมรับของ path ใหม่")
+    ap.add_argument("--json", help="เขียนผลเป็น JSON")
+    args = ap.parse_args(argv)
+
+    from sqlalchemy import create_engine
+    import auth
+    import event_log
+
+    event_log.EVENTS_ENABLED = False   # flusher เขียน event เบื้องหลัง — ไม่ใช่ round trip ของการล็อกอิน
+
+    url = os.environ.get("TAROT_BENCH_DB", DEFAULT_DB)
+    auth.use_engine(auth.make_engine(url))
+    auth.ensure_users_table()
+    if auth.get_user(BENCH_USER) is None:
+        auth.create_user(BENCH_USER, BENCH_PASS, role="user")  # หมดอายุ +1 เดือน → is_expired ต้องถาม DB ใน path เดิม
+    auth.get_engine().dispose()
+
+    def _new_login() -> bool:
+        user, err = auth.verify_login(BENCH_USER, BENCH_PASS)
+        return user is not None and err is None
+
+    def _legacy_login() -> bool:
+        u = auth.get_user(BENCH_USER)
+        if not u or not auth._check_password(BENCH_PASS, u["password_hash"]):
+            return False
+        return not auth.is_expired(u)  # แถวจาก get_user ไม่มี is_expired → SELECT NOW() > :e
+
+    results = {
+        "new": _run("new", auth.make_engine(url), _new_login, args.logins),
+        "legacy": _run("legacy", create_engine(url, pool_pre_ping=True), _legacy_login, args.logins),
+    }
+
+    for name, r in results.items():
+        ev = ", ".join(f"{k}={v:g}" for k, v in r["events_per_login"].items())
+        print(f"{name:<7} round trips/login = {r['round_trips_per_login']:g}   ({ev})   "
+              f"mean {r['mean_login_ms']:.1f} ms (รวม bcrypt)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    ok = results["new"]["round_trips_per_login"] <= args.max_rt
+    print("PASS" if ok else f"FAIL: new login path > {args.max_rt:g} round trips")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
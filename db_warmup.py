@@ -0,0 +1,142 @@
+# db_warmup.py
+from __future__ import annotations
+
+import datetime
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+READY_TIMEOUT_S = 30.0           # เพจที่ต้องใช้ DB รอ warm-up ได้นานสุดเท่านี้ (Neon cold start ~ไม่กี่วินาที)
+RETRY_AFTER_S = 15.0             # warm-up ล้มเหลว → rerun ของหน้าสาธารณะลองใหม่ได้ไม่ถี่กว่านี้
+
+# keep-warm: ping ให้ Neon ไม่ suspend (ค่าเริ่มต้น suspend เมื่อว่าง ~5 นาที) เฉพาะช่วงตลาดเปิด
+KEEPWARM_ENABLED = os.environ.get("TAROT_KEEPWARM", "1").strip().lower() not in ("0", "false", "no", "off")
+KEEPWARM_INTERVAL_S = 120.0
+# สัปดาห์เทรด FX/ทองคำ (UTC): เปิด อาทิตย์ 21:00 → ปิด ศุกร์ 22:00  (weekday: จันทร์=0 … อาทิตย์=6)
+MARKET_OPEN_UTC = (6, 21)
+MARKET_CLOSE_UTC = (4, 22)
+
+# ---------------------------------------------
+# STATE (ระดับ process)
+# ---------------------------------------------
+_LOCK = threading.Lock()
+_READY = threading.Event()
+_WARM_THREAD: Optional[threading.Thread] = None
+_PING_THREAD: Optional[threading.Thread] = None
+_STATUS: Dict[str, object] = {
+    "warm_ms": None, "error": None, "attempts": 0, "failed_at": 0.0,
+    "pings": 0, "ping_errors": 0, "last_ping": None,
+}
+
+
+def in_trading_hours(now: Optional[datetime.datetime] = None) -> bool:
+    """ตลาดเปิดอยู่ไหม (ตามเวลา UTC ของ MARKET_OPEN_UTC/MARKET_CLOSE_UTC)"""
+    now = now or datetime.datetime.utcnow()
+    wd, hr = now.weekday(), now.hour
+    open_wd, open_hr = MARKET_OPEN_UTC
+    close_wd, close_hr = MARKET_CLOSE_UTC
+    if wd == open_wd:
+        return hr >= open_hr
+    if wd == close_wd:
+        return hr < close_hr
+    return wd < close_wd   # จันทร์–พฤหัส เปิดทั้งวัน, เสาร์ปิด
+
+
+# ---------------------------------------------
+# WARM-UP
+# ---------------------------------------------
+def _warm() -> None:
+    import auth   # import ตอนใช้: เพจสาธารณะไม่ต้องรอ SQLAlchemy/driver
+
+    t0 = time.perf_counter()
+    try:
+        auth.ensure_users_table()     # migrations (ครั้งเดียวต่อ process)
+        auth.ensure_initial_admin()   # จำ "มีผู้ใช้แล้ว" ไว้ในหน่วยความจำ
+        auth.ping_db()                # มี connection อุ่นอยู่ในพูลแล้ว
+    except Exception as e:
+        _STATUS["error"] = str(e)
+        _STATUS["failed_at"] = time.time()
+        print("db warm-up error:", e)
+        return
+    _STATUS["warm_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+    _STATUS["error"] = None
+    _READY.set()
+    _start_keep_warm()
+
+
+def start(force: bool = False) -> None:
+    """
+    เริ่ม warm-up DB ใน background (ไม่บล็อก) — เรียกทุก rerun ได้
+    ครั้งก่อนล้มเหลว → ลองใหม่เมื่อพ้น RETRY_AFTER_S (force=True: ลองทันที เช่นหน้า login)
+    """
+    global _WARM_THREAD
+    if _READY.is_set():
+        return
+    with _LOCK:
+        if _READY.is_set() or (_WARM_THREAD is not None and _WARM_THREAD.is_alive()):
+            return
+        if not force and time.time() - float(_STATUS["failed_at"]) < RETRY_AFTER_S:
+            return
+        _STATUS["attempts"] = int(_STATUS["attempts"]) + 1
+        _WARM_THREAD = threading.Thread(target=_warm, name="tt-db-warmup", daemon=True)
+        _WARM_THREAD.start()
+
+
+def is_ready() -> bool:
+    return _READY.is_set()
+
+
+def wait_ready(timeout_s: float = READY_TIMEOUT_S) -> bool:
+    """รอจน DB พร้อม (สำหรับหน้า login/private) — คืน False ถ้าหมดเวลาหรือ warm-up ล้มเหลว"""
+    start(force=True)
+    deadline = time.monotonic() + timeout_s
+    while not _READY.is_set():
+        thread = _WARM_THREAD
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if thread is not None and not thread.is_alive():
+            return False   # ล้มเหลวรอบนี้ (rerun ถัดไปเรียก start() ลองใหม่)
+        _READY.wait(timeout=min(remaining, 0.25))
+    return True
+
+
+def status() -> Dict[str, object]:
+    s = dict(_STATUS)
+    s["ready"] = _READY.is_set()
+    s["keep_warm"] = bool(_PING_THREAD and _PING_THREAD.is_alive())
+    s["trading_hours"] = in_trading_hours()
+    return s
+
+
+# ---------------------------------------------
+# KEEP-WARM
+# ---------------------------------------------
+def _keep_warm_loop() -> None:
+    import auth
+
+    while True:
+        time.sleep(KEEPWARM_INTERVAL_S)
+        if not in_trading_hours():
+            continue   # นอกเวลาตลาด ปล่อยให้ Neon suspend ได้ (ประหยัด compute)
+        try:
+            auth.ping_db()
+            _STATUS["pings"] = int(_STATUS["pings"]) + 1
+            _STATUS["last_ping"] = datetime.datetime.utcnow().isoformat(timespec="seconds")
+        except Exception as e:
+            _STATUS["ping_errors"] = int(_STATUS["ping_errors"]) + 1
+            print("db keep-warm error:", e)
+
+
+def _start_keep_warm() -> None:
+    global _PING_THREAD
+    if not KEEPWARM_ENABLED:
+        return
+    with _LOCK:
+        if _PING_THREAD is None:
+            _PING_THREAD = threading.Thread(target=_keep_warm_loop, name="tt-db-keepwarm", daemon=True)
+            _PING_THREAD.start()
@@ -0,0 +1,156 @@
+# event_log.py
+from __future__ import annotations
+
+import atexit
+import collections
+import datetime
+import os
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+QUEUE_MAX = 10_000          # event ที่ค้างในหน่วยความจำได้สูงสุด (เกินนี้ทิ้ง + นับ dropped)
+FLUSH_INTERVAL_S = 5.0      # flusher เขียนลง DB อย่างน้อยทุก ๆ เท่านี้
+FLUSH_BATCH = 500           # หรือทันทีเมื่อค้างครบเท่านี้ (และเขียนทีละไม่เกินเท่านี้ต่อ statement)
+SHUTDOWN_FLUSH_S = 3.0      # ตอนปิด process ใช้เวลาเขียนของค้างได้นานสุดเท่านี้
+
+# ปิดได้ด้วย env: TAROT_EVENTS=0
+EVENTS_ENABLED = os.environ.get("TAROT_EVENTS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+# (ts UTC, kind, username, page, detail)
+Event = Tuple[datetime.datetime, str, Optional[str], Optional[str], Optional[str]]
+
+# ---------------------------------------------
+# STATE (ระดับ process)
+# ---------------------------------------------
+_QUEUE: Deque[Event] = collections.deque()
+_COND = threading.Condition()
+_THREAD: Optional[threading.Thread] = None
+_FLUSH_LOCK = threading.Lock()      # flusher กับ flush ตอน shutdown ไม่เขียนซ้อนกัน
+_STATS: Dict[str, float] = {
+    "enqueued": 0, "written": 0, "dropped": 0, "requeued": 0,
+    "batches": 0, "flush_errors": 0, "last_flush_ms": 0.0, "max_queued": 0,
+}
+
+
+def _clip(value: Optional[str], n: int) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value)
+    return value if len(value) <= n else value[:n]
+
+
+# ---------------------------------------------
+# PUBLIC API
+# ---------------------------------------------
+def log_event(kind: str, username: Optional[str] = None, page: Optional[str] = None,
+              detail: Optional[str] = None) -> bool:
+    """
+    บันทึก event แบบไม่รอ DB (แค่ต่อคิวในหน่วยความจำ) — เรียกจาก rerun ได้เลย
+    - คิวเต็ม → ทิ้ง event นี้และนับ dropped (ไม่บล็อก UI เด็ดขาด)
+    - คืน True ถ้าเข้าคิว
+    """
+    if not EVENTS_ENABLED:
+        return False
+    ev: Event = (
+        datetime.datetime.utcnow(), _clip(kind, 32), _clip(username, 64), _clip(page, 64), _clip(detail, 200)
+    )
+    with _COND:
+        if len(_QUEUE) >= QUEUE_MAX:
+            _STATS["dropped"] += 1
+            return False
+        _QUEUE.append(ev)
+        _STATS["enqueued"] += 1
+        if len(_QUEUE) > _STATS["max_queued"]:
+            _STATS["max_queued"] = len(_QUEUE)
+        if len(_QUEUE) >= FLUSH_BATCH:
+            _COND.notify()
+    _ensure_flusher()
+    return True
+
+
+def flush(timeout_s: Optional[float] = None) -> int:
+    """เขียน event ที่ค้างทั้งหมดลง DB ตอนนี้ (คืนจำนวนที่เขียนได้) — ใช้ตอน shutdown/ทดสอบ"""
+    deadline = None if timeout_s is None else time.monotonic() + timeout_s
+    written = 0
+    while deadline is None or time.monotonic() < deadline:
+        n = _flush_once()
+        if n <= 0:
+            break
+        written += n
+    return written
+
+
+def stats() -> Dict[str, float]:
+    with _COND:
+        s = dict(_STATS)
+        s["queued"] = len(_QUEUE)
+    s["queue_max"] = QUEUE_MAX
+    s["flusher_alive"] = bool(_THREAD and _THREAD.is_alive())
+    return s
+
+
+# ---------------------------------------------
+# FLUSHER
+# ---------------------------------------------
+def _take_batch() -> List[Event]:
+    with _COND:
+        n = min(len(_QUEUE), FLUSH_BATCH)
+        return [_QUEUE.popleft() for _ in range(n)]
+
+
+def _requeue(batch: List[Event]) -> None:
+    """เขียนไม่สำเร็จ → คืนเข้าหัวคิว (ลองใหม่รอบหน้า) เท่าที่ยังมีที่ว่าง ที่เหลือทิ้ง"""
+    with _COND:
+        room = max(0, QUEUE_MAX - len(_QUEUE))
+        keep = batch[:room]
+        _QUEUE.extendleft(reversed(keep))
+        _STATS["requeued"] += len(keep)
+        _STATS["dropped"] += len(batch) - len(keep)
+
+
+def _flush_once() -> int:
+    """เขียน 1 batch (คืนจำนวนที่เขียน, 0 = คิวว่าง, -1 = ล้มเหลว)"""
+    with _FLUSH_LOCK:
+        batch = _take_batch()
+        if not batch:
+            return 0
+        t0 = time.perf_counter()
+        try:
+            import auth   # import ตอนใช้ (auth ก็เรียก log_event)
+            auth.insert_events(batch)
+        except Exception as e:
+            print("event_log flush error:", e)
+            _requeue(batch)
+            with _COND:
+                _STATS["flush_errors"] += 1
+            return -1
+        with _COND:
+            _STATS["written"] += len(batch)
+            _STATS["batches"] += 1
+            _STATS["last_flush_ms"] = (time.perf_counter() - t0) * 1000.0
+        return len(batch)
+
+
+def _flusher_loop() -> None:
+    while True:
+        with _COND:
+            if len(_QUEUE) < FLUSH_BATCH:
+                _COND.wait(timeout=FLUSH_INTERVAL_S)
+        while _flush_once() > 0:
+            pass
+        # ล้มเหลว (-1) → รอรอบถัดไปตาม FLUSH_INTERVAL_S (ไม่วนถี่ใส่ DB ที่ล่มอยู่)
+
+
+def _ensure_flusher() -> None:
+    global _THREAD
+    if _THREAD is not None:
+        return
+    with _COND:
+        if _THREAD is None:
+            _THREAD = threading.Thread(target=_flusher_loop, name="tt-events", daemon=True)
+            _THREAD.start()
+            atexit.register(flush, SHUTDOWN_FLUSH_S)
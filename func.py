@@ -1,17 +1,21 @@
 # func.py
 from __future__ import annotations
 
-import os
+import datetime as _dt
+import math
 import re
-import base64
-import mimetypes
+import threading
+import time
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import streamlit as st
 
+import app_resources
+from asset_cache import image_data_uri
 
 # ============================================================
 # UI Helpers
@@ -19,20 +23,8 @@ import streamlit as st
 
 def show_centered_image(path: str, caption: Optional[str] = None, width: int = 480) -> None:
     """แสดงรูปกึ่งกลาง + แคปชันกึ่งกลาง (กรณีไม่พบไฟล์จะแสดง placeholder)"""
-    def _data_uri(p: str) -> str:
-        mime, _ = mimetypes.guess_type(p)
-        if mime is None:
-            ext = os.path.splitext(p)[1].lower()
-            mime = {
-                ".jpg": "image/jpeg", ".jpeg": "image/jpeg",
-                ".png": "image/png", ".gif": "image/gif", ".webp": "image/webp",
-            }.get(ext, "image/jpeg")
-        with open(p, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode("utf-8")
-        return f"data:{mime};base64,{b64}"
-
-    if path and os.path.exists(path):
-        src = _data_uri(path)
+    src = image_data_uri(path, width=width) if path else None
+    if src:
         img_html = (
             f"<img src='{src}' width='{width}' "
             "style='display:block;margin:0 auto;border-radius:8px;'/>"
@@ -122,6 +114,7 @@ class SymbolSpec:
     lot_step: float = 0.01
     price_point: float = 0.01      # 1 point = เท่ากับกี่หน่วยราคา
     pip_points: int = 10           # 1 pip = กี่ points
+    max_lot: Optional[float] = None  # เพดาน lot ต่อออเดอร์ของโบรก (None = ไม่จำกัด)
 
 
 XAUUSD_SPEC = SymbolSpec(
@@ -152,34 +145,109 @@ SYMBOL_PRESETS: Dict[str, SymbolSpec] = {
 # Data fetch (optional)
 # ============================================================
 
+PROXY_TICKERS: Dict[str, str] = {"XAUUSD": "XAUT-USD"}
+
+
+def _new_http_session():
+    """HTTP session เดียวของ process (connection pool/cookie ใช้ซ้ำข้าม session ของผู้ใช้)"""
+    try:
+        from curl_cffi import requests as curl_requests   # yfinance รุ่นใหม่ใช้ curl_cffi
+        return curl_requests.Session(impersonate="chrome")
+    except Exception:
+        import requests
+        return requests.Session()
+
+
+PRICE_TTL_S = 30.0   # ราคาที่ดึงแล้วใช้ซ้ำได้กี่วินาที (หลังจากนั้นดึงใหม่)
+
+
+class _PriceClients:
+    """
+    แคชราคาล่าสุดต่อสัญลักษณ์ (price, เวลา) อายุ PRICE_TTL_S วินาที
+    - ไม่เก็บ yf.Ticker ไว้: Ticker แคช fast_info ในตัวเอง → ถ้าใช้ตัวเดิมตลอดจะได้ราคาแรกตลอดไป
+    - สร้าง Ticker ใหม่ทุกครั้งที่ดึงจริง และขอ http_session จาก app_resources ตอนนั้น
+      (reset http_session จากแท็บ Resources แล้วครั้งถัดไปใช้ session ใหม่ทันที)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self.lookups = 0
+        self.fetches = 0
+        self.errors = 0
+
+    def ticker(self, symbol: str):
+        import yfinance as yf
+        return yf.Ticker(symbol, session=app_resources.get("http_session"))
+
+    def cached(self, symbol: str, ttl: float = PRICE_TTL_S) -> Optional[float]:
+        hit = self._prices.get(symbol)
+        if hit is not None and time.monotonic() - hit[1] < ttl:
+            return hit[0]
+        return None
+
+    def remember(self, symbol: str, price: float) -> None:
+        with self._lock:
+            self._prices[symbol] = (float(price), time.monotonic())
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        return {
+            "prices": {k: {"price": p, "age_s": round(now - ts, 1)} for k, (p, ts) in sorted(self._prices.items())},
+            "lookups": self.lookups, "fetches": self.fetches, "errors": self.errors,
+        }
+
+
+app_resources.register(
+    "http_session", _new_http_session,
+    close=lambda sess: sess.close(),
+)
+app_resources.register(
+    "price_clients", _PriceClients,
+    stats=lambda clients: clients.stats(),
+)
+
+
 def fetch_proxy_price(symbol_name: str) -> Optional[float]:
     """
     ดึงราคาโดยประมาณจาก yfinance (ถ้ามี)
     - XAUUSD → ใช้สัญลักษณ์ 'XAUT-USD' เป็น proxy
+    - HTTP session ใช้ร่วมกันทั้ง process (app_resources), ราคาแคช PRICE_TTL_S วินาที
     """
-    try:
-        import yfinance as yf
-    except Exception:
+    ticker = PROXY_TICKERS.get(symbol_name)
+    if not ticker:
         return None
 
-    mapping = {"XAUUSD": "XAUT-USD"}
-    ticker = mapping.get(symbol_name)
-    if not ticker:
+    try:
+        import yfinance  # noqa: F401
+    except Exception:
         return None
 
+    clients: _PriceClients = app_resources.get("price_clients")
+    clients.lookups += 1
+    price = clients.cached(ticker)
+    if price is not None:
+        return price
+    clients.fetches += 1
     try:
-        tk = yf.Ticker(ticker)
+        tk = clients.ticker(ticker)
 
         fast = getattr(tk, "fast_info", None)
-        if isinstance(fast, dict):
-            lp = fast.get("last_price")
+        if fast is not None:
+            try:
+                lp = fast["last_price"]   # FastInfo (dict-like) — รุ่นเก่าเป็น dict
+            except Exception:
+                lp = None
             if lp:
+                clients.remember(ticker, float(lp))
                 return float(lp)
 
         hist = tk.history(period="1d")
         if hist is not None and not hist.empty:
+            clients.remember(ticker, float(hist["Close"].iloc[-1]))
             return float(hist["Close"].iloc[-1])
     except Exception:
+        clients.errors += 1
         return None
     return None
 
@@ -283,6 +351,138 @@ def lots_for_stop_distances(risk_amount: float, stops_points: Iterable[int]) ->
     return out
 
 
+# ============================================================
+# Batch sizing (NumPy): array-in / array-out
+# ============================================================
+# ทุกอินพุตเป็นสเกลาร์หรือ array ก็ได้ (broadcast แบบ NumPy) เช่น balance (บัญชี,1) × stop (1,สัญญาณ)
+# → ตารางหลาย risk/หลาย stop และบอทที่ size (บัญชี × สัญญาณ) ทีละหลายพันคู่ไม่ต้องวน loop ใน Python
+# ผลลัพธ์เป็น dict ของ ndarray (รูปเดียวกันหลัง broadcast) → sizing_frame() ทำตารางได้ทันที
+
+SIZING_LABELS: Dict[str, str] = {
+    "risk_pct": "Risk (%)",
+    "risk_amount": "Risk ($)",
+    "stop_points": "Stop (pts)",
+    "lots_raw": "Lot (คำนวณ)",
+    "lots": "Lot",
+    "max_lot": "MaxLot",
+    "margin": "Margin ($)",
+}
+
+
+def _step_decimals(step: float) -> int:
+    """จำนวนทศนิยมของ lot step (0.01 → 2, 0.1 → 1, 1 → 0) ไว้ปัดเศษ float หลัง floor"""
+    txt = f"{float(step):.10f}".rstrip("0")
+    return len(txt.split(".")[1]) if "." in txt else 0
+
+
+def calc_margin_per_lot_batch(price, leverage, contract_size: float = 100.0) -> np.ndarray:
+    """calc_margin_per_lot แบบ array: (Contract × Price) / Leverage, อินพุตไม่ถูกต้อง → 0"""
+    price = np.asarray(price, dtype=np.float64)
+    leverage = np.asarray(leverage, dtype=np.float64)
+    ok = (price > 0) & (leverage > 0)
+    return np.where(ok, float(contract_size) * price / np.where(ok, leverage, 1.0), 0.0)
+
+
+def calc_max_lot_batch(balance, price, leverage, contract_size: float = 100.0, buffer_fraction=0.0) -> np.ndarray:
+    """calc_max_lot แบบ array: (Balance × Leverage) / (Price × Contract) × (1 - buffer) — ไม่รู้ราคา/leverage → 0"""
+    balance = np.asarray(balance, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    leverage = np.asarray(leverage, dtype=np.float64)
+    ok = (price > 0) & (leverage > 0)
+    raw = balance * leverage / (np.where(ok, price, 1.0) * float(contract_size))
+    raw = raw * np.maximum(0.0, 1.0 - np.asarray(buffer_fraction, dtype=np.float64))
+    return np.where(ok, np.maximum(raw, 0.0), 0.0)
+
+
+def normalize_risk_value_batch(balance, mode, val) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    normalize_risk_value แบบ array → (amount, pct)
+    - mode: "%" หรือ "$" (สเกลาร์ หรือ array ของสตริงต่อแถว)
+    - balance <= 0 → (0, 0)
+    """
+    balance = np.asarray(balance, dtype=np.float64)
+    val = np.asarray(val, dtype=np.float64)
+    is_pct = np.asarray(mode) == "%"
+    ok = balance > 0
+    safe_bal = np.where(ok, balance, 1.0)
+    amount = np.where(is_pct, balance * val / 100.0, val)
+    pct = np.where(is_pct, val, amount / safe_bal * 100.0)
+    return np.where(ok, amount, 0.0), np.where(ok, pct, 0.0)
+
+
+def floor_lots(lots, lot_step: float = 0.01, min_lot: float = 0.01, lot_cap=None) -> np.ndarray:
+    """
+    ปัด lot ลงตาม lot step (ไม่ปัดขึ้น → ไม่เสี่ยงเกินที่ตั้งไว้), ไม่เกิน lot_cap, ต่ำกว่า min_lot → 0 (เปิดไม่ได้)
+    - lot_cap: สเกลาร์/array, <= 0 หรือ None = ไม่จำกัด
+    """
+    lots = np.maximum(np.asarray(lots, dtype=np.float64), 0.0)
+    if lot_cap is not None:
+        cap = np.asarray(lot_cap, dtype=np.float64)
+        lots = np.where(cap > 0, np.minimum(lots, cap), lots)
+    step = float(lot_step)
+    if step > 0:
+        # +1e-9 กัน 0.07/0.01 = 6.9999… ถูก floor เหลือ 0.06
+        lots = np.round(np.floor(lots / step + 1e-9) * step, _step_decimals(step))
+    return np.where(lots >= float(min_lot) - 1e-12, lots, 0.0)
+
+
+def size_positions_batch(
+    balance,
+    risk,
+    stop_points,
+    price=0.0,
+    leverage=0.0,
+    spec: SymbolSpec = XAUUSD_SPEC,
+    risk_mode="%",
+    buffer_fraction=0.0,
+    lot_cap=None,
+) -> Dict[str, np.ndarray]:
+    """
+    Lot ตามความเสี่ยงแบบ batch: Lot = RiskAmount / (Distance(points) × $/point/lot)
+    แล้วปัดลงตาม lot step ของ spec, ชนเพดาน = min(MaxLot จากมาร์จิ้น, spec.max_lot, lot_cap), ต่ำกว่า min lot → 0
+    - risk: % หรือ $ ตาม risk_mode ("%"/"$" หรือ array ต่อแถว)
+    - price/leverage <= 0 → ไม่คุมด้วยมาร์จิ้น (max_lot = 0 เหมือน calc_max_lot)
+    คืน dict ของ ndarray:
+      risk_amount, risk_pct, stop_points, lots_raw, lots, max_lot, margin,
+      capped (ถูกเพดานตัด), below_min (มี risk แต่ lot ต่ำกว่า min lot)
+    """
+    risk_amount, risk_pct = normalize_risk_value_batch(balance, risk_mode, risk)
+    stop = np.asarray(stop_points, dtype=np.float64)
+    vpp = dollars_per_point_per_lot(spec)
+    denom = stop * vpp
+    lots_raw = np.where(denom > 0, risk_amount / np.where(denom > 0, denom, 1.0), 0.0)
+
+    max_lot_m = calc_max_lot_batch(balance, price, leverage, spec.contract_size, buffer_fraction)
+    cap = np.where(max_lot_m > 0, max_lot_m, np.inf)
+    if spec.max_lot:
+        cap = np.minimum(cap, float(spec.max_lot))
+    if lot_cap is not None:
+        user_cap = np.asarray(lot_cap, dtype=np.float64)
+        cap = np.minimum(cap, np.where(user_cap > 0, user_cap, np.inf))
+
+    lots = floor_lots(lots_raw, spec.lot_step, spec.min_lot, np.where(np.isfinite(cap), cap, 0.0))
+    margin = lots * calc_margin_per_lot_batch(price, leverage, spec.contract_size)
+
+    shape = np.broadcast(risk_amount, stop, lots).shape
+    return {
+        "risk_amount": np.broadcast_to(risk_amount, shape),
+        "risk_pct": np.broadcast_to(risk_pct, shape),
+        "stop_points": np.broadcast_to(stop, shape),
+        "lots_raw": np.broadcast_to(lots_raw, shape),
+        "lots": np.broadcast_to(lots, shape),
+        "max_lot": np.broadcast_to(max_lot_m, shape),
+        "margin": np.broadcast_to(margin, shape),
+        "capped": np.broadcast_to(lots_raw > cap, shape),
+        "below_min": np.broadcast_to((lots_raw > 0) & (lots == 0) & ~(lots_raw > cap), shape),
+    }
+
+
+def sizing_frame(res: Dict[str, np.ndarray], labels: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """ผล size_positions_batch (1 มิติ) → DataFrame ตามลำดับ/ชื่อคอลัมน์ใน labels"""
+    labels = SIZING_LABELS if labels is None else labels
+    return pd.DataFrame({label: np.ravel(res[key]) for key, label in labels.items() if key in res})
+
+
 # ============================================================
 # GMK Signal Parser (utility)
 # ============================================================
@@ -300,55 +500,198 @@ def _normalize_symbol(raw: Optional[str]) -> Optional[str]:
     return _SYMBOL_ALIASES.get(s, s if s in SYMBOL_PRESETS else None)
 
 
-def parse_gmk_signal(text: str) -> Dict[str, Optional[object]]:
+# ---- tokenizer: regex ที่ compile ครั้งเดียวตัดข้อความเป็น token (ใน C) แล้วเดิน state machine รอบเดียว ----
+# เดิมใช้ regex ~6 ตัว + วน alias ทีละคำต่อข้อความ → ตอนนี้ต่อ token เหลือ dict lookup / เช็คตัวอักษรไม่กี่ครั้ง
+# ตัวคั่น: ช่องว่าง และ = : , ; | วงเล็บ ฯลฯ  ("@" เป็น token ของตัวเอง)
+_GMK_TOKEN_RE = re.compile(r"[^\s=:,;|()\[\]{}<>!?*\"'@]+|@")
+_GMK_DIGITS = frozenset("0123456789")
+_GMK_NUM_RE = re.compile(r"\d+(?:\.\d+)?")
+_GMK_TF_HEADS = frozenset("MHDW")
+_SYMBOL_LOOKUP: Dict[str, str] = {**{k: k for k in SYMBOL_PRESETS}, **_SYMBOL_ALIASES}
+
+
+def _alias_trie(aliases: Dict[str, str]) -> Dict[str, dict]:
+    """สร้าง trie (dict ซ้อน dict) จาก alias → ค่า; คีย์ "" ของ node = ค่าของคำที่จบตรงนั้น"""
+    root: Dict[str, dict] = {}
+    for word, value in aliases.items():
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = value
+    return root
+
+
+_SYMBOL_TRIE = _alias_trie(_SYMBOL_LOOKUP)
+
+
+def _trie_symbol(tok: str) -> Optional[str]:
     """
-    รองรับตัวอย่าง:
-      XAUUSD.mg M5 SELL @3774.03
-      SL=3785.34
-      TP1=3771.77 ...
+    alias ที่ยาวสุดซึ่งเป็น prefix ของ token และต่อด้วย suffix โบรกที่ไม่ใช่ตัวอักษร
+    (XAUUSD.MG, GOLD#, BTCUSD-ECN → ได้; XAUUSDM/GOLDEN → ไม่ได้)
     """
-    s = text.strip()
-    u = s.upper()
+    node, found = _SYMBOL_TRIE, None
+    for i, ch in enumerate(tok):
+        node = node.get(ch)
+        if node is None:
+            break
+        if "" in node and (i + 1 == len(tok) or not tok[i + 1].isalpha()):
+            found = node[""]
+    return found
 
-    m_sym = re.search(r"\b([A-Z]{3,10})(?:\.MG)?\b", u)
-    symbol = _normalize_symbol(m_sym.group(1)) if m_sym else None
 
-    m_tf = re.search(r"\b(M\d+|H\d+|D\d+|W\d+)\b", u)
-    timeframe = m_tf.group(1) if m_tf else None
+def _gmk_num(tok: str) -> Optional[float]:
+    """
+    ตัวเลขที่ต้น token (ไม่ขึ้นต้นด้วยตัวเลข → None) — ส่วนท้ายถูกตัดทิ้ง เหมือน regex ของ parser เดิม:
+    "2360.5." → 2360.5, "2350-2345" → 2350, "2350/2355" → 2350
+    """
+    if "E" not in tok and "_" not in tok:       # float() รับ 1E5 / 2_350 ด้วย → ให้ regex ตัดแทน
+        try:
+            return float(tok)                   # กรณีปกติ: ทั้ง token เป็นตัวเลข
+        except ValueError:
+            pass
+    m = _GMK_NUM_RE.match(tok)
+    return float(m.group()) if m else None
 
-    direction = None
-    for k, v in _DIR_ALIASES.items():
-        if re.search(rf"\b{k}\b", u):
-            direction = v
-            break
 
-    m_entry = re.search(r"@\s*([0-9]+(?:\.[0-9]+)?)", u)
-    if m_entry:
-        entry = float(m_entry.group(1))
-    else:
-        m0 = re.search(r"\b([0-9]+(?:\.[0-9]+)?)\b", u)
-        entry = float(m0.group(1)) if m0 else None
+def _gmk_glued(tok: str) -> Optional[str]:
+    """
+    ป้ายที่เขียนติดกับค่า: SL2340 → "sl", TP2360 → "tp1" (ไม่ใช่ → None)
+    TP ตามด้วยเลข 1-2 หลัก (TP1..TP99) ยังเป็นป้าย TPn ที่รอค่าใน token ถัดไป
+    """
+    if len(tok) < 3 or tok[2] not in _GMK_DIGITS:
+        return None
+    if tok[:2] == "SL":
+        return "sl"
+    if tok[:2] == "TP" and not (len(tok) <= 4 and tok[2:].isdigit()):
+        return "tp1"
+    return None
 
-    msl = re.search(r"\bSL\s*=?\s*([0-9]+(?:\.[0-9]+)?)", u)
-    sl = float(msl.group(1)) if msl else None
 
-    tp_matches = re.findall(r"\bTP\d+\s*=?\s*([0-9]+(?:\.[0-9]+)?)", u)
-    tps = [float(x) for x in tp_matches] if tp_matches else []
-    if not tps:
-        tp_single = re.findall(r"\bTP\s*=?\s*([0-9]+(?:\.[0-9]+)?)", u)
-        tps = [float(x) for x in tp_single] if tp_single else []
+def _gmk_scan(u: str) -> Tuple:
+    """สแกนข้อความ (ตัวพิมพ์ใหญ่แล้ว) รอบเดียว → (symbol, direction, entry, sl, tps, timeframe)"""
+    symbol = direction = timeframe = entry = sl = first_num = None
+    tps_n: List[float] = []
+    tps_1: List[float] = []
+    want = None                                 # token ก่อนหน้าเป็น @ / SL / TP → รอตัวเลข
+    digits, tf_heads = _GMK_DIGITS, _GMK_TF_HEADS
+    for tok in _GMK_TOKEN_RE.findall(u):
+        head = tok[0]
+        if head in digits:
+            v = _gmk_num(tok)
+            if v is None:
+                want = None
+                continue
+            if first_num is None:
+                first_num = v
+        elif (head == "S" or head == "T") and _gmk_glued(tok):
+            v = _gmk_num(tok[2:])
+            want = _gmk_glued(tok) if v is not None else None
+        else:
+            want = None
+            if tok == "@":
+                want = "at"
+            elif tok == "SL":
+                want = "sl"
+            elif head == "T" and tok[:2] == "TP" and (len(tok) == 2 or tok[2:].isdigit()):
+                want = "tp1" if len(tok) == 2 else "tpn"
+            elif head in tf_heads and 2 <= len(tok) <= 4 and tok[1:].isdigit():
+                if timeframe is None:
+                    timeframe = tok
+            elif direction is None and tok in _DIR_ALIASES:
+                direction = _DIR_ALIASES[tok]
+            elif symbol is None and head.isalpha():
+                symbol = _SYMBOL_LOOKUP.get(tok) or _trie_symbol(tok)
+            continue
+        if want is not None:
+            if want == "at":
+                if entry is None:
+                    entry = v
+            elif want == "sl":
+                if sl is None:
+                    sl = v
+            elif want == "tpn":
+                tps_n.append(v)
+            else:
+                tps_1.append(v)
+            want = None
+    if entry is None:
+        entry = first_num                       # ไม่มี @ → ตัวเลขตัวแรกในข้อความ
+    return symbol, direction, entry, sl, tps_n or tps_1, timeframe
+
+
+@lru_cache(maxsize=256)
+def _gmk_scan_cached(u: str) -> Tuple:
+    # แท็บ GMK เรียกทุก rerun ด้วยข้อความเดิม → ไม่ต้องสแกนซ้ำ (ผลเป็น tuple แก้ไม่ได้ ใช้ร่วมกันได้)
+    sym, d, entry, sl, tps, tf = _gmk_scan(u)
+    return sym, d, entry, sl, tuple(tps), tf
+
 
+def parse_gmk_signal(text: str) -> Dict[str, Optional[object]]:
+    """
+    รองรับตัวอย่าง:
+      XAUUSD.mg M5 SELL @3774.03
+      SL=3785.34
+      TP1=3771.77 ...
+    - symbol/direction = alias ตัวแรกที่เจอในข้อความ (symbol ตัด suffix โบรก เช่น .mg, #)
+    - entry = ตัวเลขหลัง @ (ไม่มี → ตัวเลขตัวแรก), tps = TP1..TPn (ไม่มี → TP=... ทั้งหมด)
+    - คั่นค่าด้วย = / : / ช่องว่าง ได้ (SL=3785, SL: 3785, TP1 3771)
+    """
+    symbol, direction, entry, sl, tps, timeframe = _gmk_scan_cached(text.strip().upper())
     return {
         "symbol": symbol,
         "direction": direction,      # "LONG" | "SHORT"
         "entry": entry,
         "sl": sl,
-        "tps": tps,                  # list[float]
+        "tps": list(tps),            # list[float]
         "timeframe": timeframe,
         "raw": text,
     }
 
 
+def parse_gmk_signals(messages: Iterable[str], keep_raw: bool = False) -> Dict[str, object]:
+    """
+    พาร์สสัญญาณทีละมาก ๆ (เช่นย้อนประวัติทั้งช่อง) แบบ stream → ผลแบบคอลัมน์ (ยาวเท่ากันทุกคอลัมน์)
+      symbol / direction / timeframe : list (None = หาไม่เจอ)
+      entry / sl                      : ndarray float64 (NaN = หาไม่เจอ)
+      n_tps                           : ndarray int
+      tps                             : list ของ list[float]
+      raw                             : list ข้อความเดิม (เฉพาะ keep_raw=True)
+    ใช้ pd.DataFrame(parse_gmk_signals(msgs)) ทำตารางได้ทันที
+    """
+    symbols: List[Optional[str]] = []
+    directions: List[Optional[str]] = []
+    timeframes: List[Optional[str]] = []
+    entries: List[float] = []
+    sls: List[float] = []
+    tps_all: List[List[float]] = []
+    raws: List[str] = []
+    nan = float("nan")
+    scan = _gmk_scan
+    for text in messages:
+        sym, d, entry, sl, tps, tf = scan(text.strip().upper())
+        symbols.append(sym)
+        directions.append(d)
+        timeframes.append(tf)
+        entries.append(nan if entry is None else entry)
+        sls.append(nan if sl is None else sl)
+        tps_all.append(tps)
+        if keep_raw:
+            raws.append(text)
+
+    cols: Dict[str, object] = {
+        "symbol": symbols,
+        "direction": directions,
+        "timeframe": timeframes,
+        "entry": np.asarray(entries, dtype=np.float64),
+        "sl": np.asarray(sls, dtype=np.float64),
+        "n_tps": np.fromiter((len(t) for t in tps_all), dtype=np.int64, count=len(tps_all)),
+        "tps": tps_all,
+    }
+    if keep_raw:
+        cols["raw"] = raws
+    return cols
+
+
 # ============================================================
 # ระยะ / จุด (points & pips)
 # ============================================================
@@ -371,6 +714,16 @@ def tp_points_distance(entry: Optional[float], tp: Optional[float], spec: Symbol
 # Grid builders
 # ============================================================
 
+def _grid_prices(ref_price: float, n_orders: int, step_price: float, sgn: float) -> np.ndarray:
+    """ราคาทุกไม้ในครั้งเดียว (ปัด 2 ตำแหน่งเหมือนเดิม)"""
+    return np.round(float(ref_price) + sgn * float(step_price) * np.arange(int(n_orders), dtype=np.float64), 2)
+
+
+def _side_sign(side: str) -> float:
+    """LONG → -1 (ออกไม้ต่ำลง), SHORT → +1"""
+    return -1.0 if str(side).upper().startswith("LONG") else 1.0
+
+
 def build_grid_entries(
     current_price: float,
     n_orders: int,
@@ -386,8 +739,7 @@ def build_grid_entries(
     if n_orders <= 0:
         return []
     step_price = float(step_points) * float(price_point)
-    sgn = -1.0 if side.upper() == "LONG" else 1.0
-    return [round(float(current_price) + sgn * i * step_price, 2) for i in range(int(n_orders))]
+    return _grid_prices(current_price, n_orders, step_price, _side_sign(side)).tolist()
 
 
 def build_grid_levels(
@@ -401,17 +753,262 @@ def build_grid_levels(
     if n_orders <= 0:
         return []
     step = float(spacing_pts) * float(point_value)
-    sgn = -1.0 if direction.upper().startswith("LONG") else 1.0
-    return [round(ref_price + sgn * i * step, 2) for i in range(int(n_orders))]
+    return _grid_prices(ref_price, n_orders, step, _side_sign(direction)).tolist()
+
+
+# ------------------------------------------------------------
+# Grid plan (NumPy): ทุกคอลัมน์ของตารางกริดในครั้งเดียว — ไม่มี loop/dict ต่อแถว
+# ------------------------------------------------------------
+# คีย์ของ plan (ตามลำดับคอลัมน์) → ชื่อคอลัมน์มาตรฐานของตาราง GRD/GFC
+GRID_PLAN_LABELS: Dict[str, str] = {
+    "order": "Order #",
+    "price": "Price",
+    "lot": "Lot",
+    "tp_points": "TP (pts)",
+    "tp_price": "TP price",
+    "cost": "Cost/Order ($)",
+    "margin": "Margin/Order ($)",
+    "cum_cost": "Cum Cost ($)",
+    "cum_margin": "Cum Margin ($)",
+}
+
+
+def grid_plan_for_prices(
+    prices: Iterable[float],
+    lot: float,
+    contract_size: float,
+    leverage: float,
+    side: str = "LONG",
+    tp_points: Optional[float] = None,
+    point_value: float = 0.01,
+    liq_price: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    ต้นทุน/มาร์จิ้น/ค่าสะสม/TP ของราคาเข้าที่กำหนด (ndarray ต่อคอลัมน์)
+      cost   = price * lot * contract               (liq_price: ใช้ระยะถึงราคา liq แทน price, ติดลบ → 0)
+      margin = cost / leverage                      (leverage <= 0 → 0)
+      TP     = price ± tp_points * point_value      (tp_points=None → ไม่มีคอลัมน์ TP)
+    """
+    price = np.asarray(prices, dtype=np.float64)
+    n = price.size
+    sgn = _side_sign(side)
+    unit = float(lot) * float(contract_size)
+
+    if liq_price is None:
+        cost = price * unit
+    else:
+        # LONG: ราคาเข้า - liq, SHORT: liq - ราคาเข้า
+        cost = np.maximum(-sgn * (price - float(liq_price)), 0.0) * unit
+    margin = cost / float(leverage) if leverage > 0 else np.zeros(n)
+
+    plan: Dict[str, np.ndarray] = {
+        "order": np.arange(1, n + 1),
+        "price": price,
+        "lot": np.full(n, float(lot)),
+    }
+    if tp_points is not None:
+        plan["tp_points"] = np.full(n, tp_points)
+        plan["tp_price"] = np.round(price - sgn * float(tp_points) * float(point_value), 2)
+    plan["cost"] = cost
+    plan["margin"] = margin
+    plan["cum_cost"] = np.cumsum(cost)
+    plan["cum_margin"] = np.cumsum(margin)
+    return plan
+
+
+def build_grid_plan(
+    ref_price: float,
+    spacing_pts: float,
+    n_orders: int,
+    side: str = "LONG",
+    lot: float = 0.01,
+    contract_size: float = 100.0,
+    leverage: float = 1000.0,
+    tp_points: Optional[float] = None,
+    point_value: float = 0.01,
+    liq_price: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    แผนกริด N ไม้ (ราคา, ต้นทุน, มาร์จิ้น, ค่าสะสม, TP) แบบ vectorized
+    - ราคาไม้ที่ i = ref ∓ i·spacing·point_value (LONG ลง / SHORT ขึ้น) ปัด 2 ตำแหน่ง
+    - LONG หยุดที่ระดับสุดท้ายที่ราคายัง > 0
+    - คืน dict ของ ndarray → pd.DataFrame(plan) หรือ grid_plan_frame() ได้ทันที
+    """
+    n = max(0, int(n_orders))
+    levels = grid_level_limit(ref_price, spacing_pts, side, point_value)
+    if levels is not None:
+        n = min(n, levels)   # LONG: ไม่สร้างระดับที่ราคา <= 0
+    prices = _grid_prices(ref_price, n, float(spacing_pts) * float(point_value), _side_sign(side))
+    return grid_plan_for_prices(
+        prices, lot=lot, contract_size=contract_size, leverage=leverage, side=side,
+        tp_points=tp_points, point_value=point_value, liq_price=liq_price,
+    )
+
+
+def grid_plan_frame(plan: Dict[str, np.ndarray], labels: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """plan → DataFrame ตามลำดับ/ชื่อคอลัมน์ใน labels (คีย์ที่ไม่อยู่ใน labels ถูกตัดทิ้ง)"""
+    labels = GRID_PLAN_LABELS if labels is None else labels
+    return pd.DataFrame({label: plan[key] for key, label in labels.items() if key in plan})
+
+
+def find_last_feasible_index(values: Iterable[float], budget: float) -> Optional[int]:
+    """
+    คืน index สุดท้ายที่ค่า <= budget (ไว้ดูว่ามาร์จิ้นรวมไม่เกินทุนได้กี่ไม้)
+    values ต้องเรียงไม่ลดลง (ค่าสะสม เช่น Cum Margin) → binary search (searchsorted) แทนการไล่ทั้งลิสต์
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.size == 0:
+        return None
+    i = int(np.searchsorted(arr, float(budget), side="right")) - 1
+    return i if i >= 0 else None
+
+
+# ------------------------------------------------------------
+# Feasibility (closed form): จำนวนไม้สูงสุดก่อนสร้างตาราง → สร้างแค่ขอบเขต + หน้าต่างแสดงผล
+# ------------------------------------------------------------
+GRID_DISPLAY_WINDOW = 50      # แสดงต่อจากจุดที่เปิดได้อีกกี่แถว (ให้เห็นว่าเกินแล้วเป็นอย่างไร)
+GRID_STYLE_MAX_ROWS = 600     # ตารางใหญ่กว่านี้ไม่ใช้ pandas Styler (ช้า และ Streamlit จำกัดจำนวน cell)
+
+
+def _series_sum(first: float, step: float, n: int) -> float:
+    """Σ_{i<n} (first + step·i)"""
+    return first * n + step * n * (n - 1) / 2.0
+
+
+def max_orders_within_budget(
+    first: float,
+    step: float,
+    budget: float,
+    limit: Optional[int] = None,
+) -> Optional[int]:
+    """
+    N สูงสุดที่ Σ_{i<N} max(first + step·i, 0) <= budget
+    (ค่าต่อไม้เป็นอนุกรมเลขคณิต เช่น มาร์จิ้นของกริดที่ราคาเว้นระยะเท่ากัน)
+    - แก้สมการกำลังสองตรง ๆ O(1) แล้วขยับ ±1 กันเศษทศนิยม
+    - None = ไม่มีขอบเขต (ผลรวมไม่เคยเกิน budget) ถ้าไม่ได้ให้ limit
+    - limit: จำนวนระดับที่มีจริง (เช่น ราคายัง > 0) — ผลลัพธ์ไม่เกินค่านี้
+    """
+    first, step, budget = float(first), float(step), float(budget)
+    if budget < 0:
+        return 0
+
+    skip = 0
+    if first <= 0:
+        if step <= 0:
+            return limit                       # ทุกไม้ = 0 → เปิดได้ไม่จำกัด
+        skip = int(math.ceil(-first / step))   # ไม้ที่ค่า <= 0 (ไม่กินงบ)
+        first += step * skip
+        if first <= 0:                         # ceil ชนขอบพอดี
+            skip += 1
+            first += step
+
+    if step < 0:
+        n_pos = int(math.ceil(first / -step))  # ไม้ที่ยังมีค่า > 0
+        if _series_sum(first, step, n_pos) <= budget:
+            return limit
+
+    a = step / 2.0
+    b = first - step / 2.0
+    if abs(a) <= 1e-15 * abs(b):
+        n = int(budget // first)
+    else:
+        disc = b * b + 4.0 * a * budget
+        n = int(math.floor((-b + math.sqrt(max(disc, 0.0))) / (2.0 * a)))
+    n = max(0, n)
+    while _series_sum(first, step, n + 1) <= budget:
+        n += 1
+    while n > 0 and _series_sum(first, step, n) > budget:
+        n -= 1
+
+    n += skip
+    return n if limit is None else min(n, limit)
+
+
+def grid_level_limit(ref_price: float, spacing_pts: float, side: str, point_value: float = 0.01) -> Optional[int]:
+    """จำนวนระดับกริดที่ราคายัง > 0 (LONG เท่านั้นที่มีขอบ; SHORT = None ไม่จำกัด)"""
+    if _side_sign(side) > 0:
+        return None
+    step = float(spacing_pts) * float(point_value)
+    if step <= 0:
+        return None
+    return max(0, int(math.ceil(float(ref_price) / step)))
 
 
-def find_last_feasible_index(values: List[float], budget: float) -> Optional[int]:
-    """คืน index สุดท้ายที่ค่า <= budget (ไว้ดูว่ามาร์จิ้นรวมไม่เกินทุนได้กี่ไม้)"""
-    last: Optional[int] = None
-    for i, v in enumerate(values):
-        if v <= budget:
-            last = i
-    return last
+def grid_feasible_orders(
+    ref_price: float,
+    spacing_pts: float,
+    side: str,
+    lot: float,
+    contract_size: float,
+    leverage: float,
+    budget: float,
+    point_value: float = 0.01,
+    liq_price: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> Optional[int]:
+    """
+    จำนวนไม้สูงสุดที่มาร์จิ้นรวม <= budget โดยไม่ต้องสร้างตาราง (สูตรเดียวกับ build_grid_plan)
+      มาร์จิ้นไม้ i = k·price_i,  k = lot·contract/leverage,  price_i = ref ∓ i·spacing·point_value
+      liq_price: มาร์จิ้นไม้ i = k·max(ระยะถึง liq, 0) (ลดลงเรื่อย ๆ → อาจไม่จำกัด)
+    - ไม่เกิน limit และจำนวนระดับที่ราคายัง > 0 (LONG)
+    - คลาดจากตารางจริงได้ ±1 ไม้เพราะราคาถูกปัด 2 ตำแหน่ง → ใช้ find_last_feasible_index กับตารางเพื่อค่าที่แน่นอน
+    """
+    levels = grid_level_limit(ref_price, spacing_pts, side, point_value)
+    if limit is not None:
+        levels = limit if levels is None else min(levels, limit)
+    if leverage <= 0:
+        return levels                          # ไม่มีมาร์จิ้น
+    k = float(lot) * float(contract_size) / float(leverage)
+    d = float(spacing_pts) * float(point_value)
+    sgn = _side_sign(side)
+    if liq_price is None:
+        first, step = k * float(ref_price), k * sgn * d
+    else:
+        first, step = k * -sgn * (float(ref_price) - float(liq_price)), -k * d
+    return max_orders_within_budget(first, step, budget, limit=levels)
+
+
+def grid_display_rows(*bounds: Optional[int], levels: Optional[int] = None, window: int = GRID_DISPLAY_WINDOW) -> int:
+    """จำนวนแถวที่ควรสร้าง/แสดง = ขอบเขตที่มากสุด + window (ไม่เกินจำนวนระดับที่มี)"""
+    known = [int(b) for b in bounds if b is not None]
+    rows = (max(known) if known else 0) + int(window)
+    return rows if levels is None else max(0, min(rows, int(levels)))
+
+
+def show_grid_table(
+    df: pd.DataFrame,
+    fmt: Dict[str, str],
+    row_styles: Optional[Dict[int, str]] = None,
+    max_height: int = 560,
+) -> None:
+    """
+    แสดงตารางกริด: ตารางเล็กใช้ Styler (ไฮไลท์แถวตาม row_styles, จัดกลาง) เหมือนเดิม
+    ตารางใหญ่ (> GRID_STYLE_MAX_ROWS แถว) ใช้ column_config แทน — ไม่มีไฮไลท์ แต่เรนเดอร์ได้ทันที
+    """
+    height = min(max_height, (len(df) + 2) * 33)
+    if len(df) <= GRID_STYLE_MAX_ROWS:
+        styles = row_styles or {}
+
+        def _hl_row(r):
+            return [styles.get(r.name, "")] * len(r)
+
+        st.dataframe(
+            df.style
+                .format(fmt)
+                .apply(_hl_row, axis=1)
+                .set_table_styles([{'selector': 'th', 'props': [('text-align', 'center')]}])
+                .set_properties(**{'text-align': 'center'}),
+            use_container_width=True,
+            height=height,
+        )
+        return
+
+    config = {
+        col: st.column_config.NumberColumn(format="%.0f" if ".0f" in f else "%.2f")
+        for col, f in fmt.items() if col in df.columns
+    }
+    st.dataframe(df, use_container_width=True, height=height, column_config=config, hide_index=True)
+    st.caption(f"ตาราง {len(df):,} แถว — ไฮไลท์แถวแสดงเฉพาะตารางไม่เกิน {GRID_STYLE_MAX_ROWS:,} แถว (ดูสรุปด้านล่าง)")
 
 
 def round_to_step(x: float, step: int) -> int:
@@ -469,18 +1066,249 @@ def ensure_ohlc_derived_columns(df: pd.DataFrame, point_value: float = 0.01) ->
     return df
 
 
-def compute_atr_points(df: pd.DataFrame, window: int = 14, method: str = "RMA") -> pd.Series:
+def ohlc_point_arrays(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    point_value: float = 0.01,
+    prev_close: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    range_point / TR_point จาก array ตรง ๆ (เช่น view ของ ohlc_store) — ไม่ต้องสร้าง DataFrame
+    - prev_close: close ของแท่งก่อนหน้าช่วงที่ตัดมา (None → TR แท่งแรก = NaN เหมือน ensure_ohlc_derived_columns)
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    pv = float(point_value)
+    hl = high - low
+    prev = np.empty_like(close)
+    if prev.size:
+        prev[0] = np.nan if prev_close is None else float(prev_close)
+        prev[1:] = close[:-1]
+    tr = np.maximum(np.maximum(np.abs(hl), np.abs(high - prev)), np.abs(low - prev))
+    return hl / pv, tr / pv
+
+
+def compute_atr_points(df, window: int = 14, method: str = "RMA"):
     """
     คืนค่า ATR (หน่วย points)
+    - df: DataFrame ที่มี TR_point → คืน Series, หรือ array ของ TR_point (เช่นจาก ohlc_point_arrays) → คืน ndarray
     - method: 'SMA' | 'EMA' | 'RMA' (Wilder)
     """
-    s = df["TR_point"]
+    is_frame = isinstance(df, pd.DataFrame)
+    s = df["TR_point"] if is_frame else pd.Series(np.asarray(df, dtype=np.float64), copy=False)
     m = method.upper()
     if m == "EMA":
-        return s.ewm(span=window, adjust=False).mean()
-    if m == "RMA":
-        return s.ewm(alpha=1 / window, adjust=False).mean()  # Wilder's smoothing
-    return s.rolling(window=window, min_periods=1).mean()
+        out = s.ewm(span=window, adjust=False).mean()
+    elif m == "RMA":
+        out = s.ewm(alpha=1 / window, adjust=False).mean()  # Wilder's smoothing
+    else:
+        out = s.rolling(window=window, min_periods=1).mean()
+    return out if is_frame else out.to_numpy()
+
+
+# ============================================================
+# Multi-timeframe resampler (intraday → H1/H4/D1/…)
+# ============================================================
+# ไฟล์ M1/M5 → แท่งใหญ่ขึ้นแบบ vectorized (ไม่มี groupby/loop): หา key ของแต่ละแท่ง → จุดเปลี่ยน key → reduceat
+# วันเทรดเริ่มที่ session_start ตามเวลา tz (เช่น 22:00 UTC หรือ 00:00 เวลา server โบรก UTC+2)
+
+TIMEFRAME_MINUTES: Dict[str, int] = {
+    "M1": 1, "M5": 5, "M15": 15, "M30": 30, "H1": 60, "H4": 240, "D1": 1440, "W1": 10080,
+}
+_TF_UNIT_MINUTES = {"M": 1, "H": 60, "D": 1440, "W": 10080}
+_NS_PER_MIN = 60 * 1_000_000_000
+
+
+def timeframe_minutes(tf: str) -> int:
+    """'H4' → 240, 'M15' → 15, 'D1' → 1440 (รูปแบบ <M|H|D|W><จำนวน>)"""
+    tf = str(tf).strip().upper()
+    if tf in TIMEFRAME_MINUTES:
+        return TIMEFRAME_MINUTES[tf]
+    unit, num = tf[:1], tf[1:]
+    if unit not in _TF_UNIT_MINUTES or not num.isdigit() or int(num) <= 0:
+        raise ValueError(f"timeframe ไม่ถูกต้อง: {tf!r} (เช่น M5, H4, D1)")
+    return _TF_UNIT_MINUTES[unit] * int(num)
+
+
+def infer_timeframe(dates, sample: int = 5000) -> Optional[str]:
+    """เดา timeframe ของไฟล์จากระยะห่างแท่งที่พบบ่อยสุด (median ของ diff) → ชื่อที่ใกล้สุดใน TIMEFRAME_MINUTES"""
+    d = np.asarray(dates, dtype="datetime64[ns]")[:sample]
+    if d.size < 2:
+        return None
+    step = np.diff(d.view("int64"))
+    step = step[step > 0]
+    if step.size == 0:
+        return None
+    minutes = float(np.median(step)) / _NS_PER_MIN
+    return min(TIMEFRAME_MINUTES, key=lambda k: abs(math.log(TIMEFRAME_MINUTES[k] / max(minutes, 1e-9))))
+
+
+def _session_offset_minutes(session_start) -> int:
+    """'22:00' / 1320 / datetime.time → นาทีหลังเที่ยงคืน"""
+    if isinstance(session_start, (int, float)):
+        return int(session_start) % 1440
+    if isinstance(session_start, _dt.time):
+        return session_start.hour * 60 + session_start.minute
+    hh, _, mm = str(session_start or "00:00").strip().partition(":")
+    return (int(hh or 0) * 60 + int(mm or 0)) % 1440
+
+
+def _convert_naive_tz(dates, source_tz: str, tz: str) -> np.ndarray:
+    """เวลาไม่มี tz ตาม source_tz → เวลาไม่มี tz ตาม tz (datetime64[ns])"""
+    d = np.asarray(dates, dtype="datetime64[ns]")
+    if tz == source_tz:
+        return d
+    idx = pd.DatetimeIndex(d).tz_localize(source_tz, ambiguous=np.zeros(d.size, dtype=bool),
+                                          nonexistent="shift_forward")
+    return idx.tz_convert(tz).tz_localize(None).to_numpy(dtype="datetime64[ns]")
+
+
+def resample_ohlc(
+    dates,
+    high,
+    low,
+    close,
+    open_=None,
+    volume=None,
+    timeframe: str = "D1",
+    tz: str = "UTC",
+    session_start="00:00",
+    source_tz: str = "UTC",
+) -> Dict[str, np.ndarray]:
+    """
+    รวมแท่งย่อยเป็นแท่งใหญ่ (ข้อมูลต้องเรียงตามเวลา)
+    - dates: เวลาแบบไม่มี tz ตาม source_tz → แปลงเป็น tz ก่อนแบ่งแท่ง (DST ตาม tz)
+    - แท่งเริ่มที่ session_start ของ tz: D1 = session_start→session_start, H4 = session_start + 4h·k,
+      W1 = สัปดาห์เริ่มวันจันทร์ ณ session_start
+    - ไม่สร้างแท่งว่าง (ช่วงไม่มีข้อมูล เช่นเสาร์-อาทิตย์ ไม่มีแท่ง)
+    คืน dict ของ ndarray: date (เวลาเริ่มแท่ง ตาม tz, ไม่มี tz), open, high, low, close, volume, bars (จำนวนแท่งย่อย)
+    """
+    d = _convert_naive_tz(dates, source_tz, tz)
+    n = d.size
+
+    step = timeframe_minutes(timeframe) * _NS_PER_MIN
+    offset = _session_offset_minutes(session_start) * _NS_PER_MIN
+    if timeframe_minutes(timeframe) % TIMEFRAME_MINUTES["W1"] == 0:
+        offset -= 3 * 1440 * _NS_PER_MIN          # 1970-01-01 เป็นวันพฤหัส → เลื่อนให้สัปดาห์เริ่มวันจันทร์
+    key = np.floor_divide(d.view("int64") - offset, step)
+
+    if n == 0:
+        starts = np.zeros(0, dtype=np.int64)
+    else:
+        starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+    ends = np.append(starts[1:], n)
+
+    out: Dict[str, np.ndarray] = {"date": (key[starts] * step + offset).view("datetime64[ns]")}
+    if open_ is not None:
+        out["open"] = np.asarray(open_, dtype=np.float64)[starts]
+    if n:
+        out["high"] = np.fmax.reduceat(np.asarray(high, dtype=np.float64), starts)
+        out["low"] = np.fmin.reduceat(np.asarray(low, dtype=np.float64), starts)
+    else:
+        out["high"] = out["low"] = np.zeros(0)
+    out["close"] = np.asarray(close, dtype=np.float64)[ends - 1] if n else np.zeros(0)
+    if volume is not None and n:
+        out["volume"] = np.add.reduceat(np.nan_to_num(np.asarray(volume, dtype=np.float64)), starts)
+    out["bars"] = ends - starts
+    return out
+
+
+def resampled_slice_index(bar_dates, first, last, timeframe: str, tz: str = "UTC",
+                          source_tz: str = "UTC") -> Tuple[int, int]:
+    """
+    ช่วง index [i, j) ของแท่งจาก resample_ohlc ที่ทับช่วงแท่งต้นทาง first..last (เวลาตาม source_tz)
+    - bar_dates เป็นเวลาเริ่มแท่งตาม tz → แปลง first/last เป็น tz ก่อนเทียบ
+    - แท่งที่ทับช่วง: เริ่ม <= last และ เริ่ม + ความยาวแท่ง > first (แท่งแรกที่เริ่มก่อน first ก็นับ)
+    """
+    d = np.asarray(bar_dates, dtype="datetime64[ns]")
+    lo, hi = _convert_naive_tz([_as_datetime64(first), _as_datetime64(last)], source_tz, tz)
+    step = np.timedelta64(timeframe_minutes(timeframe) * _NS_PER_MIN, "ns")
+    i = int(np.searchsorted(d, lo - step, side="right"))
+    j = int(np.searchsorted(d, hi, side="right"))
+    return i, max(i, j)
+
+
+# ============================================================
+# Date slicing (sorted index + searchsorted)
+# ============================================================
+# ตัดช่วงวันที่ด้วย binary search บน array วันที่ที่เรียงแล้ว O(log n) → คืน view (iloc[i:j]) ไม่ copy
+# แทน mask แบบ df["date"].dt.date >= start (สร้าง date object ทุกแถว + copy ทุก rerun)
+
+DATE_PRESETS = ("Custom", "YTD", "Last N days", "Last N bars", "All")
+
+
+def _as_datetime64(x) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(x).to_datetime64(), "ns")
+
+
+def _is_plain_date(x) -> bool:
+    return isinstance(x, _dt.date) and not isinstance(x, _dt.datetime)
+
+
+def sort_by_date(df: pd.DataFrame, col: str = "date") -> pd.DataFrame:
+    """
+    DataFrame ที่มี DatetimeIndex เรียงจากน้อยไปมาก (คอลัมน์ col ยังอยู่) — ทำครั้งเดียวตอนโหลดไฟล์
+    เรียงอยู่แล้ว → ไม่เรียงซ้ำ
+    """
+    if isinstance(df.index, pd.DatetimeIndex) and df.index.is_monotonic_increasing:
+        return df
+    dates = pd.to_datetime(df[col])
+    out = df.set_index(pd.DatetimeIndex(dates, name=None), drop=False)
+    out[col] = dates.to_numpy()
+    if not out.index.is_monotonic_increasing:
+        out = out.sort_index(kind="stable")
+    return out
+
+
+def date_slice_index(dates, start=None, end=None) -> Tuple[int, int]:
+    """
+    ช่วง index [i, j) ของแถวที่ start <= date <= end บน array วันที่ที่เรียงแล้ว (datetime64 / DatetimeIndex)
+    - end เป็น date (ไม่มีเวลา) → นับทั้งวัน (ถึงก่อนเที่ยงคืนของวันถัดไป) เหมือนเทียบด้วย .dt.date
+    """
+    d = np.asarray(dates, dtype="datetime64[ns]")
+    i = 0 if start is None else int(np.searchsorted(d, _as_datetime64(start), side="left"))
+    if end is None:
+        j = d.size
+    elif _is_plain_date(end):
+        j = int(np.searchsorted(d, _as_datetime64(end) + np.timedelta64(1, "D"), side="left"))
+    else:
+        j = int(np.searchsorted(d, _as_datetime64(end), side="right"))
+    return i, max(i, j)
+
+
+def date_preset_index(dates, preset: str, n: int = 0) -> Tuple[int, int]:
+    """
+    ช่วง index [i, j) ตาม preset (อิงแท่งสุดท้ายของข้อมูล ไม่ใช่วันนี้ → ไฟล์ย้อนหลังก็ใช้ได้)
+      YTD          : ตั้งแต่ 1 ม.ค. ของปีแท่งสุดท้าย
+      Last N days  : n วันปฏิทินล่าสุด (นับวันของแท่งสุดท้ายเป็นวันที่ 1)
+      Last N bars  : n แท่งล่าสุด
+      All / อื่น ๆ : ทั้งหมด
+    """
+    d = np.asarray(dates, dtype="datetime64[ns]")
+    size = d.size
+    if size == 0:
+        return 0, 0
+    last = d[-1]
+    if preset == "YTD":
+        return date_slice_index(d, start=last.astype("datetime64[Y]"))[0], size
+    if preset == "Last N days":
+        first_day = last.astype("datetime64[D]") - np.timedelta64(max(int(n), 1) - 1, "D")
+        return date_slice_index(d, start=first_day)[0], size
+    if preset == "Last N bars":
+        return max(0, size - max(int(n), 0)), size
+    return 0, size
+
+
+def slice_by_date(df: pd.DataFrame, start=None, end=None, col: str = "date") -> pd.DataFrame:
+    """
+    df.iloc[i:j] ของช่วงวันที่ (view ไม่ copy) — df ต้องเรียงตามวันที่แล้ว (ผ่าน sort_by_date)
+    ใช้ DatetimeIndex ถ้ามี ไม่งั้นใช้คอลัมน์ col
+    """
+    dates = df.index if isinstance(df.index, pd.DatetimeIndex) else df[col].to_numpy()
+    i, j = date_slice_index(dates, start, end)
+    return df.iloc[i:j]
 
 
 # ============================================================
@@ -559,14 +1387,22 @@ __all__ = [
     # Risk sizing
     "calc_optimal_lot_by_points_risk", "calc_optimal_lot_by_points_allin",
     "normalize_risk_value", "lots_for_stop_distances",
+    "calc_margin_per_lot_batch", "calc_max_lot_batch", "normalize_risk_value_batch", "floor_lots",
+    "size_positions_batch", "sizing_frame", "SIZING_LABELS",
     # Parser
-    "parse_gmk_signal",
+    "parse_gmk_signal", "parse_gmk_signals",
     # Distances
     "points_distance", "tp_points_distance",
     # Grid
     "build_grid_entries", "build_grid_levels", "find_last_feasible_index", "round_to_step",
+    "build_grid_plan", "grid_plan_for_prices", "grid_plan_frame", "GRID_PLAN_LABELS",
+    "max_orders_within_budget", "grid_level_limit", "grid_feasible_orders", "grid_display_rows",
+    "show_grid_table", "GRID_DISPLAY_WINDOW", "GRID_STYLE_MAX_ROWS",
     # CSV / Volatility
-    "ensure_ohlc_derived_columns", "compute_atr_points",
+    "ensure_ohlc_derived_columns", "ohlc_point_arrays", "compute_atr_points",
+    # Resample / Date slicing
+    "TIMEFRAME_MINUTES", "timeframe_minutes", "infer_timeframe", "resample_ohlc", "resampled_slice_index",
+    "DATE_PRESETS", "sort_by_date", "date_slice_index", "date_preset_index", "slice_by_date",
     # Defaults
     "DEFAULT_RISK_SET",
     # Backward-compatible (optional to expose)
@@ -0,0 +1,332 @@
+# grid_backtest.py
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from func import _side_sign, build_grid_levels, grid_level_limit
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+# เหตุผลที่ปิดไม้ (คอลัมน์ reason ของ trade log)
+REASON_OPEN = 0        # ยังถือถึงแท่งสุดท้าย
+REASON_TP = 1
+REASON_STOP_OUT = 2
+REASON_LABELS = {REASON_OPEN: "open", REASON_TP: "TP", REASON_STOP_OUT: "stop-out"}
+
+DEFAULT_STOP_OUT_PCT = 50.0   # margin level (%) ที่โบรกตัดทุกไม้ (MT5 ส่วนใหญ่ 20–50%)
+
+# กติกาในแท่งเดียว (ไม่รู้ลำดับ high/low ภายในแท่ง → เลือกทางที่ไม่เข้าข้างตัวเอง)
+# - ไม้ที่เพิ่งเข้าในแท่งนี้ ยังไม่ TP ในแท่งเดียวกัน
+# - ระดับที่เพิ่ง TP ในแท่งนี้ จะเข้าใหม่ได้ตั้งแต่แท่งถัดไป (re-arm)
+# - equity / margin level / stop-out ตรวจที่ราคาเลวร้ายสุดของแท่ง (LONG: low bid, SHORT: high ask)
+
+
+# ---------------------------------------------
+# LEVEL EVENTS (vectorized)
+# ---------------------------------------------
+def _expand_ranges(lo: np.ndarray, hi: np.ndarray, bars: np.ndarray):
+    """คู่ (level, bar) ทุกตัวของช่วง level [lo, hi) ในแต่ละแท่ง (ไม่มี loop)"""
+    cnt = hi - lo
+    keep = cnt > 0
+    lo, cnt, bars = lo[keep], cnt[keep], bars[keep]
+    total = int(cnt.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    offs = np.repeat(np.cumsum(cnt) - cnt, cnt)
+    levels = np.repeat(lo, cnt) + (np.arange(total) - offs)
+    return levels, np.repeat(bars, cnt)
+
+
+def _level_transitions(na: np.ndarray, nb: np.ndarray, n_levels: int):
+    """
+    เข้า/ปิดไม้ของทุกระดับจากจำนวนระดับที่แตะได้ต่อแท่ง
+      a(i, t) = i < na[t]   → ระดับ i เข้าไม้ได้ในแท่ง t
+      b(i, t) = i >= nb[t]  → ไม้ของระดับ i ถึง TP ในแท่ง t
+    ต่อระดับเป็น state machine: a อย่างเดียว = เปิด, b อย่างเดียว = ปิด, ทั้งคู่ = สลับ (ตามกติกาในแท่งเดียว)
+    สถานะเปลี่ยนได้เฉพาะแท่งที่ a/b ของระดับนั้นพลิก หรือแท่งที่เป็นทั้งคู่ → สร้างเฉพาะคู่ (level, bar) เหล่านั้น
+    แล้วหา state ด้วย cumsum (ค่าล่าสุดที่ตั้ง/ล้าง XOR parity ของการสลับหลังจากนั้น)
+    คืน (level, bar, is_fill) ของทุกการเปลี่ยนสถานะ เรียงตาม level แล้ว bar
+    """
+    n = na.size
+    bars = np.arange(n, dtype=np.int64)
+    prev_na = np.concatenate(([0], na[:-1]))
+    prev_nb = np.concatenate(([n_levels], nb[:-1]))
+    parts = [
+        _expand_ranges(np.minimum(prev_na, na), np.maximum(prev_na, na), bars),   # a พลิก
+        _expand_ranges(np.minimum(prev_nb, nb), np.maximum(prev_nb, nb), bars),   # b พลิก
+        _expand_ranges(nb, na, bars),                                             # a และ b ในแท่งเดียว
+    ]
+    key = np.unique(np.concatenate([lv * n + bt for lv, bt in parts]))
+    level, bar = np.divmod(key, n)
+    a = na[bar] > level
+    b = nb[bar] <= level
+
+    pos = np.arange(key.size)
+    seg = np.flatnonzero(np.concatenate(([True], level[1:] != level[:-1])))
+    seg_start = np.repeat(seg, np.diff(np.append(seg, key.size)))
+
+    fixed = a ^ b                      # ตั้ง (a) หรือ ล้าง (b) อย่างใดอย่างหนึ่ง
+    toggle = (a & b).astype(np.int64)
+    tcum = np.cumsum(toggle)
+    last_fixed = np.maximum.accumulate(np.where(fixed, pos, -1))
+    has_fixed = last_fixed >= seg_start
+    lf = np.where(has_fixed, last_fixed, 0)
+    base = has_fixed & a[lf]
+    t_ref = np.where(has_fixed, tcum[lf], tcum[seg_start] - toggle[seg_start])
+    state = base ^ ((tcum - t_ref) & 1).astype(bool)
+
+    prev = np.concatenate(([False], state[:-1]))
+    prev[seg] = False                  # ทุกระดับเริ่มจากไม่มีไม้
+    change = state != prev
+    return level[change], bar[change], state[change]
+
+
+# ---------------------------------------------
+# ENGINE
+# ---------------------------------------------
+def backtest_grid(
+    high,
+    low,
+    close,
+    spacing_pts: float,
+    direction: str = "LONG",
+    n_orders: Optional[int] = None,
+    ref_price: Optional[float] = None,
+    tp_points: Optional[float] = None,
+    lot: float = 0.01,
+    contract_size: float = 100.0,
+    leverage: float = 1000.0,
+    balance: float = 10_000.0,
+    point_value: float = 0.01,
+    stop_out_pct: Optional[float] = DEFAULT_STOP_OUT_PCT,
+    spread_points: float = 0.0,
+    commission_per_lot: float = 0.0,
+    open_=None,
+) -> Dict[str, object]:
+    """
+    เล่นกริดย้อนหลังทีละแท่งบน OHLC (ราคา bid) — ระดับกริดเดียวกับ func.build_grid_levels
+    - ระดับ i = ref ∓ i·spacing (LONG ลง / SHORT ขึ้น), n_orders=None → ทุกระดับที่ราคาในข้อมูลไปถึง
+    - เข้าไม้เมื่อราคาแตะระดับ (LONG: low+spread <= ระดับ, SHORT: high >= ระดับ) ที่ราคาระดับ
+    - ปิดที่ TP = ระดับ ± tp_points (None = spacing) แล้วระดับนั้นพร้อมเข้าใหม่
+    - มาร์จิ้น/ไม้ = ราคาเข้า·lot·contract/leverage (สูตรเดียวกับ build_grid_plan)
+    - margin level = equity / used margin · 100 <= stop_out_pct → ปิดทุกไม้ที่ราคาเลวร้ายสุดของแท่ง แล้วหยุดเทรด
+      (stop_out_pct=None → ไม่ตรวจ)
+    - ไม่จำลองการปฏิเสธคำสั่งเพราะ free margin ไม่พอ (จำนวนไม้คุมด้วย n_orders เหมือนตารางกริด)
+    ทั้งหมด vectorized (searchsorted / cumsum / bincount) — ข้อมูล M1 10 ปีใช้เวลาระดับวินาที
+    คืน dict: "trades" / "equity" (dict ของ ndarray ที่จองขนาดไว้ครั้งเดียว), "levels", "tp_levels", "summary"
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n_bars = close.size
+    if n_bars == 0:
+        raise ValueError("ไม่มีข้อมูลราคา")
+    is_long = _side_sign(direction) < 0
+    pv = float(point_value)
+    d = float(spacing_pts) * pv
+    if d <= 0:
+        raise ValueError("spacing ต้องมากกว่า 0")
+    spr = float(spread_points) * pv
+    tp = float(spacing_pts if tp_points is None else tp_points) * pv
+    if ref_price is None:
+        ref_price = float(open_[0]) if open_ is not None else float(close[0])
+    ref_price = float(ref_price)
+    unit = float(lot) * float(contract_size)
+
+    # ---- ระดับกริด: ไม่เกินที่ราคาในข้อมูลไปถึง (ระดับที่ไม่เคยถูกแตะไม่มีผล) ----
+    if is_long:
+        reach = int(math.floor((ref_price - (float(np.nanmin(low)) + spr)) / d)) + 1
+    else:
+        reach = int(math.floor((float(np.nanmax(high)) - ref_price) / d)) + 1
+    limit = grid_level_limit(ref_price, spacing_pts, direction, pv)
+    n_levels = max(0, reach)
+    for cap in (n_orders, limit):
+        if cap is not None:
+            n_levels = min(n_levels, int(cap))
+    levels = np.asarray(build_grid_levels(ref_price, n_levels, spacing_pts, direction, pv), dtype=np.float64)
+    tp_levels = np.round(levels + (tp if is_long else -tp), 2)
+
+    # ---- ต่อแท่ง: จำนวนระดับที่เข้าไม้ได้ (na) / ระดับแรกที่ถึง TP (nb) ----
+    if is_long:
+        worst = low
+        na = np.searchsorted(-levels, -(low + spr), side="right")
+        nb = np.searchsorted(-tp_levels, -high, side="left")
+    else:
+        worst = high + spr
+        na = np.searchsorted(levels, high, side="right")
+        nb = np.searchsorted(tp_levels, low + spr, side="left")
+    na = np.where(np.isnan(low) | np.isnan(high), 0, na)
+    nb = np.where(np.isnan(low) | np.isnan(high), n_levels, nb)
+
+    lv, bt, is_fill = _level_transitions(na.astype(np.int64), nb.astype(np.int64), n_levels)
+
+    # ---- trade log (จองครั้งเดียวตามจำนวนไม้ที่เข้า) ----
+    fill_pos = np.flatnonzero(is_fill)
+    n_tr = fill_pos.size
+    nxt = fill_pos + 1
+    closed = nxt < lv.size
+    closed[closed] = lv[nxt[closed]] == lv[fill_pos[closed]]
+
+    trades = {
+        "level": np.empty(n_tr, dtype=np.int32),
+        "entry_bar": np.empty(n_tr, dtype=np.int64),
+        "entry_price": np.empty(n_tr, dtype=np.float64),
+        "exit_bar": np.full(n_tr, -1, dtype=np.int64),
+        "exit_price": np.full(n_tr, np.nan),
+        "pnl": np.zeros(n_tr, dtype=np.float64),
+        "reason": np.full(n_tr, REASON_OPEN, dtype=np.int8),
+    }
+    trades["level"][:] = lv[fill_pos]
+    trades["entry_bar"][:] = bt[fill_pos]
+    trades["entry_price"][:] = levels[lv[fill_pos]]
+    trades["exit_bar"][closed] = bt[nxt[closed]]
+    trades["exit_price"][closed] = tp_levels[lv[fill_pos[closed]]]
+    trades["reason"][closed] = REASON_TP
+
+    sgn = 1.0 if is_long else -1.0
+    cost = float(commission_per_lot) * float(lot)
+
+    def _settle():
+        c = trades["reason"] != REASON_OPEN
+        trades["pnl"][:] = 0.0
+        trades["pnl"][c] = sgn * (trades["exit_price"][c] - trades["entry_price"][c]) * unit - cost
+
+    _settle()
+    equity = _equity_arrays(trades, n_bars, close + (0.0 if is_long else spr), worst, sgn, unit,
+                            float(balance), float(leverage))
+
+    # ---- stop-out: ปิดทุกไม้ที่ยังเปิดที่ราคาเลวร้ายสุดของแท่งนั้น แล้วหยุดเทรด ----
+    stop_bar = -1
+    if stop_out_pct is not None:
+        used = equity["used_margin"]
+        hit = np.flatnonzero((used > 0) & (equity["equity_min"] <= used * float(stop_out_pct) / 100.0))
+        if hit.size:
+            stop_bar = int(hit[0])
+            trigger_level = float(equity["margin_level"][stop_bar])
+            keep = trades["entry_bar"] <= stop_bar
+            for k in trades:
+                trades[k] = trades[k][keep]
+            still_open = (trades["exit_bar"] < 0) | (trades["exit_bar"] > stop_bar)
+            trades["exit_bar"][still_open] = stop_bar
+            trades["exit_price"][still_open] = worst[stop_bar]
+            trades["reason"][still_open] = REASON_STOP_OUT
+            _settle()
+            equity = _equity_arrays(trades, n_bars, close + (0.0 if is_long else spr), worst, sgn, unit,
+                                    float(balance), float(leverage))
+            equity["margin_level"][stop_bar] = trigger_level   # แท่งที่โดนตัด: เก็บ margin level ตอนถูกตัด
+
+    order = np.argsort(trades["entry_bar"], kind="stable")
+    trades = {k: v[order] for k, v in trades.items()}
+
+    return {
+        "trades": trades,
+        "equity": equity,
+        "levels": levels,
+        "tp_levels": tp_levels,
+        "summary": _summary(trades, equity, float(balance), stop_bar, n_levels, n_bars),
+    }
+
+
+def _equity_arrays(trades: Dict[str, np.ndarray], n_bars: int, mark: np.ndarray, worst: np.ndarray,
+                   sgn: float, unit: float, balance: float, leverage: float) -> Dict[str, np.ndarray]:
+    """equity log ต่อแท่งจาก trade log (bincount + cumsum) — จองทุกคอลัมน์ยาว n_bars ครั้งเดียว"""
+    c = trades["exit_bar"] >= 0
+    ent, ex = trades["entry_bar"], trades["exit_bar"][c]
+    px_in = trades["entry_price"]
+
+    out = {
+        "balance": np.empty(n_bars), "equity": np.empty(n_bars), "equity_min": np.empty(n_bars),
+        "used_margin": np.empty(n_bars), "margin_level": np.empty(n_bars),
+        "open_orders": np.empty(n_bars, dtype=np.int32),
+    }
+    n_open = np.cumsum(np.bincount(ent, minlength=n_bars) - np.bincount(ex, minlength=n_bars))
+    s_open = np.cumsum(np.bincount(ent, weights=px_in, minlength=n_bars)
+                       - np.bincount(ex, weights=px_in[c], minlength=n_bars))
+    s_open[n_open == 0] = 0.0          # กันเศษทศนิยมสะสมตอนไม่มีไม้
+    out["open_orders"][:] = n_open
+    np.cumsum(np.bincount(ex, weights=trades["pnl"][c], minlength=n_bars), out=out["balance"])
+    out["balance"] += balance
+    out["equity"][:] = out["balance"] + sgn * (n_open * mark - s_open) * unit
+    out["equity_min"][:] = out["balance"] + sgn * (n_open * worst - s_open) * unit
+    out["used_margin"][:] = s_open * unit / leverage if leverage > 0 else 0.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["margin_level"][:] = np.where(out["used_margin"] > 0,
+                                          out["equity_min"] / out["used_margin"] * 100.0, np.nan)
+    return out
+
+
+def _summary(trades: Dict[str, np.ndarray], equity: Dict[str, np.ndarray], balance: float,
+             stop_bar: int, n_levels: int, n_bars: int) -> Dict[str, object]:
+    eq, eq_min = equity["equity"], equity["equity_min"]
+    peak = np.maximum.accumulate(np.maximum(eq, balance))
+    dd = peak - eq_min
+    i_dd = int(np.argmax(dd))
+    ml = equity["margin_level"]
+    return {
+        "bars": n_bars,
+        "levels": n_levels,
+        "trades": int(trades["entry_bar"].size),
+        "tp_trades": int(np.count_nonzero(trades["reason"] == REASON_TP)),
+        "open_at_end": int(np.count_nonzero(trades["reason"] == REASON_OPEN)),
+        "stop_out": stop_bar >= 0,
+        "stop_out_bar": stop_bar if stop_bar >= 0 else None,
+        "realized_pnl": float(equity["balance"][-1] - balance),
+        "final_equity": float(eq[-1]),
+        "max_open_orders": int(equity["open_orders"].max()),
+        "max_used_margin": float(equity["used_margin"].max()),
+        "min_margin_level": float(np.nanmin(ml)) if np.any(~np.isnan(ml)) else None,
+        "max_drawdown": float(dd[i_dd]),
+        "max_drawdown_pct": float(dd[i_dd] / peak[i_dd] * 100.0) if peak[i_dd] > 0 else 0.0,
+    }
+
+
+# ---------------------------------------------
+# FRAMES (แสดงผล / ดาวน์โหลด)
+# ---------------------------------------------
+def trades_frame(res: Dict[str, object], dates=None) -> pd.DataFrame:
+    """trade log → DataFrame (dates: เวลาของแต่ละแท่ง เพื่อแปลง bar index เป็นวันที่)"""
+    t = res["trades"]
+    df = pd.DataFrame({
+        "Level": t["level"] + 1,
+        "Entry price": t["entry_price"],
+        "Exit price": t["exit_price"],
+        "P/L ($)": t["pnl"],
+        "Reason": pd.Categorical.from_codes(t["reason"], [REASON_LABELS[k] for k in sorted(REASON_LABELS)]),
+    })
+    if dates is not None:
+        d = np.asarray(dates, dtype="datetime64[ns]")
+        df.insert(1, "Entry time", d[t["entry_bar"]])
+        exit_time = np.full(t["exit_bar"].size, np.datetime64("NaT"), dtype="datetime64[ns]")
+        c = t["exit_bar"] >= 0
+        exit_time[c] = d[t["exit_bar"][c]]
+        df.insert(3, "Exit time", exit_time)
+    else:
+        df.insert(1, "Entry bar", t["entry_bar"])
+        df.insert(3, "Exit bar", t["exit_bar"])
+    return df
+
+
+def equity_frame(res: Dict[str, object], dates=None, max_points: int = 2000) -> pd.DataFrame:
+    """
+    equity log → DataFrame สำหรับกราฟ (ย่อเหลือไม่เกิน max_points จุด)
+    แต่ละจุด = ช่วงแท่งติดกัน: equity/balance ณ แท่งสุดท้าย, equity_min ต่ำสุดในช่วง (ไม่ทำให้ drawdown หาย)
+    """
+    e = res["equity"]
+    n = e["equity"].size
+    starts = np.arange(0, n, max(1, -(-n // max(1, int(max_points)))))
+    last = np.append(starts[1:], n) - 1
+    df = pd.DataFrame({
+        "Equity": e["equity"][last],
+        "Equity (worst)": np.fmin.reduceat(e["equity_min"], starts),
+        "Balance": e["balance"][last],
+        "Used margin": np.fmax.reduceat(e["used_margin"], starts),
+        "Open orders": np.maximum.reduceat(e["open_orders"], starts),
+    })
+    if dates is not None:
+        df.index = pd.DatetimeIndex(np.asarray(dates, dtype="datetime64[ns]")[starts], name="date")
+    return df
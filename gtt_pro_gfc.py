@@ -1,19 +1,31 @@
 # gtt_pro_gfc.py
 from __future__ import annotations
 
-import io
 import math
-from typing import List, Dict
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-from func import hr, header, ensure_ohlc_columns, atr_points, round_to, grid_levels, last_feasible_index
+import ohlc_store
+from grid_backtest import DEFAULT_STOP_OUT_PCT, backtest_grid, equity_frame, trades_frame
+from quantile_sketch import PERCENTILES
+from func import (
+    hr, header, DATE_PRESETS, date_preset_index, ohlc_point_arrays, compute_atr_points, round_to,
+    infer_timeframe, timeframe_minutes, resampled_slice_index,
+    build_grid_plan, grid_plan_frame, last_feasible_index, grid_feasible_orders, grid_display_rows, show_grid_table,
+)
+
+# timeframe ที่ให้เลือกคำนวณสถิติ (เฉพาะที่ใหญ่กว่าแท่งของไฟล์)
+STATS_TIMEFRAMES = ["H1", "H4", "D1", "W1"]
+
+# ที่มาของ Coverage ที่แนะนำ: percentile จริงของ range/TR (จาก quantile sketch) หรือสูตรเดิม Mean + k·SD
+COVERAGE_BASES = [f"Range P{p}" for p in PERCENTILES[1:]] + [f"TR P{p}" for p in PERCENTILES[1:]] + ["Mean + k·SD"]
 
 
 def render_gfc_tab(default_symbol: str = "XAUUSD"):
     header("🧮 GTT PRO — Generate From CSV", "คำนวณ Mean/SD/ATR จากไฟล์ราคา แล้วออกแบบกริด")
-    st.caption("อัปโหลดไฟล์ OHLC (daily) → เลือกช่วงเวลา → สร้างกริดด้วยสถิติที่ได้")
+    st.caption("อัปโหลดไฟล์ OHLC (daily หรือ intraday เช่น M1) → เลือกช่วงเวลา/timeframe → สร้างกริดด้วยสถิติที่ได้")
     hr()
 
     # ------ พารามิเตอร์ร่วม ------
@@ -36,29 +48,46 @@ def render_gfc_tab(default_symbol: str = "XAUUSD"):
         st.info("อัปโหลดไฟล์เพื่อเริ่มคำนวณ")
         return
 
-    # ------ เตรียมข้อมูล ------
+    # ------ เตรียมข้อมูล (ไฟล์เดิม → เปิด store บนดิสก์ ไม่ต้องพาร์ส CSV ซ้ำ) ------
     try:
-        df_raw = pd.read_csv(io.BytesIO(up.read()))
-        df = ensure_ohlc_columns(df_raw, point_value=point_value)
+        store = ohlc_store.load_csv_upload(up.getvalue(), symbol)
     except Exception as e:
         st.error(f"อ่านไฟล์ไม่สำเร็จ: {e}")
         return
+    if store.rows == 0:
+        st.error("ไฟล์ไม่มีข้อมูล")
+        return
 
     # default date range: since 2025-01-01
     st.markdown("#### Data filters")
-    min_date = df["date"].min().date()
-    max_date = df["date"].max().date()
-    default_start = max(min_date, pd.to_datetime("2025-01-01").date())
-    start_date, end_date = st.date_input(
-        "Use date range",
-        value=(default_start, max_date),
-        min_value=min_date, max_value=max_date,
-        key="gfc_daterange"
-    )
-    mask = (df["date"].dt.date >= start_date) & (df["date"].dt.date <= end_date)
-    df = df.loc[mask].reset_index(drop=True)
-    st.caption(f"Rows after filter: {len(df):,}")
+    d_first, d_last = store.date_bounds()
+    min_date = d_first.date()
+    max_date = d_last.date()
+    default_start = min(max(min_date, pd.to_datetime("2025-01-01").date()), max_date)
+    cf1, cf2 = st.columns([1, 2])
+    preset = cf1.selectbox("Range preset", DATE_PRESETS, index=0, key="gfc_preset")
+    if preset == "Custom":
+        picked = cf2.date_input(
+            "Use date range",
+            value=(default_start, max_date),
+            min_value=min_date, max_value=max_date,
+            key="gfc_daterange"
+        )
+        # ระหว่างเลือกช่วง date_input คืนแค่วันแรก → ใช้ถึงวันสุดท้ายไปก่อน
+        start_date, end_date = (tuple(picked) + (max_date,))[:2] if isinstance(picked, (tuple, list)) else (picked, max_date)
+        i0, i1 = store.slice_index(start_date, end_date)
+    elif preset in ("Last N days", "Last N bars"):
+        by_days = preset == "Last N days"
+        n_last = int(cf2.number_input("N (วัน)" if by_days else "N (แท่ง)", min_value=1, value=365 if by_days else 1000,
+                                      step=1, key="gfc_preset_n"))
+        i0, i1 = date_preset_index(store.dates, preset, n_last)
+    else:
+        i0, i1 = date_preset_index(store.dates, preset)
+    st.caption(f"Rows after filter: {i1 - i0:,}")
     hr(300)
+    if i1 <= i0:
+        st.warning("ไม่มีข้อมูลในช่วงวันที่ที่เลือก")
+        return
 
     # ------ Volatility ------
     st.markdown("### 📊 Volatility (from file)")
@@ -68,25 +97,96 @@ def render_gfc_tab(default_symbol: str = "XAUUSD"):
     atr_mult_for_spacing = colm3.number_input("ATR× for spacing", value=0.40, step=0.05, min_value=0.05, key="gfc_atrx")
     step_round = int(colm4.number_input("Round spacing to (pts)", value=50, step=50, min_value=10, key="gfc_round"))
 
-    df["ATR_point"] = atr_points(df, window=window, method=atr_method)
-    mean_pts = float(df["range_point"].mean())
-    sd_pts = float(df["range_point"].std())
-    atr_med = float(df["ATR_point"].median())
+    # ------ Timeframe ของสถิติ (ไฟล์ intraday → รวมเป็น D1/H4/H1 ก่อน) ------
+    src_tf = infer_timeframe(store.dates) or "D1"
+    src_min = timeframe_minutes(src_tf)
+    tf_choices = [tf for tf in STATS_TIMEFRAMES if timeframe_minutes(tf) > src_min]
+    ct1, ct2, ct3 = st.columns(3)
+    stats_tf = ct1.selectbox(
+        f"Stats timeframe (ไฟล์ ≈ {src_tf})", ["As uploaded"] + tf_choices,
+        index=1 if tf_choices and "D1" in tf_choices else 0, key="gfc_tf",
+    )
+    session_tz = ct2.text_input("Session timezone", value="UTC", key="gfc_tz",
+                                help="เช่น UTC, Europe/Athens (เวลา server โบรกส่วนใหญ่), America/New_York")
+    session_start = ct3.text_input("Session start (HH:MM)", value="00:00", key="gfc_session",
+                                   help="เวลาเริ่มวันเทรดตาม timezone ด้านซ้าย (เช่น 22:00 UTC)")
+
+    # รวมแท่งเฉพาะ timeframe ที่เลือก (ตารางเทียบ = ไฟล์ต้นทาง + timeframe นั้น)
+    tf_stores = {}
+    if stats_tf != "As uploaded":
+        try:
+            tf_stores[stats_tf] = ohlc_store.resampled(store, stats_tf, session_tz, session_start)
+        except Exception as e:
+            st.error(f"รวมแท่งไม่สำเร็จ (ตรวจ timezone / session start): {e}")
+            return
+    tf_stores["As uploaded"] = store
+
+    # ช่วงเวลาเดียวกับที่เลือกจากไฟล์ต้นทาง (UTC) → แท่งรวมที่ทับช่วงนั้น (เวลาเริ่มแท่งตาม session timezone)
+    t_first, t_last = store.dates[i0], store.dates[i1 - 1]
+
+    def _stats(tf, src):
+        j0, j1 = (i0, i1) if src is store else resampled_slice_index(src.dates, t_first, t_last, tf, session_tz)
+        if j1 <= j0:
+            return None
+        # คำนวณจาก view ของ memmap ตรง ๆ (TR แท่งแรกใช้ close ของแท่งก่อนช่วงที่เลือก)
+        close_all = src.column("close")
+        range_pts, tr_pts = ohlc_point_arrays(
+            src.column("high")[j0:j1], src.column("low")[j0:j1], close_all[j0:j1], point_value,
+            prev_close=close_all[j0 - 1] if j0 > 0 else None,
+        )
+        atr_pts = compute_atr_points(tr_pts, window=window, method=atr_method)
+        sd = float(np.nanstd(range_pts, ddof=1)) if np.count_nonzero(~np.isnan(range_pts)) > 1 else float("nan")
+        # percentile จาก sketch ราย block ของ store (merge แทนการเรียงข้อมูลทั้งช่วง) — หน่วยราคา → points
+        pct = {name: src.sketch(name, j0, j1).scaled(1.0 / point_value).percentiles(PERCENTILES)
+               for name in ("range", "tr")}
+        return {"bars": j1 - j0, "mean": float(np.nanmean(range_pts)), "sd": sd,
+                "atr_med": float(np.nanmedian(atr_pts)), "last_close": float(close_all[j1 - 1]), "pct": pct}
+
+    stats_by_tf = {tf: _stats(tf, src) for tf, src in tf_stores.items()}
+    if len(tf_stores) > 1:
+        st.dataframe(
+            pd.DataFrame([
+                {"Timeframe": f"{src_tf} (file)" if tf == "As uploaded" else tf, "Bars": v["bars"],
+                 "Mean range (pts)": v["mean"], "SD (pts)": v["sd"], f"ATR{window} median (pts)": v["atr_med"],
+                 "P95 range (pts)": v["pct"]["range"][95], "P99 range (pts)": v["pct"]["range"][99]}
+                for tf, v in stats_by_tf.items() if v is not None
+            ]).style.format({"Bars": "{:,}", "Mean range (pts)": "{:,.0f}", "SD (pts)": "{:,.0f}",
+                             f"ATR{window} median (pts)": "{:,.0f}", "P95 range (pts)": "{:,.0f}",
+                             "P99 range (pts)": "{:,.0f}"}),
+            use_container_width=True, hide_index=True,
+        )
+    sel = stats_by_tf.get(stats_tf)
+    if sel is None:
+        st.warning("ไม่มีแท่งในช่วงวันที่ที่เลือกสำหรับ timeframe นี้")
+        return
+    mean_pts, sd_pts, atr_med = sel["mean"], sel["sd"], sel["atr_med"]
 
     colx1, colx2, colx3 = st.columns(3)
-    colx1.metric("Mean range (pts)", f"{mean_pts:,.0f}")
+    colx1.metric(f"Mean range (pts) · {src_tf if stats_tf == 'As uploaded' else stats_tf}", f"{mean_pts:,.0f}")
     colx2.metric("SD (pts)", f"{sd_pts:,.0f}")
     colx3.metric(f"ATR{window} median (pts)", f"{atr_med:,.0f}")
+    st.dataframe(
+        pd.DataFrame({f"P{p}": [sel["pct"]["range"][p], sel["pct"]["tr"][p]] for p in PERCENTILES},
+                     index=["Range (pts)", "TR (pts)"]).style.format("{:,.0f}"),
+        use_container_width=True,
+    )
 
     # ------ Grid design ------
     st.markdown("### 🧩 Grid design (from volatility)")
-    ref_price = st.number_input("Reference price (USD)", value=float(df['close'].iloc[-1]),
+    ref_price = st.number_input("Reference price (USD)", value=sel["last_close"],
                                 step=0.1, format="%.2f", key="gfc_ref")
     direction = st.radio("Direction", options=["LONG (Buy-only)", "SHORT"], horizontal=True, index=0, key="gfc_dir")
 
     spacing_from_atr = round_to(atr_med * atr_mult_for_spacing, step_round)
-    k = st.slider("k for Mean ± k·SD coverage", 1.0, 3.0, 2.5, 0.5, key="gfc_k")
-    coverage_from_stats = round_to((mean_pts + k * sd_pts), 500)
+    cov_basis = st.selectbox("Coverage from", COVERAGE_BASES, index=COVERAGE_BASES.index(f"Range P{PERCENTILES[-1]}"),
+                             key="gfc_cov_basis", help="percentile จริงของ range/TR ต่อแท่ง หรือสูตร Mean + k·SD แบบเดิม")
+    if cov_basis == "Mean + k·SD":
+        k = st.slider("k for Mean ± k·SD coverage", 1.0, 3.0, 2.5, 0.5, key="gfc_k")
+        coverage_from_stats = round_to((mean_pts + k * sd_pts), 500)
+    else:
+        name, _, p = cov_basis.partition(" P")
+        cov_pct = sel["pct"][name.lower()][int(p)]
+        coverage_from_stats = round_to(cov_pct, 500) if np.isfinite(cov_pct) else 0
 
     colg1, colg2, colg3 = st.columns(3)
     spacing_pts = int(colg1.number_input("Spacing (points)", value=max(50, spacing_from_atr),
@@ -94,65 +194,44 @@ def render_gfc_tab(default_symbol: str = "XAUUSD"):
     coverage_pts = int(colg2.number_input("Coverage downwards (points)", value=max(1000, coverage_from_stats),
                                           step=500, min_value=spacing_pts, key="gfc_coverage"))
     max_orders_cov = int(math.floor(coverage_pts / spacing_pts) + 1)
-    max_show = int(colg3.number_input("Max orders to show", value=min(120, max_orders_cov),
+    side_flag = "LONG" if direction.startswith("LONG") else "SHORT"
+    # จำนวนไม้ที่มาร์จิ้นรวมไม่เกินทุน (สูตรปิด) → ค่าเริ่มต้นของตาราง = ถึงจุดนั้น + หน้าต่างแสดงผล
+    n_feasible = grid_feasible_orders(
+        ref_price, spacing_pts, side_flag, lot=float(lot_size), contract_size=float(contract_sz),
+        leverage=float(leverage), budget=float(balance), point_value=point_value, limit=max_orders_cov,
+    )
+    max_show = int(colg3.number_input("Max orders to show", value=max(1, grid_display_rows(n_feasible, levels=max_orders_cov)),
                                       min_value=1, step=1, key="gfc_show"))
 
     tp_points = int(st.number_input("TP per order (points)", value=int(spacing_pts),
                                     step=step_round, min_value=step_round, key="gfc_tp"))
 
-    # ------ Compute ------
-    side_flag = "LONG" if direction.startswith("LONG") else "SHORT"
-    levels = grid_levels(ref_price, min(max_orders_cov, max_show), spacing_pts, direction=side_flag, point_value=point_value)
-
-    rows: List[Dict] = []
-    cum_cost = 0.0
-    cum_margin = 0.0
-    for i, price in enumerate(levels, start=1):
-        cost_i = float(price) * float(lot_size) * float(contract_sz)
-        margin_i = (cost_i / float(leverage)) if leverage > 0 else 0.0
-        cum_cost += cost_i
-        cum_margin += margin_i
-
-        tp_price = round(price + (tp_points * point_value) * (1 if side_flag == "LONG" else -1), 2)
-
-        rows.append({
-            "Order #": i,
-            "Price": price,
-            "Lot": lot_size,
-            "TP (pts)": tp_points,
-            "TP price": tp_price,
-            "Cost/Order ($)": cost_i,
-            "Margin/Order ($)": margin_i,
-            "Cum Cost ($)": cum_cost,
-            "Cum Margin ($)": cum_margin,
-        })
-    df_grid = pd.DataFrame(rows)
-
-    last_idx = last_feasible_index(df_grid["Cum Margin ($)"].tolist(), float(balance))
-
-    def _hl_row(r):
-        if last_idx is not None and r.name == last_idx:
-            return ['background-color: rgba(59,130,246,.25); font-weight: 600;'] * len(r)
-        return [''] * len(r)
+    # ------ Compute (vectorized) ------
+    plan = build_grid_plan(
+        ref_price, spacing_pts, min(max_orders_cov, max_show), side=side_flag,
+        lot=float(lot_size), contract_size=float(contract_sz), leverage=float(leverage),
+        tp_points=tp_points, point_value=point_value,
+    )
+    df_grid = grid_plan_frame(plan)
 
-    st.dataframe(
-        df_grid.style
-            .format({
-                "Price": "{:,.2f}",
-                "Lot": "{:.2f}",
-                "TP (pts)": "{:,.0f}",
-                "TP price": "{:,.2f}",
-                "Cost/Order ($)": "{:,.2f}",
-                "Margin/Order ($)": "{:,.2f}",
-                "Cum Cost ($)": "{:,.2f}",
-                "Cum Margin ($)": "{:,.2f}",
-            })
-            .apply(_hl_row, axis=1)
-            .set_table_styles([{'selector': 'th', 'props': [('text-align', 'center')]}])
-            .set_properties(**{'text-align': 'center'}),
-        use_container_width=True,
-        height=min(560, (len(df_grid)+2)*33)
+    last_idx = last_feasible_index(plan["cum_margin"], float(balance))
+
+    show_grid_table(
+        df_grid,
+        {
+            "Price": "{:,.2f}",
+            "Lot": "{:.2f}",
+            "TP (pts)": "{:,.0f}",
+            "TP price": "{:,.2f}",
+            "Cost/Order ($)": "{:,.2f}",
+            "Margin/Order ($)": "{:,.2f}",
+            "Cum Cost ($)": "{:,.2f}",
+            "Cum Margin ($)": "{:,.2f}",
+        },
+        {} if last_idx is None else {last_idx: "background-color: rgba(59,130,246,.25); font-weight: 600;"},
     )
+    if n_feasible is not None and last_idx is not None and last_idx + 1 < n_feasible:
+        st.caption(f"ทุนพอเปิดได้ถึง {n_feasible:,} ไม้ — เพิ่ม Max orders to show เพื่อดูทั้งหมด")
 
     st.markdown("---")
     if last_idx is not None:
@@ -175,4 +254,65 @@ def render_gfc_tab(default_symbol: str = "XAUUSD"):
         f"Symbol: {symbol} • Direction: {side_flag} • Balance: ${balance:,.2f} • "
         f"Leverage: {int(leverage):,}× • Ref: {ref_price:,.2f} • Lot: {lot_size:.2f} • "
         f"Contract: {contract_sz:,.0f} • 1pt={point_value:.4f}"
+    )
+
+    # ------ Backtest: เล่นกริดนี้ย้อนหลังบนแท่งของไฟล์ (ช่วงวันที่ที่เลือก) ------
+    st.markdown("---")
+    st.markdown("### 🔁 Backtest (ช่วงวันที่ที่เลือก)")
+    st.caption("เล่นกริดเดียวกับตารางด้านบนทีละแท่งบนข้อมูลที่อัปโหลด (ไม่ได้รวม timeframe) — ใช้ไฟล์ M1 จะแม่นที่สุด")
+    cb1, cb2, cb3, cb4 = st.columns(4)
+    rec_n = (last_idx + 1) if last_idx is not None else 1
+    bt_orders = int(cb1.number_input("Orders", min_value=1, value=max(1, rec_n), step=1, key="gfc_bt_orders",
+                                     help="ค่าเริ่มต้น = จำนวนไม้ที่แนะนำด้านบน"))
+    bt_stop_out = float(cb2.number_input("Stop-out level (%)", min_value=0.0, value=DEFAULT_STOP_OUT_PCT, step=10.0,
+                                         key="gfc_bt_stopout"))
+    bt_spread = float(cb3.number_input("Spread (points)", min_value=0.0, value=0.0, step=5.0, key="gfc_bt_spread"))
+    bt_anchor = cb4.selectbox("Grid start", ["ราคาแรกของช่วง", "Reference price"], index=0, key="gfc_bt_anchor")
+
+    if not st.checkbox("Run backtest", value=False, key="gfc_bt_run"):
+        return
+    has_open = "open" in store.columns
+    bt_ref = float(ref_price) if bt_anchor == "Reference price" else float(
+        store.column("open")[i0] if has_open else store.column("close")[i0])
+    try:
+        res = backtest_grid(
+            store.column("high")[i0:i1], store.column("low")[i0:i1], store.column("close")[i0:i1],
+            spacing_pts, side_flag, n_orders=bt_orders, ref_price=bt_ref, tp_points=tp_points,
+            lot=float(lot_size), contract_size=float(contract_sz), leverage=float(leverage),
+            balance=float(balance), point_value=point_value, stop_out_pct=bt_stop_out, spread_points=bt_spread,
+        )
+    except Exception as e:
+        st.error(f"Backtest ไม่สำเร็จ: {e}")
+        return
+    summ = res["summary"]
+    dates = store.dates[i0:i1]
+
+    if summ["stop_out"]:
+        st.error(
+            f"Stop-out ที่ {pd.Timestamp(dates[summ['stop_out_bar']]):%Y-%m-%d %H:%M} — "
+            f"{bt_orders:,} ไม้ที่ spacing {spacing_pts:,} pts ไม่รอดช่วงข้อมูลนี้"
+        )
+    else:
+        st.success(
+            f"ไม่โดน stop-out ตลอด {summ['bars']:,} แท่ง — เปิดพร้อมกันสูงสุด {summ['max_open_orders']:,} / {bt_orders:,} ไม้"
+        )
+    mb1, mb2, mb3, mb4 = st.columns(4)
+    mb1.metric("Realized P/L ($)", f"{summ['realized_pnl']:,.2f}", f"{summ['tp_trades']:,} TP")
+    mb2.metric("Final equity ($)", f"{summ['final_equity']:,.2f}", f"{summ['open_at_end']:,} open")
+    mb3.metric("Max drawdown", f"${summ['max_drawdown']:,.0f}", f"{summ['max_drawdown_pct']:.1f}%", delta_color="off")
+    mb4.metric("Min margin level", "-" if summ["min_margin_level"] is None else f"{summ['min_margin_level']:,.0f}%")
+
+    st.line_chart(equity_frame(res, dates)[["Equity", "Equity (worst)", "Balance"]])
+    df_tr = trades_frame(res, dates)
+    st.dataframe(df_tr.tail(500), use_container_width=True, hide_index=True,
+                 column_config={c: st.column_config.NumberColumn(format="%.2f")
+                                for c in ("Entry price", "Exit price", "P/L ($)")})
+    st.caption(f"ดีล {len(df_tr):,} รายการ (แสดง 500 ล่าสุด) • ระดับกริด {summ['levels']:,} • เริ่มที่ {bt_ref:,.2f}")
+    st.download_button(
+        "ดาวน์โหลด trade log (CSV)",
+        data=df_tr.to_csv(index=False).encode("utf-8"),
+        file_name=f"gttpro_{symbol}_{side_flag.lower()}_backtest.csv",
+        mime="text/csv",
+        use_container_width=True,
+        key="gfc_bt_download",
     )
\ No newline at end of file
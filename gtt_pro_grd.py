@@ -2,12 +2,14 @@
 from __future__ import annotations
 
 import math
-from typing import List, Dict
+from typing import Dict
 
-import pandas as pd
 import streamlit as st
 
-from func import hr, header, round_to, grid_levels, last_feasible_index
+from func import (
+    hr, header, round_to, build_grid_plan, grid_plan_frame, last_feasible_index,
+    grid_feasible_orders, grid_display_rows, show_grid_table, GRID_DISPLAY_WINDOW,
+)
 
 # ---------------- Presets ----------------
 SYMBOL_PRESETS: Dict[str, Dict[str, float]] = {
@@ -151,92 +153,65 @@ def render_grd_tab(default_symbol: str = "XAUUSD"):
 
     # จำนวนไม้แปรผันตาม coverage/spacing (ไม่มี input max orders อีกแล้ว)
     max_orders_cov = int(math.floor(coverage_pts / spacing_pts) + 1)
-    max_orders_cov = min(max_orders_cov, 400)  # กันตารางใหญ่เกินไป
-
-    # ---------- สร้างกริด ----------
     side_flag = "LONG" if direction.startswith("LONG") else "SHORT"
-    levels = grid_levels(ref_price, max_orders_cov, spacing_pts, direction=side_flag, point_value=pv)
-
-    # ---------- ตารางต้นทุน/มาร์จิ้น ----------
-    rows: List[Dict] = []
-    cum_cost = 0.0
-    cum_margin = 0.0
-    for i, price in enumerate(levels, start=1):
-        cost_i = float(price) * float(lot_size) * float(contract_sz)
-        margin_i = (cost_i / float(leverage)) if leverage > 0 else 0.0
-        cum_cost += cost_i
-        cum_margin += margin_i
-
-        tp_price = round(price + (tp_points * pv) * (1 if side_flag == "LONG" else -1), 2)
-
-        rows.append({
-            "Order #": i,
-            "Price": price,
-            "Lot": lot_size,
-            "TP (pts)": tp_points,
-            "TP price": tp_price,
-            "Cost/Order ($)": cost_i,
-            "Margin/Order ($)": margin_i,
-            "Cum Cost ($)": cum_cost,
-            "Cum Margin ($)": cum_margin,
-        })
-
-    df_manual = pd.DataFrame(rows)
 
-    # ---------- ไฮไลท์ 2 เงื่อนไข ----------
+    # ---------- ขอบเขต 2 เงื่อนไข (สูตรปิด ไม่ต้องสร้างตารางทั้ง coverage) ----------
     # 1) จำกัดด้วยทุน/มาร์จิ้นรวม ≤ balance (ฟ้า)
-    idx_by_margin = last_feasible_index(df_manual["Cum Margin ($)"].tolist(), float(balance))
-
-    # 2) จำกัดด้วย Buffer: L(N) ≤ balance (แดง)
-    n_max_buffer = _max_orders_by_buffer(
+    n_by_margin = grid_feasible_orders(
+        ref_price, spacing_pts, side_flag, lot=float(lot_size), contract_size=float(contract_sz),
+        leverage=float(leverage), budget=float(balance), point_value=pv, limit=max_orders_cov,
+    )
+    # 2) จำกัดด้วย Buffer: L(N) ≤ balance (แดง) — ไม่เกิน coverage
+    n_max_buffer = min(_max_orders_by_buffer(
         balance=float(balance),
         lot=float(lot_size),
         buffer_pts=float(buffer_pts),
         spacing_pts=float(spacing_pts),
         vpp=float(VPP_PER_LOT),
+    ), max_orders_cov)
+
+    # ---------- สร้างกริด + ตารางต้นทุน/มาร์จิ้น: ถึงขอบเขตที่มากสุด + หน้าต่างแสดงผล ----------
+    n_rows = grid_display_rows(n_by_margin, n_max_buffer, levels=max_orders_cov)
+    plan = build_grid_plan(
+        ref_price, spacing_pts, n_rows, side=side_flag,
+        lot=float(lot_size), contract_size=float(contract_sz), leverage=float(leverage),
+        tp_points=tp_points, point_value=pv,
     )
-    # ให้ไม่เกินจำนวนแถวที่มี (coverage)
-    idx_by_buffer = (n_max_buffer - 1) if n_max_buffer > 0 else None
-    if idx_by_buffer is not None and idx_by_buffer >= len(df_manual):
-        idx_by_buffer = len(df_manual) - 1 if len(df_manual) > 0 else None
-    if idx_by_buffer is not None and idx_by_buffer < 0:
-        idx_by_buffer = None
+    df_manual = grid_plan_frame(plan)
+
+    # ---------- ไฮไลท์ 2 เงื่อนไข ----------
+    idx_by_margin = last_feasible_index(plan["cum_margin"], float(balance))   # ค่าแน่นอนจากตาราง (binary search)
+    idx_by_buffer = (n_max_buffer - 1) if 0 < n_max_buffer <= len(df_manual) else None
 
     # สีไฮไลท์
     base_color = "background-color: rgba(59,130,246,.25);"   # ฟ้า
     buf_color  = "background-color: rgba(239,68,68,.25);"    # แดง
-
-    def _hl_row(r):
-        styles = [''] * len(r)
-        i = r.name
-        both = (idx_by_margin is not None and i == idx_by_margin) and (idx_by_buffer is not None and i == idx_by_buffer)
-        if both:
-            styles = ["background: linear-gradient(90deg, rgba(59,130,246,.25) 0%, rgba(239,68,68,.25) 100%); font-weight:600;"] * len(r)
-        else:
-            if idx_by_margin is not None and i == idx_by_margin:
-                styles = [base_color] * len(r)
-            if idx_by_buffer is not None and i == idx_by_buffer:
-                styles = [buf_color] * len(r)
-        return styles
-
-    st.dataframe(
-        df_manual.style
-            .format({
-                "Price": "{:,.2f}",
-                "Lot": "{:.2f}",
-                "TP (pts)": "{:,.0f}",
-                "TP price": "{:,.2f}",
-                "Cost/Order ($)": "{:,.2f}",
-                "Margin/Order ($)": "{:,.2f}",
-                "Cum Cost ($)": "{:,.2f}",
-                "Cum Margin ($)": "{:,.2f}",
-            })
-            .apply(_hl_row, axis=1)
-            .set_table_styles([{'selector': 'th', 'props': [('text-align', 'center')]}])
-            .set_properties(**{'text-align': 'center'}),
-        use_container_width=True,
-        height=min(560, (len(df_manual)+2)*33)
+    row_styles = {}
+    if idx_by_margin is not None:
+        row_styles[idx_by_margin] = base_color
+    if idx_by_buffer is not None:
+        row_styles[idx_by_buffer] = buf_color
+        if idx_by_buffer == idx_by_margin:
+            row_styles[idx_by_buffer] = ("background: linear-gradient(90deg, rgba(59,130,246,.25) 0%, "
+                                         "rgba(239,68,68,.25) 100%); font-weight:600;")
+
+    show_grid_table(
+        df_manual,
+        {
+            "Price": "{:,.2f}",
+            "Lot": "{:.2f}",
+            "TP (pts)": "{:,.0f}",
+            "TP price": "{:,.2f}",
+            "Cost/Order ($)": "{:,.2f}",
+            "Margin/Order ($)": "{:,.2f}",
+            "Cum Cost ($)": "{:,.2f}",
+            "Cum Margin ($)": "{:,.2f}",
+        },
+        row_styles,
     )
+    if len(df_manual) < max_orders_cov:
+        st.caption(f"แสดง {len(df_manual):,} จาก {max_orders_cov:,} ระดับตาม coverage "
+                   f"(ถึงจุดที่เปิดได้ + อีก {GRID_DISPLAY_WINDOW} แถว)")
 
     # ---------- สรุปผลลัพธ์ + แสดง Buffer ที่ยังทนได้ ----------
     st.markdown("---")
@@ -1,7 +1,6 @@
 # home.py
-import os
-import base64
 import streamlit as st
+from asset_cache import image_data_uri
 from auth import init_auth, is_logged_in, login_box  # <<< เพิ่ม
 
 def render_home_page():
@@ -95,11 +94,9 @@ def render_home_page():
     st.markdown("<div class='home-container'>", unsafe_allow_html=True)
 
     # โลโก้ (จัดกลางแน่นอน)
-    logo_path = "assets/logo.png"
-    if os.path.exists(logo_path):
-        with open(logo_path, "rb") as f:
-            _b64 = base64.b64encode(f.read()).decode("utf-8")
-        st.markdown(f"<img src='data:image/png;base64,{_b64}' class='home-logo' />", unsafe_allow_html=True)
+    logo_src = image_data_uri("assets/logo.png", width=120, fmt="WEBP")
+    if logo_src:
+        st.markdown(f"<img src='{logo_src}' class='home-logo' />", unsafe_allow_html=True)
 
     # ชื่อเพจ + คำโปรย
     st.markdown("<div class='home-title'>🔮 Tarot Trader 💹</div>", unsafe_allow_html=True)
@@ -117,13 +114,12 @@ def render_home_page():
     cols = st.columns(len(qr_data))
     for i, q in enumerate(qr_data):
         with cols[i]:
-            if os.path.exists(q["img"]):
-                with open(q["img"], "rb") as f:
-                    b64 = base64.b64encode(f.read()).decode()
+            qr_src = image_data_uri(q["img"], width=300)
+            if qr_src:
                 st.markdown(
                     f"""
                     <div style='text-align:center'>
-                        <img src='data:image/png;base64,{b64}' width='300' style='border-radius:12px; border:1px solid #333;' />
+                        <img src='{qr_src}' width='300' style='border-radius:12px; border:1px solid #333;' />
                     </div>
                     """,
                     unsafe_allow_html=True
@@ -4,22 +4,10 @@ from __future__ import annotations
 import pandas as pd
 import streamlit as st
 
-# ------------------------- Helpers -------------------------
-def _grid_prices(start_price: float, n: int, step_points: int, price_point: float, side: str) -> list[float]:
-    """สร้างราคาออกไม้ทีละช่วง points ตามทิศทาง (LONG = ลง, SHORT = ขึ้น)"""
-    if n <= 0:
-        return []
-    step_price = float(step_points) * float(price_point)
-    sgn = -1.0 if side == "LONG" else 1.0
-    return [round(start_price + sgn * i * step_price, 2) for i in range(n)]
-
-def _last_feasible_index(values: list[float], budget: float) -> int | None:
-    """คืน index สุดท้ายที่ค่าจาก values <= budget (เช่น คุมด้วย balance)"""
-    last = None
-    for i, v in enumerate(values):
-        if v <= budget:
-            last = i
-    return last
+from func import (
+    build_grid_plan, find_last_feasible_index, grid_feasible_orders, grid_level_limit, grid_display_rows,
+    show_grid_table, GRID_DISPLAY_WINDOW,
+)
 
 # ------------------------- Main UI -------------------------
 def render_atm_tab():
@@ -51,8 +39,9 @@ def render_atm_tab():
 
     side = st.radio("ทิศทางกริด", options=["LONG", "SHORT"], horizontal=True, index=0, key="atm_side")
 
-    # จำนวนไม้สูงสุดให้กว้าง ๆ (คุมด้วยทุน/เลเวอเรจในตาราง)
-    max_orders = st.slider("จำลองจำนวนไม้ (สูงสุด)", min_value=1, max_value=300, value=120, step=1, key="atm_max_orders")
+    # จำนวนไม้ในตาราง = ถึงจุดที่มาร์จิ้นรวมชนทุน (คำนวณจากสูตร) + แสดงต่ออีกเท่านี้
+    extra_rows = st.number_input("แสดงต่อจากจุดที่เปิดได้ (ไม้)", min_value=0, value=GRID_DISPLAY_WINDOW, step=10,
+                                 key="atm_extra_rows")
 
     st.markdown("---")
 
@@ -61,78 +50,58 @@ def render_atm_tab():
         st.error("กรุณากรอก Lot Size, Contract Size, price/point และ Range (points) ให้มากกว่า 0")
         return
 
-    # ---------------- Generate grid ----------------
-    prices = _grid_prices(
-        start_price=float(start_price),
-        n=int(max_orders),
-        step_points=int(range_pts),
-        price_point=float(price_point),
-        side=side,
+    # ---------------- ขอบเขต (สูตรปิด) → Generate grid + Compute (สองเคส: liq=0 และ liq = ค่าอินพุต) ----------------
+    grid_args = dict(
+        ref_price=float(start_price), spacing_pts=int(range_pts), side=side,
+        lot=float(lot_size), contract_size=float(contract_sz), leverage=float(leverage),
+        point_value=float(price_point),
     )
-
-    # ---------------- Compute (สองเคส: liq=0 และ liq = ค่าอินพุต) ----------------
-    rows = []
-    cum_cost_0 = 0.0
-    cum_margin_0 = 0.0
-    cum_cost_liq = 0.0
-    cum_margin_liq = 0.0
-
-    for i, p in enumerate(prices, start=1):
-        # เคสปกติ (ไม่มี Liq)
-        cost_i_0 = float(p) * float(lot_size) * float(contract_sz)
-        margin_i_0 = (cost_i_0 / float(leverage)) if leverage > 0 else 0.0
-        cum_cost_0 += cost_i_0
-        cum_margin_0 += margin_i_0
-
-        # เคสมี Liq: “ต้นทุน” คิดจาก (ราคาที่ออก - liq_price) * lot * contract (ถ้าติดลบ ปรับเป็น 0)
-        span = max(float(p) - float(liq_price), 0.0) if side == "LONG" else max(float(liq_price) - float(p), 0.0)
-        cost_i_liq = span * float(lot_size) * float(contract_sz)
-        margin_i_liq = (cost_i_liq / float(leverage)) if leverage > 0 else 0.0
-        cum_cost_liq += cost_i_liq
-        cum_margin_liq += margin_i_liq
-
-        rows.append({
-            "ไม้ที่": i,
-            "ราคาที่ออกไม้": p,
-
-            # เคส Liq = 0
-            "ต้นทุน/ไม้ ($)": cost_i_0,
-            "มาร์จิ้น/ไม้ ($)": margin_i_0,
-            "ต้นทุนรวม ($)": cum_cost_0,
-            "มาร์จิ้นรวม ($)": cum_margin_0,
-
-            # เคส Liq = อินพุต (ใช้ชื่อคอลัมน์แบบคงที่)
-            "ต้นทุน/ไม้ @Liq ($)": cost_i_liq,
-            "มาร์จิ้น/ไม้ @Liq ($)": margin_i_liq,
-            "ต้นทุนรวม @Liq ($)": cum_cost_liq,
-            "มาร์จิ้นรวม @Liq ($)": cum_margin_liq,
-        })
-
-    df = pd.DataFrame(rows)
+    levels = grid_level_limit(float(start_price), int(range_pts), side, float(price_point))   # LONG: ราคายัง > 0
+    base_n = grid_feasible_orders(**grid_args, budget=float(balance))
+    # เคสมี Liq: มาร์จิ้นต่อไม้ลดลงเมื่อเข้าใกล้ liq → None/เท่าจำนวนระดับ = เปิดได้ไม่จำกัด
+    liq_n = grid_feasible_orders(**grid_args, budget=float(balance), liq_price=float(liq_price), limit=levels)
+    liq_unlimited = liq_n is None or (levels is not None and liq_n >= levels)
+    n_rows = grid_display_rows(base_n, None if liq_unlimited else liq_n, levels=levels, window=int(extra_rows))
+
+    base = build_grid_plan(**grid_args, n_orders=n_rows)
+    # เคสมี Liq: “ต้นทุน” คิดจาก (ราคาที่ออก - liq_price) * lot * contract (ถ้าติดลบ ปรับเป็น 0)
+    liq = build_grid_plan(**grid_args, n_orders=n_rows, liq_price=float(liq_price))
+
+    df = pd.DataFrame({
+        "ไม้ที่": base["order"],
+        "ราคาที่ออกไม้": base["price"],
+
+        # เคส Liq = 0
+        "ต้นทุน/ไม้ ($)": base["cost"],
+        "มาร์จิ้น/ไม้ ($)": base["margin"],
+        "ต้นทุนรวม ($)": base["cum_cost"],
+        "มาร์จิ้นรวม ($)": base["cum_margin"],
+
+        # เคส Liq = อินพุต (ใช้ชื่อคอลัมน์แบบคงที่)
+        "ต้นทุน/ไม้ @Liq ($)": liq["cost"],
+        "มาร์จิ้น/ไม้ @Liq ($)": liq["margin"],
+        "ต้นทุนรวม @Liq ($)": liq["cum_cost"],
+        "มาร์จิ้นรวม @Liq ($)": liq["cum_margin"],
+    })
 
     # ---------------- Highlight rule ----------------
     # คุมด้วย “เงินทุนที่ต้องใช้” = “มาร์จิ้นรวม” ไม่ให้เกิน balance
     base_cum_margin_col = "มาร์จิ้นรวม ($)"
     liq_cum_margin_col  = "มาร์จิ้นรวม @Liq ($)"
 
-    base_idx = _last_feasible_index(df[base_cum_margin_col].tolist(), float(balance))
-    liq_idx  = _last_feasible_index(df[liq_cum_margin_col].tolist(), float(balance))
+    base_idx = find_last_feasible_index(base["cum_margin"], float(balance))
+    liq_idx  = None if liq_unlimited else find_last_feasible_index(liq["cum_margin"], float(balance))
 
-    # สีไฮไลท์ (สองกรณี)
+    # สีไฮไลท์ (สองกรณี) — ชนทั้งคู่ใช้ pattern ผสม
     base_color = "background-color: rgba(59,130,246,.25);"   # ฟ้าอ่อน
     liq_color  = "background-color: rgba(239,68,68,.25);"    # แดงอ่อน
-
-    def _hl_row(r):
-        styles = [''] * len(r)
-        if base_idx is not None and r.name == base_idx:
-            styles = [base_color] * len(r)
-        if liq_idx is not None and r.name == liq_idx:
-            # ถ้าชนทั้งคู่ ใช้ pattern ผสม
-            if base_idx is not None and r.name == base_idx:
-                styles = ["background: linear-gradient(90deg, rgba(59,130,246,.25) 0%, rgba(239,68,68,.25) 100%);"] * len(r)
-            else:
-                styles = [liq_color] * len(r)
-        return styles
+    row_styles = {}
+    if base_idx is not None:
+        row_styles[base_idx] = base_color
+    if liq_idx is not None:
+        row_styles[liq_idx] = liq_color
+        if liq_idx == base_idx:
+            row_styles[liq_idx] = "background: linear-gradient(90deg, rgba(59,130,246,.25) 0%, rgba(239,68,68,.25) 100%);"
 
     # ---------------- Render ----------------
     st.markdown(
@@ -171,14 +140,7 @@ def render_atm_tab():
         "มาร์จิ้นรวม @Liq ($)": "{:,.2f}",
     }
 
-    sty = (
-        df.style
-          .format(fmt)
-          .apply(_hl_row, axis=1)
-          .set_table_styles([{'selector': 'th', 'props': [('text-align', 'center')]}])
-          .set_properties(**{'text-align': 'center'})
-    )
-    st.dataframe(sty, use_container_width=True, height=min(560, (len(df) + 2) * 33))
+    show_grid_table(df, fmt, row_styles)
 
     # สรุปผลลัพธ์สองกรณี (ตำแหน่งที่แนะนำ)
     st.markdown("---")
@@ -192,7 +154,12 @@ def render_atm_tab():
         else:
             st.warning("🔵 เคส Liq=0: มาร์จิ้นของไม้แรกเกิน Balance")
     with colB:
-        if liq_idx is not None:
+        if liq_unlimited:
+            st.success(
+                f"🔴 เคส Liq={liq_price:,.2f}: มาร์จิ้นรวมไม่ถึง Balance — เปิดได้ทุกระดับของกริด"
+                + (f" ({levels:,} ไม้ ก่อนราคาถึง 0)" if levels is not None else "")
+            )
+        elif liq_idx is not None:
             st.success(
                 f"🔴 เคส Liq={liq_price:,.2f}: เปิดได้สูงสุด **{liq_idx+1:,} ไม้**  | "
                 f"มาร์จิ้นรวมประมาณ **${df.loc[liq_idx, liq_cum_margin_col]:,.2f}** (≤ ${balance:,.2f})"
@@ -8,7 +8,10 @@ import pandas as pd
 import streamlit as st
 import altair as alt
 
-from func import _hr, _hrr, center_latex, info_box, grid_entries
+from func import (
+    _hr, _hrr, center_latex, info_box, grid_entries, build_grid_plan, grid_plan_for_prices, grid_plan_frame,
+    grid_level_limit, show_grid_table,
+)
 
 # ===== ค่าพื้นฐาน (ปรับได้) =================================
 DEFAULT_PRICE_POINT   = 0.01   # 1 point = 0.01 (เช่น XAU)
@@ -17,6 +20,23 @@ DEFAULT_CONTRACT_SIZE = 100.0  # contract size เริ่มต้น
 
 GridSide = Literal["LONG", "SHORT"]
 
+# คอลัมน์ตารางต้นทุน/มาร์จิ้น (คีย์ของ func.build_grid_plan → ชื่อคอลัมน์)
+GTT_PLAN_LABELS: Dict[str, str] = {
+    "order": "ลำดับไม้",
+    "price": "ราคาเข้า",
+    "cost": "ต้นทุน/ไม้ ($)",
+    "margin": "มาร์จิ้น/ไม้ ($)",
+    "cum_cost": "ต้นทุนรวม ($)",
+    "cum_margin": "มาร์จิ้นรวม ($)",
+}
+GTT_TABLE_FORMAT: Dict[str, str] = {
+    "ราคาเข้า": "{:,.2f}",
+    "ต้นทุน/ไม้ ($)": "{:,.2f}",
+    "มาร์จิ้น/ไม้ ($)": "{:,.2f}",
+    "ต้นทุนรวม ($)": "{:,.2f}",
+    "มาร์จิ้นรวม ($)": "{:,.2f}",
+}
+
 # ===== Logic เฉพาะของ GTT ===================================
 def _max_orders_by_risk_after_grid(
     balance: float,
@@ -95,10 +115,15 @@ def _simulate_advanced_path(
     # ราคาปลายทางอย่างน้อย buffer_pts points ไปทางเสียเปรียบ
     end_price = current + sgn_price * buffer_pts * price_point
 
-    # ระดับ “ราคาเข้าไม้ใหม่” ตามกริด step_pts
+    # ระดับ “ราคาเข้าไม้ใหม่” ตามกริด step_pts — สร้างเฉพาะระดับที่ราคาจำลองไปถึงได้
+    # (ราคาหยุดเมื่อเลย end_price ไม่เกิน 1 ก้าว; LONG ต้องยังมีราคา > 0)
+    n_reach = int(math.floor((buffer_pts + abs(step_price) / price_point) / step_pts)) + 1
+    levels = grid_level_limit(current, step_pts, side, price_point)
+    if levels is not None:
+        n_reach = min(n_reach, levels)
     grid_prices = grid_entries(
         current_price=current,
-        n_orders=10000,  # เพดานกว้าง ๆ เปิดเท่าที่ถึงจริง
+        n_orders=n_reach,
         step_points=step_pts,
         price_point=price_point,
         side=side,
@@ -265,12 +290,10 @@ def render_gtt_tab(default_mode: str = "Normal") -> None:
             step_pts=float(step_pts),
             vpp=float(vpp),
         )
-        entries = grid_entries(
-            current_price=float(current),
-            n_orders=int(n_max),
-            step_points=float(step_pts),
-            price_point=float(price_point),
-            side=side,
+        plan = build_grid_plan(
+            float(current), float(step_pts), int(n_max), side=side,
+            lot=float(lot_size), contract_size=float(contract_size), leverage=float(leverage),
+            point_value=float(price_point),
         )
 
         st.markdown(
@@ -283,39 +306,12 @@ def render_gtt_tab(default_mode: str = "Normal") -> None:
         )
 
         st.markdown("#### รายละเอียดต้นทุนและมาร์จิ้นต่อไม้")
-        if n_max <= 0 or not entries:
+        if n_max <= 0 or plan["price"].size == 0:
             st.info("ยังไม่มีไม้ที่จะเปิดได้จากเงื่อนไขปัจจุบัน")
             return
 
-        rows: List[Dict] = []
-        cum_cost = 0.0
-        cum_margin = 0.0
-        for i, price in enumerate(entries, start=1):
-            cost_i   = float(price) * float(lot_size) * float(contract_size)
-            margin_i = (cost_i / float(leverage)) if leverage > 0 else 0.0
-            cum_cost += cost_i
-            cum_margin += margin_i
-            rows.append({
-                "ลำดับไม้": i,
-                "ราคาเข้า": price,
-                "ต้นทุน/ไม้ ($)": cost_i,
-                "มาร์จิ้น/ไม้ ($)": margin_i,
-                "ต้นทุนรวม ($)": cum_cost,
-                "มาร์จิ้นรวม ($)": cum_margin,
-            })
-
-        df = pd.DataFrame(rows)
-        st.dataframe(
-            df.style.format({
-                "ราคาเข้า": "{:,.2f}",
-                "ต้นทุน/ไม้ ($)": "{:,.2f}",
-                "มาร์จิ้น/ไม้ ($)": "{:,.2f}",
-                "ต้นทุนรวม ($)": "{:,.2f}",
-                "มาร์จิ้นรวม ($)": "{:,.2f}",
-            }).set_properties(**{"text-align":"center"}),
-            use_container_width=True,
-            height=min(480, (len(df)+2)*33)
-        )
+        df = grid_plan_frame(plan, GTT_PLAN_LABELS)
+        show_grid_table(df, GTT_TABLE_FORMAT, max_height=480)
         return  # ===== END Normal =====
 
     # ===================== Advanced =====================
@@ -362,34 +358,12 @@ def render_gtt_tab(default_mode: str = "Normal") -> None:
     if n_filled <= 0:
         st.info("ไม่สามารถเปิดไม้ได้ภายใต้เงื่อนไข SO/ทุน ที่กำหนด")
     else:
-        rows2: List[Dict] = []
-        cum_cost = 0.0
-        cum_margin = 0.0
-        for i, price in enumerate(entries_filled[:n_filled], start=1):
-            cost_i   = float(price) * float(lot_size) * float(contract_size)
-            margin_i = (cost_i / float(leverage)) if leverage > 0 else 0.0
-            cum_cost += cost_i
-            cum_margin += margin_i
-            rows2.append({
-                "ลำดับไม้": i,
-                "ราคาเข้า": price,
-                "ต้นทุน/ไม้ ($)": cost_i,
-                "มาร์จิ้น/ไม้ ($)": margin_i,
-                "ต้นทุนรวม ($)": cum_cost,
-                "มาร์จิ้นรวม ($)": cum_margin,
-            })
-        df2 = pd.DataFrame(rows2)
-        st.dataframe(
-            df2.style.format({
-                "ราคาเข้า": "{:,.2f}",
-                "ต้นทุน/ไม้ ($)": "{:,.2f}",
-                "มาร์จิ้น/ไม้ ($)": "{:,.2f}",
-                "ต้นทุนรวม ($)": "{:,.2f}",
-                "มาร์จิ้นรวม ($)": "{:,.2f}",
-            }).set_properties(**{"text-align":"center"}),
-            use_container_width=True,
-            height=min(480, (len(df2)+2)*33)
+        plan2 = grid_plan_for_prices(
+            entries_filled[:n_filled], lot=float(lot_size), contract_size=float(contract_size),
+            leverage=float(leverage), side=side,
         )
+        df2 = grid_plan_frame(plan2, GTT_PLAN_LABELS)
+        show_grid_table(df2, GTT_TABLE_FORMAT, max_height=480)
 
     # === กราฟ: 3 อัน (Equity, Used Margin, Margin Level) — กราฟละ 1 แถว เรียงราคาสูง→ต่ำ ===
     if not curve_df.empty:
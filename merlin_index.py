@@ -7,6 +7,9 @@ from merlin_jarvis import render_jarvis_tab
 from merlin_gtt import render_gtt_tab
 from merlin_atm import render_atm_tab
 from merlin_gtt_pro import render_gtt_pro_tab
+from merlin_metrics import render_metrics_tab
+from merlin_usage import render_usage_tab
+from merlin_resources import render_resources_tab
 
 
 def _go_login():
@@ -17,6 +20,7 @@ def _go_login():
 def render_page():
     # เตรียม state auth (กันเคสยังไม่ถูก init)
     auth.init_auth()
+    is_admin = auth.has_role("admin")   # ตรวจกับแคชผู้ใช้ก่อน (ลด role แล้วต้องหลุดจากหน้านี้)
     info = st.session_state.get("auth", {})
 
     # --- Gate: ต้องล็อกอินก่อน ---
@@ -27,8 +31,7 @@ def render_page():
         return
 
     # --- Gate: ต้องเป็นแอดมินเท่านั้น ---
-    user = info.get("user") or {}
-    if user.get("role") != "admin":
+    if not is_admin:
         st.error("หน้านี้สงวนสิทธิ์สำหรับผู้ดูแลระบบ (Admin) เท่านั้น")
         return
 
@@ -38,7 +41,10 @@ def render_page():
     _hr(420)
 
     # Tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["🤖 จาวิส", "🜏 GTT — Gemini Tenebris Theoria", "🜏 GTT PRO", "🪙 ATM"])
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(
+        ["🤖 จาวิส", "🜏 GTT — Gemini Tenebris Theoria", "🜏 GTT PRO", "🪙 ATM", "📈 DB Metrics", "📊 Usage",
+         "🧩 Resources"]
+    )
     with tab1:
         render_jarvis_tab()
     with tab2:
@@ -46,4 +52,10 @@ def render_page():
     with tab3:
         render_gtt_pro_tab()
     with tab4:
-        render_atm_tab()
\ No newline at end of file
+        render_atm_tab()
+    with tab5:
+        render_metrics_tab()
+    with tab6:
+        render_usage_tab()
+    with tab7:
+        render_resources_tab()
\ No newline at end of file
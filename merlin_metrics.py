@@ -0,0 +1,72 @@
+# merlin_metrics.py
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+import streamlit as st
+
+import auth
+import auth_metrics
+
+
+def _table(rows: dict, key_name: str) -> pd.DataFrame:
+    df = pd.DataFrame.from_dict(rows, orient="index")
+    df.index.name = key_name
+    return df.reset_index()
+
+
+def render_metrics_tab():
+    """สถิติฐานข้อมูลของ auth: เวลาต่อฟังก์ชัน/statement, เวลารอพูล, reconnect (ค่าในหน่วยความจำของ process นี้)"""
+    st.subheader("📈 DB Metrics")
+    st.caption("ค่าสะสมตั้งแต่ process เริ่ม (หรือกดล้างล่าสุด) — ใช้แยกว่าเวลาหายไปที่พูล, network หรือ query")
+
+    data = auth.db_metrics()
+
+    c1, c2, c3 = st.columns([1, 1, 1])
+    with c1:
+        if st.button("🔄 รีเฟรช", use_container_width=True, key="mm_metrics_refresh"):
+            st.rerun()
+    with c2:
+        st.download_button(
+            "⬇️ ดาวน์โหลด JSON",
+            data=json.dumps(data, ensure_ascii=False, indent=2, default=str),
+            file_name="tarot_db_metrics.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+    with c3:
+        if st.button("🧹 ล้างค่า", use_container_width=True, key="mm_metrics_reset"):
+            auth_metrics.reset()
+            st.rerun()
+
+    counters = data["counters"]
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Statements", f"{counters['statements']:,}", help=f"error {counters['statement_errors']:,}")
+    m2.metric("Checkouts", f"{counters['checkouts']:,}", help=f"timeout {counters['checkout_timeouts']:,}")
+    m3.metric("Connect ใหม่", f"{counters['connects']:,}")
+    m4.metric("Disconnect / Retry", f"{counters['disconnects']:,} / {counters['retries']:,}",
+              help=f"connection ที่ถูก invalidate {counters['invalidated']:,}")
+
+    st.markdown("**พูล (Pool)**")
+    if data["pools"]:
+        pools = pd.DataFrame(data["pools"])
+        pools["peak_checked_out"] = data["peaks"]["peak_checked_out"]
+        pools["peak_overflow"] = max(0, data["peaks"]["peak_overflow"])
+        st.dataframe(pools, use_container_width=True, hide_index=True)
+    if data["pool_timings"]:
+        st.dataframe(_table(data["pool_timings"], "pool"), use_container_width=True, hide_index=True)
+
+    st.markdown("**เวลาต่อฟังก์ชัน (รวมรอพูล + network + query)**")
+    if data["operations"]:
+        st.dataframe(_table(data["operations"], "operation"), use_container_width=True, hide_index=True)
+    else:
+        st.info("ยังไม่มีข้อมูล")
+
+    st.markdown("**เวลาต่อ statement (ส่งไป server → ได้ผลกลับ)**")
+    if data["statements"]:
+        df = _table(data["statements"], "statement").sort_values("total_ms", ascending=False)
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
+    with st.expander("bcrypt worker pool / แคชผู้ใช้ / DB warm-up"):
+        st.json({"bcrypt_pool": data["bcrypt_pool"], "user_cache": data["user_cache"], "db_warmup": data["db_warmup"]})
@@ -0,0 +1,87 @@
+# merlin_resources.py
+from __future__ import annotations
+
+import threading
+
+import pandas as pd
+import streamlit as st
+
+import app_resources
+import ohlc_store
+import auth  # noqa: F401  (ลงทะเบียน db_engine / bcrypt_pool)
+import func  # noqa: F401  (ลงทะเบียน http_session / price_clients)
+
+# สแกนโฟลเดอร์ OHLC store แคชไว้ช่วงสั้น ๆ (tab ทุกอันของเมอร์ลินรันทุก rerun)
+STORE_USAGE_TTL_S = 60
+
+
+@st.cache_data(ttl=STORE_USAGE_TTL_S, show_spinner=False)
+def _store_usage():
+    return ohlc_store.store_usage()
+
+
+def render_resources_tab():
+    """resource ระดับ process (engine, worker pool, HTTP/price client) + health check + สร้างใหม่"""
+    st.subheader("🧩 Resources")
+    st.caption("สร้างครั้งเดียวต่อ process และใช้ร่วมกันทุก session — ตัวที่ยังไม่เคยถูกใช้จะยังไม่ถูกสร้าง")
+
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        if st.button("🩺 ตรวจสุขภาพทั้งหมด", use_container_width=True, key="res_check"):
+            bad = {k: msg for k, (ok, msg) in app_resources.check_all().items() if not ok}
+            if bad:
+                st.error("ไม่ผ่าน: " + ", ".join(f"{k} ({msg})" for k, msg in bad.items()))
+            else:
+                st.success("ผ่านทั้งหมด")
+
+    rows = app_resources.diagnostics()
+    df = pd.DataFrame(rows).drop(columns=["stats"])
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    with c2:
+        live = [r["name"] for r in rows if r["live"]]
+        r1, r2 = st.columns([2, 1])
+        with r1:
+            name = st.selectbox("resource", live, key="res_reset_name", label_visibility="collapsed")
+        with r2:
+            if st.button("♻️ สร้างใหม่", use_container_width=True, key="res_reset", disabled=not live):
+                app_resources.reset(name)   # ปิดตัวเดิม ครั้งถัดไปที่ถูกขอจะสร้างใหม่
+                st.rerun()
+
+    for r in rows:
+        if r["live"] and r["stats"]:
+            with st.expander(f"{r['name']} — stats"):
+                st.json(r["stats"])
+
+    with st.expander("OHLC stores (ดิสก์)"):
+        usage = _store_usage()
+        total_mb = sum(r["bytes"] for r in usage) / 1e6
+        st.caption(f"{ohlc_store.STORE_ROOT} · {len(usage)} store · {total_mb:,.1f} MB "
+                   f"(ล้างอัตโนมัติเมื่อเกิน {ohlc_store.STORE_MAX_BYTES / 1e6:,.0f} MB "
+                   f"หรือไม่ได้ใช้ {ohlc_store.STORE_MAX_AGE_S // 86400} วัน)")
+        if usage:
+            st.dataframe(pd.DataFrame(usage), use_container_width=True, hide_index=True)
+        s1, s2, s3, s4 = st.columns([2, 1, 1, 1])
+        with s1:
+            key = st.selectbox("store", [r["key"] for r in usage], key="res_store_key", label_visibility="collapsed")
+        with s2:
+            if st.button("🗑️ ลบ store", use_container_width=True, key="res_store_drop", disabled=not usage):
+                ohlc_store.drop_store(key)
+                _store_usage.clear()
+                st.rerun()
+        with s3:
+            if st.button("🧹 ล้างตามกติกา", use_container_width=True, key="res_store_sweep"):
+                removed = ohlc_store.sweep_stores()
+                _store_usage.clear()
+                if removed:
+                    st.success(f"ลบ {len(removed)} store")
+                else:
+                    st.info("ไม่มี store ที่ต้องลบ")
+        with s4:
+            if st.button("🔄 รีเฟรช", use_container_width=True, key="res_store_refresh"):
+                _store_usage.clear()
+                st.rerun()
+
+    with st.expander("background threads"):
+        threads = sorted(t.name for t in threading.enumerate() if t.name.startswith("tt-"))
+        st.write(threads or "—")
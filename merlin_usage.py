@@ -0,0 +1,72 @@
+# merlin_usage.py
+from __future__ import annotations
+
+import pandas as pd
+import streamlit as st
+
+import auth
+import event_log
+
+# tab ทุกอันของเมอร์ลินรันทุก rerun → สรุปจาก DB แคชไว้ช่วงสั้น ๆ (กดรีเฟรชเพื่ออ่านใหม่ทันที)
+SUMMARY_TTL_S = 60
+
+
+@st.cache_data(ttl=SUMMARY_TTL_S, show_spinner=False)
+def _event_summary(hours: int):
+    return auth.event_summary(hours=hours)
+
+
+def render_usage_tab():
+    """สรุปการใช้งานจากตาราง events (เพจยอดนิยม, ผู้ใช้ที่ active, ล็อกอินต่อชั่วโมง)"""
+    st.subheader("📊 Usage")
+    st.caption(f"event ถูกเขียนลง DB เป็น batch ทุก ๆ ไม่กี่วินาที และสรุปถูกแคชไว้ {SUMMARY_TTL_S} วินาที "
+               "— ตัวเลขล่าสุดอาจช้ากว่าจริงเล็กน้อย")
+
+    c1, c2, c3 = st.columns([2, 1, 1])
+    with c1:
+        hours = st.select_slider("ช่วงเวลาย้อนหลัง (ชั่วโมง)", options=[1, 6, 24, 72, 168, 720], value=24,
+                                 key="usage_hours")
+    with c2:
+        st.write("")
+        if st.button("⏫ เขียน event ที่ค้างตอนนี้", use_container_width=True, key="usage_flush"):
+            event_log.flush(timeout_s=5.0)
+            _event_summary.clear()
+    with c3:
+        st.write("")
+        if st.button("🔄 รีเฟรช", use_container_width=True, key="usage_refresh"):
+            _event_summary.clear()
+
+    try:
+        data = _event_summary(int(hours))
+    except Exception as e:
+        st.error(f"อ่านตาราง events ไม่สำเร็จ: {e}")
+        return
+
+    views = pd.DataFrame(data["page_views"], columns=["page", "views", "users"])
+    logins = pd.DataFrame(data["logins_per_hour"], columns=["hour (UTC)", "สำเร็จ", "ล้มเหลว"])
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("ผู้ใช้ที่ active", f"{data['active_users']:,}")
+    m2.metric("Page views", f"{int(views['views'].sum()) if not views.empty else 0:,}")
+    m3.metric("ล็อกอินสำเร็จ / ล้มเหลว",
+              f"{int(logins['สำเร็จ'].sum()) if not logins.empty else 0:,} / "
+              f"{int(logins['ล้มเหลว'].sum()) if not logins.empty else 0:,}")
+
+    st.markdown("**Views ต่อเพจ**")
+    if views.empty:
+        st.info("ยังไม่มีข้อมูลในช่วงนี้")
+    else:
+        st.bar_chart(views.set_index("page")["views"])
+        st.dataframe(views, use_container_width=True, hide_index=True)
+
+    st.markdown("**ล็อกอินต่อชั่วโมง**")
+    if logins.empty:
+        st.info("ยังไม่มีการล็อกอินในช่วงนี้")
+    else:
+        st.bar_chart(logins.set_index("hour (UTC)"))
+
+    with st.expander("สถานะคิว event (write-behind)"):
+        s = event_log.stats()
+        st.json(s)
+        if s["dropped"]:
+            st.warning(f"ทิ้ง event ไปแล้ว {int(s['dropped']):,} รายการ (คิวเต็ม/DB ล่มนาน)")
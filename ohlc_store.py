@@ -0,0 +1,498 @@
+# ohlc_store.py
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from func import date_slice_index, ensure_ohlc_derived_columns, ohlc_point_arrays, resample_ohlc
+from quantile_sketch import DEFAULT_DELTA, PERCENTILES, TDigest, merge_sketches
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+# ที่เก็บ store บนดิสก์ (ทุก worker บนเครื่องเดียวกันชี้ที่เดียวกัน → แชร์ page cache ของ OS)
+STORE_ROOT = os.environ.get("TAROT_OHLC_STORE", os.path.join(tempfile.gettempdir(), "tarot_ohlc"))
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+# คอลัมน์ที่เก็บ (date เก็บเป็น int64 ns UTC-naive, ที่เหลือ float64) — คอลัมน์อื่นในไฟล์ไม่ถูกเก็บ
+DATE_COL = "date"
+VALUE_COLS = ("open", "high", "low", "close", "volume")
+
+# layout:  <STORE_ROOT>/<key>/manifest.json
+#          <STORE_ROOT>/<key>/<column>.bin     (array ต่อเนื่องก้อนเดียวต่อคอลัมน์, little-endian)
+#          <STORE_ROOT>/<key>/sketches.json    (quantile sketch ของ range/TR ทีละ block — ดู SKETCH_*)
+
+# sketch ของ range / TR (หน่วยราคา) แยกทีละ SKETCH_BLOCK แถว → ช่วงวันที่ใดก็ได้ = merge block ที่อยู่ข้างใน
+# + sketch ขอบช่วงจาก memmap (ไม่ต้องอ่านทั้งช่วง)
+SKETCH_FILE = "sketches.json"
+SKETCH_BLOCK = 1 << 16
+SKETCH_COLS = ("range", "tr")
+
+# ล้าง store เก่าแบบ LRU (เวลาใช้ล่าสุด = mtime ของ manifest.json ซึ่งถูกแตะทุก TOUCH_EVERY_S ขณะใช้งาน)
+# - ไม่ได้ใช้นานเกิน STORE_MAX_AGE_S → ลบ
+# - ขนาดรวมเกิน STORE_MAX_BYTES → ลบตัวที่ใช้ล่าสุดนานที่สุดก่อนจนไม่เกิน
+# - ตัวที่ใช้ภายใน STORE_MIN_IDLE_S ไม่ถูกลบ (session/worker อื่นอาจกำลังอ่าน memmap อยู่)
+STORE_MAX_BYTES = int(os.environ.get("TAROT_OHLC_STORE_MAX_MB", "2048")) * 1024 * 1024
+STORE_MAX_AGE_S = 7 * 86400
+STORE_MIN_IDLE_S = 600
+TOUCH_EVERY_S = 60
+SWEEP_EVERY_S = 300             # write_store ล้างอัตโนมัติไม่ถี่กว่านี้ต่อ process
+STALE_TMP_S = 3600              # โฟลเดอร์ชั่วคราวที่ค้าง (เขียนไม่จบเพราะ process ตาย)
+
+_LOCK = threading.Lock()
+_OPEN: Dict[str, "OhlcStore"] = {}   # path → store ที่เปิดแล้ว (memmap ใช้ร่วมกันทั้ง process)
+_LAST_SWEEP = 0.0
+
+
+# ---------------------------------------------
+# STORE
+# ---------------------------------------------
+class OhlcStore:
+    """
+    OHLC แบบคอลัมน์บนดิสก์ เปิดด้วย numpy.memmap (read-only)
+    - ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ: OS อ่านเฉพาะหน้าที่ถูกแตะ และแชร์ข้าม process ผ่าน page cache
+    - date เรียงจากน้อยไปมากเสมอ (เรียงตอนเขียน) → ตัดช่วงวันที่ด้วย searchsorted
+    """
+
+    def __init__(self, path: str, manifest: Dict):
+        self.path = path
+        self.manifest = manifest
+        self.rows = int(manifest["rows"])
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._sketches: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._touched = 0.0
+
+    def touch(self) -> bool:
+        """บันทึกเวลาใช้ล่าสุด (ไม่ถี่กว่า TOUCH_EVERY_S) — False = store ถูกลบไปแล้ว"""
+        now = time.time()
+        if now - self._touched < TOUCH_EVERY_S:
+            return True
+        try:
+            os.utime(os.path.join(self.path, MANIFEST))
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print("ohlc_store touch error:", e)
+        self._touched = now
+        return True
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.manifest["columns"])
+
+    def column(self, name: str) -> np.ndarray:
+        """array ของคอลัมน์ (memmap read-only; date = datetime64[ns] view ของ int64 บนดิสก์)"""
+        arr = self._arrays.get(name)
+        if arr is not None:
+            return arr
+        meta = self.manifest["columns"].get(name)
+        if meta is None:
+            raise KeyError(f"column {name!r} not in store {os.path.basename(self.path)}")
+        with self._lock:
+            arr = self._arrays.get(name)
+            if arr is None:
+                if self.rows == 0:
+                    arr = np.empty(0, dtype=meta["dtype"])   # memmap ไฟล์ว่างไม่ได้
+                else:
+                    arr = np.memmap(os.path.join(self.path, meta["file"]), dtype=meta["dtype"],
+                                    mode="r", shape=(self.rows,))
+                if name == DATE_COL:
+                    arr = arr.view("datetime64[ns]")
+                self._arrays[name] = arr
+        return arr
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.column(DATE_COL)
+
+    def date_bounds(self) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        if self.rows == 0:
+            return None, None
+        d = self.dates
+        return pd.Timestamp(d[0]), pd.Timestamp(d[-1])
+
+    def slice_index(self, start=None, end=None) -> Tuple[int, int]:
+        """ช่วง index [i, j) ของแถวที่ start <= date <= end (func.date_slice_index — O(log n))"""
+        return date_slice_index(self.dates, start, end)
+
+    def frame(self, start=None, end=None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """DataFrame (zero-copy) ของช่วงวันที่ — แต่ละคอลัมน์เป็น view ของ memmap (แก้ค่าไม่ได้)"""
+        i, j = self.slice_index(start, end)
+        cols = self.columns if columns is None else list(columns)
+        return pd.DataFrame({c: self.column(c)[i:j] for c in cols}, copy=False)
+
+    def _block_sketches(self) -> Dict:
+        """sketch ราย block (โหลดครั้งเดียวต่อ process) — store เก่าที่ยังไม่มีไฟล์ → สร้างจาก memmap แล้วเขียนเก็บ"""
+        if self._sketches is not None:
+            return self._sketches
+        path = os.path.join(self.path, SKETCH_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            raw = _build_sketches(self.column("high"), self.column("low"), self.column("close"))
+            try:
+                _write_json_atomic(path, raw)
+            except OSError as e:
+                print("ohlc_store sketch write error:", e)
+        sk = _load_sketches(raw)
+        with self._lock:
+            if self._sketches is None:
+                self._sketches = sk
+        return self._sketches
+
+    def sketch(self, name: str, i: int = 0, j: Optional[int] = None) -> TDigest:
+        """
+        quantile sketch ของ name ("range" | "tr", หน่วยราคา) สำหรับแถว [i, j)
+        - block ที่อยู่ในช่วงทั้งก้อน → merge sketch ที่เก็บไว้ (O(จำนวน block · delta))
+        - เศษหัว/ท้ายช่วง → sketch สด ๆ จาก memmap (ไม่เกิน 2 block)
+        TR แถว i ใช้ close ของแถว i-1 (เหมือน ohlc_point_arrays(prev_close=...))
+        """
+        if name not in SKETCH_COLS:
+            raise KeyError(f"sketch {name!r} not in {SKETCH_COLS}")
+        j = self.rows if j is None else min(int(j), self.rows)
+        i = max(int(i), 0)
+        sk = self._block_sketches()
+        block = sk["block_rows"]
+        b0, b1 = -(-i // block), j // block          # block ที่อยู่ใน [i, j) ทั้งก้อน
+        parts = []
+        if b0 < b1:
+            parts.extend(sk[name][b0:b1])
+            edges = [(i, b0 * block), (b1 * block, j)]
+        else:
+            edges = [(i, j)]
+        for a, b in edges:
+            if b > a:
+                parts.append(_sketch_rows(self.column("high"), self.column("low"), self.column("close"), a, b)[name])
+        return merge_sketches(parts, delta=sk["delta"])
+
+    def info(self) -> Dict:
+        d0, d1 = self.date_bounds()
+        return {
+            "path": self.path,
+            "rows": self.rows,
+            "columns": self.columns,
+            "bytes": sum(int(m["bytes"]) for m in self.manifest["columns"].values()),
+            "date_min": None if d0 is None else str(d0),
+            "date_max": None if d1 is None else str(d1),
+            "source": self.manifest.get("source"),
+        }
+
+
+# ---------------------------------------------
+# WRITE / OPEN
+# ---------------------------------------------
+def _store_path(key: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or STORE_ROOT, key)
+
+
+def write_store(key: str, df: pd.DataFrame, root: Optional[str] = None, source: Optional[Dict] = None) -> OhlcStore:
+    """
+    เขียน DataFrame (ต้องมี date + high/low/close) เป็น store ชื่อ key
+    - เรียงตาม date, เก็บเฉพาะ VALUE_COLS ที่มี
+    - เขียนลงโฟลเดอร์ชั่วคราวแล้ว rename ทีเดียว → worker อื่นไม่มีทางเห็น store ที่เขียนไม่ครบ
+    - มีโฟลเดอร์ key เดิมที่เปิดไม่ได้ (FORMAT_VERSION เก่า / manifest เสีย) → แทนที่ด้วยของใหม่
+    - คืน store เสมอ (เปิดไม่ได้หลังเขียน → raise)
+    """
+    if DATE_COL not in df.columns:
+        raise ValueError("ต้องมีคอลัมน์ date")
+    dates = pd.to_datetime(df[DATE_COL])
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+    order = np.argsort(dates.to_numpy(dtype="datetime64[ns]"), kind="stable")
+
+    arrays: Dict[str, np.ndarray] = {DATE_COL: dates.to_numpy(dtype="datetime64[ns]")[order].view("int64")}
+    for c in VALUE_COLS:
+        if c in df.columns:
+            arrays[c] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)[order]
+
+    path = _store_path(key, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=os.path.dirname(path))
+    try:
+        meta_cols: Dict[str, Dict] = {}
+        for name, arr in arrays.items():
+            arr = np.ascontiguousarray(arr.astype(arr.dtype.newbyteorder("<"), copy=False))
+            fname = f"{name}.bin"
+            arr.tofile(os.path.join(tmp, fname))
+            meta_cols[name] = {"file": fname, "dtype": arr.dtype.str, "bytes": int(arr.nbytes)}
+        manifest = {
+            "version": FORMAT_VERSION,
+            "key": key,
+            "rows": int(len(order)),
+            "columns": meta_cols,
+            "created_at": time.time(),
+            "source": source or {},
+        }
+        with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        if all(c in arrays for c in ("high", "low", "close")):
+            # sketch ระหว่างเขียน (array ยังอยู่ในหน่วยความจำ) → เปิดครั้งต่อไปไม่ต้องสแกนซ้ำ
+            with open(os.path.join(tmp, SKETCH_FILE), "w", encoding="utf-8") as f:
+                json.dump(_build_sketches(arrays["high"], arrays["low"], arrays["close"]), f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            if open_store(key, root) is not None:
+                # มี worker อื่นเขียน key เดียวกันเสร็จก่อน (เนื้อหาเหมือนกัน) → ใช้ของเขา
+                shutil.rmtree(tmp, ignore_errors=True)
+            else:
+                _replace_dir(tmp, path)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _maybe_sweep(root)
+    st_ = open_store(key, root)
+    if st_ is None:
+        raise RuntimeError(f"ohlc_store: เปิด store {key!r} ที่เพิ่งเขียนไม่ได้ ({path})")
+    return st_
+
+
+def _replace_dir(tmp: str, path: str) -> None:
+    """แทนที่โฟลเดอร์ store ที่ใช้ไม่ได้ด้วย tmp — ย้ายของเดิมออกก่อน (rename) แล้วค่อยลบ"""
+    stale = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.stale.", dir=os.path.dirname(path))
+    try:
+        os.rename(path, os.path.join(stale, "old"))
+    except FileNotFoundError:
+        pass                                        # worker อื่นย้ายออกไปแล้ว
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)      # worker อื่นแทนที่เสร็จก่อน → ใช้ของเขา
+    shutil.rmtree(stale, ignore_errors=True)
+
+
+def _write_json_atomic(path: str, obj: Dict) -> None:
+    fd, tmp = tempfile.mkstemp(prefix=".sketch.", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def open_store(key: str, root: Optional[str] = None) -> Optional[OhlcStore]:
+    """เปิด store (ใช้ตัวเดิมถ้าเปิดแล้วใน process นี้) — ไม่มี/เสีย → None"""
+    path = _store_path(key, root)
+    with _LOCK:
+        st_ = _OPEN.get(path)
+    if st_ is not None:
+        if st_.touch():
+            return st_
+        with _LOCK:                       # ถูกล้าง (sweep จาก worker อื่น) → เปิด/สร้างใหม่
+            _OPEN.pop(path, None)
+    try:
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print("ohlc_store open error:", e)
+        return None
+    if manifest.get("version") != FORMAT_VERSION:
+        return None
+    st_ = OhlcStore(path, manifest)
+    st_.touch()
+    with _LOCK:
+        return _OPEN.setdefault(path, st_)
+
+
+def drop_store(key: str, root: Optional[str] = None) -> None:
+    path = _store_path(key, root)
+    with _LOCK:
+        _OPEN.pop(path, None)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def list_stores(root: Optional[str] = None) -> List[Dict]:
+    root = root or STORE_ROOT
+    out: List[Dict] = []
+    if not os.path.isdir(root):
+        return out
+    for name in sorted(os.listdir(root)):
+        if name.startswith("."):
+            continue
+        st_ = open_store(name, root)
+        if st_ is not None:
+            out.append(st_.info())
+    return out
+
+
+def _dir_usage(path: str) -> Tuple[int, float]:
+    """(ขนาดรวมเป็น byte, เวลาใช้ล่าสุด) ของโฟลเดอร์ store"""
+    size = 0
+    for name in os.listdir(path):
+        try:
+            size += os.path.getsize(os.path.join(path, name))
+        except OSError:
+            pass
+    try:
+        used = os.path.getmtime(os.path.join(path, MANIFEST))
+    except OSError:
+        used = os.path.getmtime(path)
+    return size, used
+
+
+def store_usage(root: Optional[str] = None) -> List[Dict]:
+    """store บนดิสก์: key, ขนาด, ไม่ได้ใช้มากี่วินาที (ใช้ล่าสุดนานสุดก่อน) — ไม่เปิด/ไม่แตะ store"""
+    root = root or STORE_ROOT
+    if not os.path.isdir(root):
+        return []
+    now = time.time()
+    out: List[Dict] = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        try:
+            size, used = _dir_usage(path)
+        except OSError:
+            continue
+        out.append({"key": name, "bytes": size, "idle_s": round(now - used, 1)})
+    out.sort(key=lambda r: -r["idle_s"])
+    return out
+
+
+def sweep_stores(root: Optional[str] = None, max_bytes: int = STORE_MAX_BYTES, max_age_s: float = STORE_MAX_AGE_S,
+                 min_idle_s: float = STORE_MIN_IDLE_S) -> List[str]:
+    """ลบ store ตามกติกา LRU ด้านบน + โฟลเดอร์ชั่วคราวที่ค้าง → คืน key ที่ลบ"""
+    root = root or STORE_ROOT
+    if not os.path.isdir(root):
+        return []
+    now = time.time()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(".") and os.path.isdir(path):
+            try:
+                if now - os.path.getmtime(path) > STALE_TMP_S:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+    usage = store_usage(root)
+    total = sum(r["bytes"] for r in usage)
+    removed: List[str] = []
+    for r in usage:                                  # ใช้ล่าสุดนานสุดก่อน
+        if r["idle_s"] < min_idle_s:
+            break
+        if r["idle_s"] > max_age_s or total > max_bytes:
+            drop_store(r["key"], root)
+            total -= r["bytes"]
+            removed.append(r["key"])
+    return removed
+
+
+def _maybe_sweep(root: Optional[str] = None) -> None:
+    global _LAST_SWEEP
+    now = time.time()
+    with _LOCK:
+        if now - _LAST_SWEEP < SWEEP_EVERY_S:
+            return
+        _LAST_SWEEP = now
+    try:
+        removed = sweep_stores(root)
+        if removed:
+            print("ohlc_store sweep:", removed)
+    except Exception as e:
+        print("ohlc_store sweep error:", e)
+
+
+# ---------------------------------------------
+# QUANTILE SKETCHES (range / TR ราย block)
+# ---------------------------------------------
+def _sketch_rows(high: np.ndarray, low: np.ndarray, close: np.ndarray, i: int, j: int,
+                 delta: int = DEFAULT_DELTA) -> Dict[str, TDigest]:
+    rng, tr = ohlc_point_arrays(high[i:j], low[i:j], close[i:j], 1.0,
+                                prev_close=close[i - 1] if i > 0 else None)
+    return {"range": TDigest(delta).update(rng), "tr": TDigest(delta).update(tr)}
+
+
+def _build_sketches(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                    block: int = SKETCH_BLOCK, delta: int = DEFAULT_DELTA) -> Dict:
+    """sketch ของ range/TR ทีละ block (ใช้หน่วยความจำแค่ block เดียว) → dict พร้อม json.dump"""
+    out: Dict = {"block_rows": int(block), "delta": int(delta), **{c: [] for c in SKETCH_COLS}}
+    for i in range(0, len(close), block):
+        sk = _sketch_rows(high, low, close, i, min(i + block, len(close)), delta)
+        for c in SKETCH_COLS:
+            out[c].append(sk[c].to_dict())
+    return out
+
+
+def _load_sketches(raw: Dict) -> Dict:
+    out = {"block_rows": int(raw["block_rows"]), "delta": int(raw.get("delta", DEFAULT_DELTA))}
+    for c in SKETCH_COLS:
+        out[c] = [TDigest.from_dict(d) for d in raw.get(c, [])]
+    return out
+
+
+def sketch_percentiles(stores: Iterable[Tuple[OhlcStore, int, Optional[int]]], name: str = "range",
+                       point_value: float = 1.0, ps: Iterable[float] = PERCENTILES) -> Dict[int, float]:
+    """
+    percentile ของ range/TR (หน่วย points) รวมหลายไฟล์/หลายช่วง: [(store, i, j), …]
+    merge sketch อย่างเดียว — ไม่ต้องโหลดข้อมูลทุกไฟล์เข้าหน่วยความจำพร้อมกัน
+    """
+    merged = merge_sketches([st_.sketch(name, i, j) for st_, i, j in stores])
+    return merged.scaled(1.0 / float(point_value)).percentiles(ps)
+
+
+# ---------------------------------------------
+# CSV UPLOAD → STORE
+# ---------------------------------------------
+def upload_key(raw: bytes, symbol: str = "") -> str:
+    """key ของไฟล์ที่อัปโหลด = symbol + hash ของเนื้อไฟล์ (ไฟล์เดิม → store เดิม ไม่ว่าจาก session ไหน)"""
+    digest = hashlib.sha1(raw).hexdigest()[:16]
+    sym = "".join(ch for ch in (symbol or "ohlc").upper() if ch.isalnum()) or "OHLC"
+    return f"{sym}_{digest}"
+
+
+def load_csv_upload(raw: bytes, symbol: str = "", root: Optional[str] = None) -> OhlcStore:
+    """
+    CSV ที่อัปโหลด → store (พาร์ส CSV เฉพาะครั้งแรกของไฟล์นั้น ครั้งต่อไปเปิด memmap อย่างเดียว)
+    ตรวจ/หาคอลัมน์วันที่ด้วยกติกาเดียวกับ func.ensure_ohlc_derived_columns
+    """
+    key = upload_key(raw, symbol)
+    st_ = open_store(key, root)
+    if st_ is not None:
+        return st_
+    df = ensure_ohlc_derived_columns(pd.read_csv(io.BytesIO(raw)))
+    return write_store(key, df, root, source={"symbol": symbol, "bytes": len(raw), "kind": "csv_upload"})
+
+
+# ---------------------------------------------
+# RESAMPLE → STORE (คำนวณครั้งเดียวต่อไฟล์ × timeframe × tz × session)
+# ---------------------------------------------
+def resampled(store: OhlcStore, timeframe: str, tz: str = "UTC", session_start: str = "00:00",
+              root: Optional[str] = None) -> OhlcStore:
+    """
+    store ของแท่ง timeframe ที่รวมจาก store ต้นทาง (เก็บเป็น store แยก key ข้าง ๆ กัน)
+    ครั้งแรกรวมแบบ vectorized แล้วเขียนลงดิสก์ ครั้งต่อไป/worker อื่นเปิด memmap อย่างเดียว
+    """
+    tz_slug = "".join(ch if ch.isalnum() else "-" for ch in tz)
+    key = f"{store.manifest['key']}__{timeframe.upper()}_{tz_slug}_{str(session_start).replace(':', '')}"
+    out = open_store(key, root or os.path.dirname(store.path))
+    if out is not None:
+        return out
+    cols = store.columns
+    res = resample_ohlc(
+        store.dates, store.column("high"), store.column("low"), store.column("close"),
+        open_=store.column("open") if "open" in cols else None,
+        volume=store.column("volume") if "volume" in cols else None,
+        timeframe=timeframe, tz=tz, session_start=session_start,
+    )
+    res.pop("bars", None)
+    source = {"from": store.manifest["key"], "timeframe": timeframe.upper(), "tz": tz, "session_start": session_start}
+    return write_store(key, pd.DataFrame(res, copy=False), root or os.path.dirname(store.path), source=source)
@@ -0,0 +1,143 @@
+# quantile_sketch.py
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# ---------------------------------------------
+# CONFIG
+# ---------------------------------------------
+# t-digest แบบ merging: เก็บ centroid (mean, weight) ไม่เกินราว DEFAULT_DELTA ตัว ไม่ว่าข้อมูลจะยาวแค่ไหน
+# scale function k1 ทำให้ centroid ที่หาง (P1/P99) เล็กมาก → หางแม่นกว่ากลางการกระจาย
+DEFAULT_DELTA = 200
+DEFAULT_CHUNK = 1 << 18          # sketch_array: อ่านทีละก้อน (memmap ไม่ถูกดึงเข้าหน่วยความจำทั้งก้อน)
+PERCENTILES = (50, 90, 95, 99)
+
+
+# ---------------------------------------------
+# SKETCH
+# ---------------------------------------------
+class TDigest:
+    """
+    Quantile sketch ที่ merge ได้ (t-digest, merging variant, vectorized ด้วย numpy)
+    - update(values): เพิ่มทีละก้อน → centroid เดิม + ค่าใหม่ เรียงแล้วยุบรวมด้วย reduceat
+    - merge(other): รวม sketch จากไฟล์/worker อื่น (ผลเท่ากับ update ค่าทั้งหมดรวมกัน โดยประมาณ)
+    - quantile(q): ประมาณค่าจาก centroid (min/max เก็บแบบแม่นยำ)
+    หน่วยความจำคงที่ O(delta) — ค่า NaN/inf ถูกข้าม
+    """
+
+    __slots__ = ("delta", "means", "weights", "count", "min", "max")
+
+    def __init__(self, delta: int = DEFAULT_DELTA):
+        self.delta = int(delta)
+        self.means = np.zeros(0, dtype=np.float64)
+        self.weights = np.zeros(0, dtype=np.float64)
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __repr__(self) -> str:
+        return f"TDigest(delta={self.delta}, count={self.count:,.0f}, centroids={self.means.size})"
+
+    # ---- build ----
+    def update(self, values) -> "TDigest":
+        v = np.asarray(values, dtype=np.float64).ravel()
+        v = v[np.isfinite(v)]
+        if v.size == 0:
+            return self
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        self._compress(np.concatenate((self.means, v)),
+                       np.concatenate((self.weights, np.ones(v.size))))
+        return self
+
+    def merge(self, *others: "TDigest") -> "TDigest":
+        others = [o for o in others if o is not None and o.count > 0]
+        if not others:
+            return self
+        self.min = min([self.min] + [o.min for o in others])
+        self.max = max([self.max] + [o.max for o in others])
+        self._compress(np.concatenate([self.means] + [o.means for o in others]),
+                       np.concatenate([self.weights] + [o.weights for o in others]))
+        return self
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        """เรียง centroid แล้วรวมกลุ่มที่อยู่ในช่วง k-scale เดียวกัน (k1: δ/2π · asin(2q−1)) — ไม่มี loop ใน Python"""
+        order = np.argsort(means, kind="stable")
+        m, w = means[order], weights[order]
+        cum = np.cumsum(w)
+        total = float(cum[-1])
+        q_left = (cum - w) / total
+        k = np.floor(self.delta / (2 * math.pi) * np.arcsin(np.clip(2 * q_left - 1, -1.0, 1.0)))
+        starts = np.flatnonzero(np.concatenate(([True], k[1:] != k[:-1])))
+        w_out = np.add.reduceat(w, starts)
+        self.means = np.add.reduceat(m * w, starts) / w_out
+        self.weights = w_out
+        self.count = total
+
+    # ---- query ----
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def quantiles(self, qs: Iterable[float]) -> np.ndarray:
+        """ค่าที่ quantile q (0..1) — interpolate เชิงเส้นระหว่างจุดกึ่งกลางของ centroid, ปลายยึด min/max"""
+        qs = np.clip(np.asarray(list(qs), dtype=np.float64), 0.0, 1.0)
+        if self.count <= 0:
+            return np.full(qs.shape, np.nan)
+        centers = np.cumsum(self.weights) - self.weights / 2.0
+        xp = np.concatenate(([0.0], centers, [self.count]))
+        fp = np.concatenate(([self.min], self.means, [self.max]))
+        return np.interp(qs * self.count, xp, fp)
+
+    def percentiles(self, ps: Iterable[float] = PERCENTILES) -> Dict[int, float]:
+        """{50: P50, 90: P90, …}"""
+        ps = list(ps)
+        return dict(zip(ps, (float(x) for x in self.quantiles(np.asarray(ps, dtype=np.float64) / 100.0))))
+
+    def scaled(self, factor: float) -> "TDigest":
+        """sketch ของ values × factor (factor > 0) เช่นแปลงหน่วยราคา → points โดยไม่ต้อง sketch ใหม่"""
+        f = float(factor)
+        out = TDigest(self.delta)
+        out.means, out.weights, out.count = self.means * f, self.weights.copy(), self.count
+        out.min, out.max = self.min * f, self.max * f
+        return out
+
+    # ---- serialize (เก็บลงดิสก์ / ส่งข้าม worker) ----
+    def to_dict(self) -> Dict:
+        return {
+            "delta": self.delta, "count": self.count,
+            "min": None if self.count <= 0 else self.min,
+            "max": None if self.count <= 0 else self.max,
+            "means": self.means.tolist(), "weights": self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "TDigest":
+        out = cls(int(d.get("delta", DEFAULT_DELTA)))
+        out.means = np.asarray(d.get("means", []), dtype=np.float64)
+        out.weights = np.asarray(d.get("weights", []), dtype=np.float64)
+        out.count = float(d.get("count", out.weights.sum()))
+        if out.count > 0:
+            out.min, out.max = float(d["min"]), float(d["max"])
+        return out
+
+
+# ---------------------------------------------
+# HELPERS
+# ---------------------------------------------
+def merge_sketches(sketches: Iterable[Optional[TDigest]], delta: Optional[int] = None) -> TDigest:
+    """รวมหลาย sketch (เช่นหลายไฟล์ หรือหลาย block ของ store) เป็นตัวใหม่ — ตัวต้นทางไม่ถูกแก้"""
+    sketches = [s for s in sketches if s is not None]
+    out = TDigest(delta or (sketches[0].delta if sketches else DEFAULT_DELTA))
+    return out.merge(*sketches)
+
+
+def sketch_array(values, delta: int = DEFAULT_DELTA, chunk: int = DEFAULT_CHUNK) -> TDigest:
+    """sketch ของ array ยาว ๆ ทีละก้อน (รับ memmap ได้ — ใช้หน่วยความจำแค่ขนาดก้อน)"""
+    out = TDigest(delta)
+    n = len(values)
+    for i in range(0, n, chunk):
+        out.update(values[i:i + chunk])
+    return out
@@ -1,11 +1,12 @@
 # gmksizing.py
 from __future__ import annotations
+import numpy as np
 import pandas as pd
 import streamlit as st
 
 from func import (
     SYMBOL_PRESETS, parse_gmk_signal, _dist_points, _tp_points,
-    value_per_point_per_lot, pnl_usd, _DEFAULT_RISK_SET
+    value_per_point_per_lot, _DEFAULT_RISK_SET, size_positions_batch, sizing_frame
 )
 
 def render_tab():
@@ -146,24 +147,16 @@ def render_tab():
 
         tp_cols = [f"P/L @TP{i+1} ($)" for i in range(len(tp_values))]
 
-        rows = []
-        for rp in _DEFAULT_RISK_SET:
-            risk_amt = balance * (rp / 100.0)
-            lots = risk_amt / (dist_points_sl * vpp) if (dist_points_sl > 0 and vpp > 0) else 0.0
+        # ทุกระดับ risk ในครั้งเดียว: lot (ปัดลงตาม lot step) × ระยะ TP → ตาราง P/L (risk × TP)
+        res = size_positions_batch(balance, np.asarray(_DEFAULT_RISK_SET, dtype=float), dist_points_sl, spec=spec)
+        tp_pts = np.array([_tp_points(entry, tp, spec) for tp in tp_values], dtype=float)
+        pl_tps = res["lots"][:, None] * tp_pts[None, :] * vpp
 
-            pl_tps = []
-            for tp in tp_values:
-                tp_pts = _tp_points(entry, tp, spec)
-                pnl_tp = pnl_usd(lots, tp_pts, spec) if lots > 0 else 0.0
-                pl_tps.append(pnl_tp)
+        df = sizing_frame(res, {"risk_pct": "Risk (%)", "risk_amount": "Risk ($)", "lots": "Lot"})
+        for i, c in enumerate(tp_cols):
+            df[c] = pl_tps[:, i]
 
-            row = {"Risk (%)": rp, "Risk ($)": risk_amt, "Lot": lots}
-            for i, pnl in enumerate(pl_tps):
-                row[tp_cols[i]] = pnl
-            rows.append(row)
-
-        if rows:
-            df = pd.DataFrame(rows)
+        if len(df):
             fmt_map = {"Risk (%)": "{:.0f}", "Risk ($)": "{:,.2f}", "Lot": "{:.2f}"}
             for c in tp_cols:
                 fmt_map[c] = "{:,.2f}"
@@ -171,5 +164,6 @@ def render_tab():
                           .set_table_styles([{'selector':'th','props':[('text-align','center')]}]) \
                           .set_properties(**{'text-align':'center'})
             st.dataframe(sty, use_container_width=True, height=(len(df)+2)*33)
+            st.caption(f"Lot ปัดลงตาม lot step {spec.lot_step:g} (ต่ำกว่า min lot {spec.min_lot:g} = 0)")
         else:
             st.info("ไม่มี TP ในสัญญาณ — ตารางด้านขวาจะแสดงเมื่อมี TP")
\ No newline at end of file
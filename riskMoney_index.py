@@ -2,7 +2,7 @@
 from __future__ import annotations
 import streamlit as st
 
-from auth import require_login_or_public
+from auth import log_page_view, require_login_or_public
 
 # แท็บย่อย
 import riskMoney_lot_size            # การออก Lot (public)
@@ -53,6 +53,7 @@ def render_page():
 
     # ---- Route ตามแท็บ ----
     tab = st.session_state.mm_tab
+    log_page_view(f"mm/{tab}")
     if tab == "sizing":
         riskMoney_lot_size.render_tab()  # public
         st.info("หน้านี้เปิดให้ผู้เยี่ยมชมใช้งานได้โดยไม่ต้องล็อกอิน ✅")
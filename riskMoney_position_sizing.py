@@ -1,10 +1,9 @@
 # posutionsizing.py
 from __future__ import annotations
-import pandas as pd
 import streamlit as st
 
 from func import (
-    XAUUSD_SPEC, maxlot_theoretical, lots_from_stops, loss_to_amount_and_pct
+    XAUUSD_SPEC, maxlot_theoretical, loss_to_amount_and_pct, size_positions_batch, sizing_frame
 )
 
 def render_tab():
@@ -60,11 +59,11 @@ def render_tab():
             std_points.append(int(custom_points))
         std_points = sorted(std_points)
 
-        rows = []
-        for pts, lots in lots_from_stops(risk_amount, std_points):
-            exceeds = lots > max_lot_val if max_lot_val > 0 else False
-            rows.append({"Stop Loss (Point)": pts, "Lot (คำนวณ)": lots, "เกิน MaxLot?": "⚠️ ใช่" if exceeds else ""})
-        df = pd.DataFrame(rows)
+        # ทุกระยะ SL ในครั้งเดียว: lot ดิบ + lot ที่เปิดได้จริง (ปัดลงตาม lot step, ไม่เกิน MaxLot)
+        res = size_positions_batch(balance, loss_val, std_points, price=float(price), leverage=float(leverage),
+                                   spec=XAUUSD_SPEC, risk_mode=loss_mode)
+        df = sizing_frame(res, {"stop_points": "Stop Loss (Point)", "lots_raw": "Lot (คำนวณ)", "lots": "Lot (เปิดได้)"})
+        df["เกิน MaxLot?"] = ["⚠️ ใช่" if x else "" for x in res["capped"]]
 
         def _hl(row):
             return [
@@ -76,7 +75,7 @@ def render_tab():
               .apply(_hl, axis=1)
               .set_table_styles([{'selector': 'th', 'props': [('text-align', 'center')]}])
               .set_properties(**{'text-align': 'center'})
-              .format({"Stop Loss (Point)": "{:,.0f}", "Lot (คำนวณ)": "{:.2f}"})
+              .format({"Stop Loss (Point)": "{:,.0f}", "Lot (คำนวณ)": "{:.2f}", "Lot (เปิดได้)": "{:.2f}"})
         )
 
         st.markdown(f"**MaxLot (ด้วยราคาปัจจุบัน):** {max_lot_val:.2f} lot")
@@ -1,32 +1,28 @@
 # streamlit_app.py
-import os, base64
-import datetime
-import pandas as pd
+import importlib
+from typing import Callable, Dict, Optional
+
 import streamlit as st
-from sqlalchemy import text  # ใช้ในหน้า Users (อัปเดตวันหมดอายุ)
 
-# โมดูลภายในโปรเจกต์
+# โมดูลภายในโปรเจกต์ (เฉพาะที่ทุกหน้าต้องใช้ — โมดูลของแต่ละเพจโหลดตอนเปิดเพจ ดู ROUTES)
 import auth
-import home
-import port_index
-import knowledge_index
-import riskMoney_index as mm  # มี render_page() และบังคับ public เฉพาะแท็บ 'การออก Lot'
+import app_warmup
+import db_warmup
+from asset_cache import image_data_uri
 
 # ========================= App Config =========================
 st.set_page_config(page_title="🔮 Tarot Trader 💹", page_icon="🔮", layout="wide")
 
 # ========================= AUTH Bootstrap =====================
-auth.ensure_users_table()
-first_run = auth.ensure_initial_admin()   # ยังไม่มี user เลย? ให้สร้างแอดมินครั้งแรก
-auth.init_auth()                          # เตรียม st.session_state["auth"]
+db_warmup.start()    # migrations + ต่อ DB ใน background (ไม่บล็อก) — หน้า login/private ค่อยรอ (ดู DB_ROUTES)
+auth.init_auth()     # เตรียม st.session_state["auth"] (กู้ session จาก token ใน URL เทียบกับแคชผู้ใช้ ไม่รอ DB)
 
 # ========================= Helpers ============================
 def _sidebar_logo_and_title():
-    if os.path.exists("assets/logo.png"):
-        with open("assets/logo.png", "rb") as _f:
-            _b64 = base64.b64encode(_f.read()).decode("utf-8")
+    _src = image_data_uri("assets/logo.png", width=84, fmt="WEBP")
+    if _src:
         st.sidebar.markdown(
-            f"<img src='data:image/png;base64,{_b64}' "
+            f"<img src='{_src}' "
             "style='display:block;margin:4px auto 10px auto;width:84px;height:84px;"
             "border-radius:50%;object-fit:cover;border:2px solid #2f3651;'/>",
             unsafe_allow_html=True,
@@ -61,6 +57,7 @@ with st.sidebar:
         _goto("port")
 
     # ----- อ่านสถานะผู้ใช้ให้ถูกต้อง -----
+    auth.refresh_session()   # ตรวจกับแคชผู้ใช้ (หมดอายุ/ถูกลด role → sidebar อัปเดตตาม)
     auth_info = st.session_state.get("auth", {})
     user_info = (auth_info or {}).get("user") or {}
     is_logged_in = bool((auth_info or {}).get("logged_in"))
@@ -88,11 +85,9 @@ with st.sidebar:
             st.session_state.page = "home"
             st.rerun()
 
-# ========================= Content Router =====================
-page = st.session_state.page
-
+# ========================= Pages (inline) =====================
 # ---------- หน้า Login (กดจากปุ่มใน Sidebar) ----------
-if page == "login":
+def _render_login_page():
     # ถ้าล็อกอินอยู่แล้ว ส่งกลับ Home
     if st.session_state.get("auth", {}).get("logged_in"):
         _goto("home")
@@ -111,10 +106,12 @@ if page == "login":
     """, unsafe_allow_html=True)
 
     # ====== สร้าง Admin ครั้งแรก (ถ้ายังไม่มี user) ======
+    first_run = auth.ensure_initial_admin()   # หลัง warm-up มีผู้ใช้แล้ว → จำไว้ในหน่วยความจำ ไม่ COUNT ซ้ำ
     if first_run:
         st.markdown("<div style='text-align:center'>", unsafe_allow_html=True)
-        if os.path.exists("assets/logo.png"):
-            st.image("assets/logo.png", width=120)
+        _src = image_data_uri("assets/logo.png", width=120, fmt="WEBP")
+        if _src:
+            st.markdown(f"<img src='{_src}' class='login-logo' />", unsafe_allow_html=True)
         st.header("🔐 สร้างผู้ใช้แอดมิน (ครั้งแรก)")
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -130,7 +127,9 @@ if page == "login":
                 elif new_admin_pass != new_admin_pass2:
                     st.error("รหัสผ่านไม่ตรงกัน")
                 else:
-                    if auth.create_user(new_admin_user, new_admin_pass, role="admin"):
+                    with st.spinner("กำลังสร้างผู้ใช้…"):
+                        ok = auth.create_user(new_admin_user, new_admin_pass, role="admin")
+                    if ok:
                         st.success("สร้าง Admin สำเร็จ! ลงชื่อเข้าใช้ด้านล่าง")
                     else:
                         st.error("ชื่อผู้ใช้ซ้ำหรือผิดพลาด")
@@ -141,11 +140,9 @@ if page == "login":
     col_left, col_center, col_right = st.columns([2, 2, 2])
     with col_center:
         # โลโก้ + ชื่อเพจ
-        logo_path = "assets/logo.png"
-        if os.path.exists(logo_path):
-            with open(logo_path, "rb") as f:
-                _b64 = base64.b64encode(f.read()).decode("utf-8")
-            st.markdown(f"<img src='data:image/png;base64,{_b64}' class='login-logo' />", unsafe_allow_html=True)
+        _src = image_data_uri("assets/logo.png", width=120, fmt="WEBP")
+        if _src:
+            st.markdown(f"<img src='{_src}' class='login-logo' />", unsafe_allow_html=True)
         st.markdown("<div class='login-title'>🔮 Tarot Trader 💹</div>", unsafe_allow_html=True)
 
         # ฟอร์ม Login (ปุ่มอยู่กลางด้วย .login-btn-wrap)
@@ -159,49 +156,47 @@ if page == "login":
                 st.markdown("</div>", unsafe_allow_html=True)
 
         if submitted:
-            user, err = auth.verify_login(u.strip(), p)
+            with st.spinner("กำลังตรวจสอบรหัสผ่าน…"):
+                user, err = auth.verify_login(u.strip(), p)
             if user and not err:
-                st.session_state.auth = {
-                    "logged_in": True,
-                    "user": user,  # {"id","username","role","expiry_at"}
-                    "at": datetime.datetime.now(datetime.timezone.utc).isoformat()
-                }
+                auth.start_session(user)  # {"id","username","role","expiry_at"} + token ใน URL
                 st.session_state.page = "home"
                 st.rerun()
             else:
-                st.error("บัญชีหมดอายุ" if err == "expired" else "ชื่อผู้ใช้หรือรหัสผ่านไม่ถูกต้อง")
-
-# ---------- หน้า Home (สาธารณะ) ----------
-elif page == "home":
-    home.render_home_page()
-
-# ---------- หน้า Trader’s Wisdom (สาธารณะ) ----------
-elif page == "knowledge":
-    knowledge_index.render_knowledge_index()
-
-# ---------- หน้า Money Management (สาธารณะเฉพาะแท็บ 'การออก Lot') ----------
-elif page == "mm":
-    # ภายใน mm.render_page() จะใช้ auth.require_login_or_public("mm_sizing_only")
-    mm.render_page()
-
-# ---------- หน้า Port (private ทั้งหน้า) ----------
-elif page == "port":
-    if auth.require_login_or_public("private"):  # ไม่ล็อกอินจะแจ้งเตือนและไม่เรนเดอร์
-        # st.subheader("📊 Portfolio")
-        port_index.render_port_page()
-        
-elif page == "merlin":
-    import merlin_index
-    merlin_index.render_page()
+                st.error({
+                    "expired": "บัญชีหมดอายุ",
+                    "busy": "ระบบกำลังมีผู้เข้าสู่ระบบจำนวนมาก กรุณาลองใหม่อีกครั้ง",
+                }.get(err, "ชื่อผู้ใช้หรือรหัสผ่านไม่ถูกต้อง"))
 
 # ---------- หน้า Users (admin only) ----------
-elif page == "users":
-    auth_info = st.session_state.get("auth", {})
-    user_info = (auth_info or {}).get("user") or {}
-    if not auth_info.get("logged_in") or user_info.get("role") != "admin":
+def _read_users_csv(data: bytes) -> list:
+    """อ่าน CSV (รองรับ BOM จาก Excel) → list ของ dict ตามหัวคอลัมน์ (ตัวพิมพ์เล็ก)"""
+    import csv
+    import io
+
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig")))
+    return [{(k or "").strip().lower(): (v or "").strip() for k, v in row.items()} for row in reader]
+
+
+def _show_bulk_result(res: list, pd) -> None:
+    """สรุปผลงาน bulk + ตารางผลรายแถว"""
+    ok = sum(1 for _, success, _ in res if success)
+    if ok == len(res):
+        st.success(f"สำเร็จทั้งหมด {ok} รายการ")
+    else:
+        st.warning(f"สำเร็จ {ok} / {len(res)} รายการ")
+    if res:
+        st.dataframe(pd.DataFrame(res, columns=["username", "ok", "ผลลัพธ์"]), use_container_width=True,
+                     height=min(440, (len(res)+2)*33))
+
+
+def _render_users_page():
+    if not auth.has_role("admin"):
         st.error("หน้าเฉพาะผู้ดูแลระบบ")
         st.stop()
 
+    import pandas as pd  # โหลดเฉพาะเมื่อเข้าหน้า Users
+
     st.header("👤 จัดการผู้ใช้")
 
     # -------- สร้างผู้ใช้ --------
@@ -215,7 +210,8 @@ elif page == "users":
         nexp = st.text_input("Expiry (YYYY-MM-DD) (เว้นว่าง = +1 เดือน)")
         if st.button("สร้างผู้ใช้"):
             exp_val = nexp.strip() or None
-            ok = auth.create_user(nuser, npass, role=nrole, expiry_at=exp_val)
+            with st.spinner("กำลังสร้างผู้ใช้…"):
+                ok = auth.create_user(nuser, npass, role=nrole, expiry_at=exp_val)
             if ok:
                 st.success("สร้างผู้ใช้สำเร็จ")
             else:
@@ -229,19 +225,56 @@ elif page == "users":
             if not ch_user or not ch_pass:
                 st.error("กรอกให้ครบ")
             else:
-                if auth.change_password(ch_user, ch_pass):
+                with st.spinner("กำลังเปลี่ยนรหัสผ่าน…"):
+                    ok = auth.change_password(ch_user, ch_pass)
+                if ok:
                     st.success("เปลี่ยนรหัสผ่านสำเร็จ")
                 else:
                     st.error("ไม่พบผู้ใช้")
 
     st.divider()
-    st.markdown("**รายการผู้ใช้ทั้งหมด**")
-    users = auth.list_users()  # id, username, role, created_at, expiry_at
+    st.markdown("**รายการผู้ใช้**")
+    f1, f2, f3, f4 = st.columns([2, 1, 1, 1])
+    with f1:
+        q_prefix = st.text_input("ค้นหา username (ขึ้นต้นด้วย)", key="users_q")
+    with f2:
+        q_role = st.selectbox("Role", ["ทั้งหมด", "user", "admin"], key="users_role")
+    with f3:
+        q_days = st.number_input("หมดอายุภายใน (วัน) | 0 = ไม่กรอง", min_value=0, value=0, step=1, key="users_days")
+    with f4:
+        q_size = st.selectbox("ต่อหน้า", [25, 50, 100, 200], index=1, key="users_size")
+
+    # cursor ของแต่ละหน้า (id สุดท้ายของหน้าก่อน) — เปลี่ยนฟิลเตอร์ = เริ่มหน้าแรกใหม่
+    filt = (q_prefix.strip().lower(), q_role, int(q_days), int(q_size))
+    if st.session_state.get("users_filter") != filt:
+        st.session_state.users_filter = filt
+        st.session_state.users_cursors = [0]
+    cursors = st.session_state.users_cursors
+
+    users, next_after = auth.list_users_page(
+        after_id=cursors[-1],
+        limit=int(q_size),
+        prefix=q_prefix,
+        role=None if q_role == "ทั้งหมด" else q_role,
+        expiring_days=int(q_days) or None,
+    )  # id, username, role, created_at, expiry_at
     if users:
         dfu = pd.DataFrame(users, columns=["id", "username", "role", "created_at", "expiry_at"])
         st.dataframe(dfu, use_container_width=True, height=min(440, (len(dfu)+2)*33))
     else:
-        st.info("ยังไม่มีผู้ใช้")
+        st.info("ไม่พบผู้ใช้ตามเงื่อนไข")
+
+    p1, p2, p3 = st.columns([1, 2, 1])
+    with p1:
+        if st.button("◀ ก่อนหน้า", disabled=len(cursors) <= 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with p2:
+        st.caption(f"หน้า {len(cursors)}")
+    with p3:
+        if st.button("ถัดไป ▶", disabled=next_after is None, use_container_width=True):
+            cursors.append(next_after)
+            st.rerun()
 
     st.divider()
     st.markdown("**แก้วันหมดอายุ (Expiry)**")
@@ -257,17 +290,37 @@ elif page == "users":
                 st.error("ไม่พบผู้ใช้ หรือบันทึกไม่สำเร็จ")
     with cex2:
         if st.button("ขยาย +1 เดือน"):
-            # อัปเดตเป็น NOW() + 1 month โดยตรง
-            with auth.get_engine().begin() as conn:
-                res = conn.execute(
-                    text("UPDATE users SET expiry_at = NOW() + INTERVAL '1 month' WHERE username = :u"),
-                    {"u": ux.strip()}
-                )
-            if res.rowcount > 0:
-                st.success("ขยาย +1 เดือนสำเร็จ")
+            res = auth.bulk_extend_expiry([ux], months=1)
+            if res and res[0][1]:
+                st.success(f"ขยาย +1 เดือนสำเร็จ ({res[0][2]})")
             else:
                 st.error("ไม่พบผู้ใช้ หรือบันทึกไม่สำเร็จ")
 
+    st.divider()
+    st.markdown("**จัดการหลายคนพร้อมกัน**")
+    b1, b2 = st.columns([1, 1])
+    with b1:
+        st.caption("นำเข้า CSV: คอลัมน์ username, password, role (ออปชัน), expiry_at (ออปชัน YYYY-MM-DD)")
+        up = st.file_uploader("ไฟล์ CSV สมาชิกใหม่", type=["csv"], key="users_csv")
+        if up is not None and st.button("นำเข้าผู้ใช้จาก CSV"):
+            rows = _read_users_csv(up.getvalue())
+            with st.spinner(f"กำลังสร้างผู้ใช้ {len(rows)} รายการ…"):
+                res = auth.bulk_create_users(rows)
+            _show_bulk_result(res, pd)
+    with b2:
+        names_raw = st.text_area("รายชื่อ username (บรรทัดละคน หรือคั่นด้วย , )", key="users_bulk_names")
+        months = st.number_input("ต่ออายุ (เดือน)", min_value=1, max_value=24, value=1, step=1, key="users_bulk_months")
+        names = [n for n in names_raw.replace(",", "\n").splitlines() if n.strip()]
+        c_ext, c_del = st.columns([1, 1])
+        with c_ext:
+            if st.button(f"ต่ออายุ {len(names)} คน", disabled=not names, use_container_width=True):
+                _show_bulk_result(auth.bulk_extend_expiry(names, months=int(months)), pd)
+        with c_del:
+            confirm = st.checkbox("ยืนยันการลบ", key="users_bulk_confirm")
+            if st.button(f"ลบ {len(names)} คน", disabled=not (names and confirm), use_container_width=True):
+                cur = st.session_state.get("auth", {}).get("user", {}) or {}
+                _show_bulk_result(auth.bulk_delete_users(names, keep=cur.get("username")), pd)
+
     st.divider()
     st.markdown("**ลบผู้ใช้**")
     del_user = st.text_input("Username ที่จะลบ")
@@ -281,6 +334,44 @@ elif page == "users":
             else:
                 st.error("ไม่พบผู้ใช้หรือผิดพลาด")
 
-# ---------- อื่น ๆ ----------
+# ========================= Route Table ========================
+def _lazy(module_name: str, func_name: str, gate: Optional[str] = None) -> Callable[[], None]:
+    """
+    สร้าง renderer ที่ import โมดูลของเพจ "ตอนถูกเรียกครั้งแรก" เท่านั้น
+    - gate: ส่งต่อให้ auth.require_login_or_public() ก่อนเรนเดอร์ (None = ไม่เช็ค)
+    """
+    def _render():
+        if gate is not None and not auth.require_login_or_public(gate):
+            return  # ไม่ล็อกอินจะแจ้งเตือนและไม่เรนเดอร์
+        module = importlib.import_module(module_name)  # import ซ้ำได้ (ดึงจาก sys.modules)
+        getattr(module, func_name)()
+    return _render
+
+ROUTES: Dict[str, Callable[[], None]] = {
+    "login":     _render_login_page,
+    "home":      _lazy("home", "render_home_page"),                   # สาธารณะ
+    "knowledge": _lazy("knowledge_index", "render_knowledge_index"),  # สาธารณะ
+    # ภายใน render_page() จะใช้ auth.require_login_or_public("mm_sizing_only")
+    "mm":        _lazy("riskMoney_index", "render_page"),
+    "port":      _lazy("port_index", "render_port_page", gate="private"),  # private ทั้งหน้า
+    "merlin":    _lazy("merlin_index", "render_page"),
+    "users":     _render_users_page,                                  # admin only
+}
+
+# เพจที่ต้องใช้ DB: login ทุกครั้ง, private/admin เฉพาะเมื่อล็อกอินแล้ว (ไม่ล็อกอินแค่โชว์เตือน ไม่ต้องรอ)
+DB_ROUTES = {"port", "merlin", "users"}
+
+# ========================= Content Router =====================
+page = st.session_state.page
+render = ROUTES.get(page)
+if render is not None:
+    auth.log_page_view(page)   # เข้าคิวในหน่วยความจำ (เขียน DB เป็น batch เบื้องหลัง)
+    if page == "login" or (page in DB_ROUTES and auth.is_logged_in()):
+        auth.wait_for_db()     # ปกติ warm-up เสร็จไปแล้วระหว่างผู้ใช้อ่านหน้าแรก → ไม่ต้องรอ
+    render()
 else:
-    st.info("Coming soon…")
\ No newline at end of file
+    st.info("Coming soon…")
+
+# ========================= Warm-up ============================
+# หน้าแรกวาดเสร็จแล้ว → ค่อย import โมดูลหนัก ๆ + calibrate bcrypt cost ใน background (ครั้งเดียวต่อ process)
+app_warmup.start_background_warmup(tasks=(auth.calibrate_bcrypt_cost,))
@@ -0,0 +1,87 @@
+# tests/test_login_roundtrips.py
+"""
+การล็อกอิน 1 ครั้ง = 1 statement ไปฐานข้อมูล และไม่มี pool pre-ping (SQLite ไฟล์ชั่วคราว ไม่ต้องมี server)
+เทียบบน Postgres จริง (นับ BEGIN/COMMIT + connect ด้วย) → benchmarks/bench_login_roundtrips.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LOGINS = 3
+USER = "roundtrip_user"
+PASSWORD = "roundtrip-password"
+
+
+@pytest.fixture()
+def engine(tmp_path, monkeypatch):
+    import auth
+    import event_log
+    from auth_migrations import run_migrations
+
+    monkeypatch.setattr(event_log, "EVENTS_ENABLED", False)   # ไม่ให้ batch ของ event ปนในการนับ
+
+    eng = auth.make_engine(f"sqlite:///{tmp_path / 'login.sqlite'}")
+    auth.use_engine(eng)
+    run_migrations(eng)
+    auth.create_user(USER, PASSWORD, "user")
+    yield eng
+    eng.dispose()
+
+
+def _count(engine) -> Counter:
+    """
+    นับ query (เฉพาะ thread ที่ทดสอบ) และ pre-ping
+    BEGIN ที่ SQLiteDialect ส่งเองไม่นับ — บน Postgres คิวรีอ่านล้วนใช้ AUTOCOMMIT (ดู auth._read_options)
+    """
+    from sqlalchemy import event
+
+    counts: Counter = Counter()
+    me = threading.get_ident()
+
+    def _on_stmt(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == me and not statement.lstrip().upper().startswith("BEGIN"):
+            counts["statement"] += 1
+
+    event.listen(engine, "before_cursor_execute", _on_stmt)
+    orig_ping = engine.dialect.do_ping
+
+    def _counting_ping(dbapi_connection):
+        counts["ping"] += 1
+        return orig_ping(dbapi_connection)
+
+    engine.dialect.do_ping = _counting_ping
+    return counts
+
+
+def test_login_is_one_statement_without_pre_ping(engine):
+    import auth
+
+    user, err = auth.verify_login(USER, PASSWORD)   # ครั้งแรก: อาจ rehash ตาม cost ของเครื่องนี้
+    assert err is None and user["username"] == USER
+
+    counts = _count(engine)
+    for _ in range(LOGINS):
+        user, err = auth.verify_login(USER, PASSWORD)
+        assert err is None
+    assert counts["statement"] == LOGINS
+    assert counts["ping"] == 0
+    assert not engine.pool._pre_ping
+
+
+def test_failed_login_is_one_statement(engine):
+    import auth
+
+    counts = _count(engine)
+    for name in (USER, "no_such_user"):
+        user, err = auth.verify_login(name, "wrong-password")
+        assert user is None and err == "invalid"
+    assert counts["statement"] == 2
+    assert counts["ping"] == 0